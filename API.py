@@ -1,19 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flasgger import Swagger
 import pymysql
-import subprocess
-import tempfile
-import csv
+import base64
+import hashlib
 import json
 import os
 import re
 import sys
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from urllib.parse import urlparse
 import jwt  # Для JWT токенов
 import time
 import random
+import threading
+import concurrent.futures
+import requests
+import atexit
+from db_pool import ConnectionPool
+from jobs import JobQueue, QueueFullError
+from browser_pool import BrowserPool, BrowserPoolTimeoutError
+from rate_limit import HostRateLimiter, AdaptivePacer, PacingRun, AttemptLimiter
+from wb_api import WildberriesApiClient, WildberriesBlockedError
+from ozon_runner import OzonRunner
+from page_cache import PageCache
+from category_memo import CategoryMemo
+from product_counts import ProductCounts
+from product_stats import ProductStats, StatsDelta
+from response_cache import ResponseCache
+from auth_cache import AuthCache
+from password_hasher import PasswordHasher, HasherBusyError
+from card_selectors import CardExtractor, nodes_for
+from html_backends import HtmlBackend, breadcrumb_fragment
+from wb_listing import wait_for_cards
+from migrations import MigrationRunner, fix_users_table
 
 app = Flask(__name__)
 CORS(app)
@@ -114,140 +135,248 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
+# Настройки пула соединений с БД
+DB_POOL_CONFIG = {
+    'min_size': 2,                # соединений держим открытыми всегда
+    'max_size': 20,               # верхняя граница (не больше max_connections MySQL)
+    'max_idle_time': 300,         # сек простоя до закрытия лишнего соединения
+    'checkout_timeout': 10,       # сек ожидания свободного соединения
+    'health_check_interval': 30,  # сек простоя, после которых соединение пингуется
+}
+
+db_pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+
+# Настройки фоновых задач парсинга
+JOB_CONFIG = {
+    'max_workers': 2,          # одновременно выполняемых парсингов (каждый — браузер)
+    'max_pending': 50,         # задач в очереди + в работе, сверх — 503
+    'progress_interval': 1.0,  # сек между записями прогресса в БД
+}
+
+# Настройки пула браузеров Wildberries
+BROWSER_POOL_CONFIG = {
+    'size': 2,                    # браузеров (не меньше JOB_CONFIG['max_workers'])
+    'max_pages_per_driver': 200,  # страниц до перезапуска браузера (утечки памяти Chrome)
+    'checkout_timeout': 120,      # сек ожидания свободного браузера
+}
+BROWSER_POOL_WARM_ON_START = True  # запускать браузеры при старте API
+
+# Определение категорий WB: страницы товаров грузятся параллельно в нескольких вкладках
+WB_CATEGORY_CONFIG = {
+    'category_concurrency': 4,     # вкладок одновременно на один браузер
+    'category_page_timeout': 15,   # сек ожидания хлебных крошек на странице товара
+    'category_settle_time': 3,     # сек после загрузки, если хлебных крошек на странице нет
+}
+
+# Разбор HTML страниц WB: 'selectolax', 'lxml', 'html.parser' или 'auto' (самый быстрый из установленных)
+WB_HTML_CONFIG = {
+    'backend': 'auto',
+    'breadcrumb_early_stop': True,  # со страницы товара парсить только область хлебных крошек
+}
+
+_wb_html_backend = None
+
+
+def get_wb_html_backend():
+    """
+    Парсер HTML для WB, создается при первом парсинге: bs4 и selectolax —
+    необязательные зависимости, без них API должен стартовать.
+    ImportError, если не установлен ни один парсер.
+    """
+    global _wb_html_backend
+    if _wb_html_backend is None:
+        _wb_html_backend = HtmlBackend(WB_HTML_CONFIG['backend'])
+    return _wb_html_backend
+
+# Подгрузка сетки продавца WB: прокрутка без пауз, по событиям страницы (MutationObserver)
+WB_LISTING_CONFIG = {
+    'listing_first_timeout': 30,  # сек ожидания первых карточек
+    'listing_scroll_timeout': 8,  # сек ожидания новых карточек после прокрутки
+    'listing_quiet_time': 0.5,    # сек без мутаций DOM и запросов — порция карточек пришла
+    'listing_max_scrolls': 30,
+    'listing_stall_limit': 2,     # прокруток подряд без новых карточек — товаров больше нет
+}
+
+# Вежливость: интервал между загрузками страниц одного хоста, общий для браузерных парсеров WB и Ozon.
+# Подстраивается под ответы (AIMD): сокращается, пока хост отвечает нормально,
+# и растет после капчи, 429/403 или пустой страницы
+HOST_PACING_CONFIG = {
+    'initial_interval': 2.0,  # сек, с которых начинается незнакомый хост
+    'min_interval': 0.5,
+    'max_interval': 30.0,
+    'step': 0.25,             # сек, на которые интервал сокращается после нормального ответа
+    'backoff': 2.0,           # во сколько раз интервал растет после капчи или блокировки
+    'jitter': 0.25,           # случайная добавка в долях интервала
+}
+
+host_rate_limiter = AdaptivePacer(**HOST_PACING_CONFIG)
+
+# Источник товаров WB: 'api' — JSON-каталог WB (браузер только если API заблокирован),
+# 'browser' — всегда рендер страниц в Selenium
+WB_FETCH_MODE = 'api'
+
+WB_API_CONFIG = {
+    'endpoints': {},   # переопределение URL (например, локальный стаб), см. wb_api.WB_API_ENDPOINTS
+    'timeout': 10,     # сек на HTTP-запрос
+    'max_workers': 4,  # страниц каталога одновременно
+}
+
+# Свои паузы у JSON-каталога: с интервалом страниц (2 сек) параллельные запросы
+# max_workers шли бы по одному. Обратная связь та же — 429/403 и не-JSON замедляют
+WB_API_PACING_CONFIG = {
+    'initial_interval': 0.2,
+    'min_interval': 0.05,
+    'max_interval': 10.0,
+    'step': 0.05,
+    'backoff': 2.0,
+    'jitter': 0.25,
+}
+
+wb_api_rate_limiter = AdaptivePacer(**WB_API_PACING_CONFIG)
+
+wb_api_client = WildberriesApiClient(rate_limiter=wb_api_rate_limiter, **WB_API_CONFIG)
+
+# Парсер Ozon: карточки товаров продавца парсятся в нескольких вкладках одного браузера
+OZON_PARSER_CONFIG = {
+    'pages': 1,            # страниц витрины продавца
+    'max_products': 15,    # товаров за один парсинг
+    'workers': 4,          # вкладок одновременно
+    'min_interval': 1.0,   # сек между запросами к ozon.ru
+    'profile': 'fast',     # 'fast' — не ждать дозагрузки карточки, если JSON-LD дал название и цену
+    'block_resources': True,  # не грузить картинки, шрифты, медиа и аналитику
+    'batch_size': 10,      # товаров в пачке, которая пишется в БД, пока парсинг идет
+}
+
+# Дисковый кэш HTML страниц товаров WB и Ozon (content-addressed, TTL + LRU)
+PAGE_CACHE_CONFIG = {
+    'enabled': True,
+    'directory': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'pages'),
+    'ttl': 6 * 3600,                 # сек, после которых страница загружается заново
+    'max_bytes': 500 * 1024 * 1024,  # объем на диске (сжатый), сверх — вытесняются давно не нужные
+}
+
+page_cache = (PageCache(**{k: v for k, v in PAGE_CACHE_CONFIG.items() if k != 'enabled'})
+              if PAGE_CACHE_CONFIG['enabled'] else None)
+
+# Итоги для /products: счетчики по (seller_id, platform) и кэш итогов до следующей записи товаров
+PRODUCT_COUNT_CONFIG = {
+    'cache_ttl': 300,    # сек жизни закэшированного итога (кэш сбрасывается и при записи товаров)
+    'cache_size': 1024,  # разных наборов фильтров в кэше
+}
+
+# Кэш ответов /products и /stats: сбрасывается при записи товаров затронутого продавца/платформы
+RESPONSE_CACHE_CONFIG = {
+    'enabled': True,
+    'ttl': 60,            # сек жизни ответа, даже если товары не записывались
+    'max_entries': 512,   # ответов в памяти процесса (LRU)
+    'redis_url': None,    # например 'redis://localhost:6379/0' — общий кэш для всех процессов API
+}
+
+response_cache = (ResponseCache(**{k: v for k, v in RESPONSE_CACHE_CONFIG.items() if k != 'enabled'})
+                  if RESPONSE_CACHE_CONFIG['enabled'] else None)
+
+# Кэш проверенных JWT и строк пользователей (token_required, /profile)
+AUTH_CACHE_CONFIG = {
+    'token_cache_size': 4096,  # токенов в кэше (LRU)
+    'user_cache_size': 1024,   # пользователей в кэше (LRU)
+    'token_ttl': 600,          # сек, дольше exp токена не хранится в любом случае
+    'user_ttl': 300,           # сек до повторного чтения строки пользователя из users
+}
+
+auth_cache = AuthCache(**AUTH_CACHE_CONFIG)
+
+# Хеширование паролей в отдельных процессах: медленный scrypt не держит GIL потоков API.
+# Хеши, посчитанные другим method, перехешируются при следующем входе
+PASSWORD_HASH_CONFIG = {
+    'method': 'scrypt:32768:8:1',
+    'workers': 2,           # процессов (0 — считать в потоке запроса)
+    'max_pending': 64,      # операций в работе и в очереди, сверх — 503
+    'queue_timeout': 1.0,   # сек ожидания места в очереди
+    'timeout': 30,          # сек на одну операцию
+}
+
+password_hasher = PasswordHasher(**PASSWORD_HASH_CONFIG)
+
+# Ограничение попыток входа: (попыток, окно в секундах). По IP считаются все попытки,
+# по логину — только неудачные (успешный вход сбрасывает счетчик)
+LOGIN_RATE_LIMITS = {
+    'ip': (20, 60),
+    'user': (5, 300),
+}
+
+login_limiter = AttemptLimiter(LOGIN_RATE_LIMITS)
+
+# Память категорий WB по ID товара и предмету: страница открывается один раз на предмет
+CATEGORY_MEMO_CONFIG = {
+    'max_age_days': 30,  # дней, после которых категория проверяется заново
+}
+
+# Парсер Ozon работает в процессе API: общий event loop и браузер Playwright
+OZON_RUNNER_CONFIG = {
+    'run_timeout': 300,    # сек на один парсинг продавца
+    'restart_after': 50,   # парсингов до перезапуска браузера
+}
+
+ozon_runner = OzonRunner(page_cache=page_cache, pacer=host_rate_limiter, **OZON_RUNNER_CONFIG)
+
+# Инкрементальный перепарсинг: карточки открываются только для новых товаров,
+# товаров с изменившейся в сетке ценой и товаров, не обновлявшихся дольше max_staleness_hours
+INCREMENTAL_CONFIG = {
+    'enabled': True,
+    'max_staleness_hours': 24,
+}
+
 
 def get_db():
-    """Подключение к БД"""
-    return pymysql.connect(**DB_CONFIG)
+    """
+    Соединение с БД из пула (контекстный менеджер):
 
+        with get_db() as conn:
+            ...
 
-def check_and_fix_table_structure():
-    """Проверяет и исправляет структуру таблицы users"""
-    try:
-        conn = get_db()
-        with conn.cursor() as cursor:
-            # Проверяем, существует ли таблица users
-            cursor.execute("SHOW TABLES LIKE 'users'")
-            table_exists = cursor.fetchone()
+    Соединение возвращается в пул при выходе из блока, даже при ошибке.
+    """
+    return db_pool.connection()
 
-            if not table_exists:
-                print("❌ Таблица 'users' не существует, создаю...")
-                cursor.execute("""
-                    CREATE TABLE users (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        username VARCHAR(50) UNIQUE NOT NULL,
-                        email VARCHAR(100) UNIQUE NOT NULL,
-                        password_hash VARCHAR(255) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_login TIMESTAMP NULL,
-                        is_active BOOLEAN DEFAULT TRUE
-                    )
-                """)
-                conn.commit()
-                print("✅ Таблица 'users' создана")
-                return True
-
-            # Проверяем структуру существующей таблицы
-            cursor.execute("DESCRIBE users")
-            columns = cursor.fetchall()
-            column_names = [col['Field'] for col in columns]
-
-            print(f"📊 Структура таблицы users: {column_names}")
-
-            # Проверяем наличие обязательных колонок
-            required_columns = ['username', 'email', 'password_hash']
-            missing_columns = []
-
-            for req_col in required_columns:
-                if req_col not in column_names:
-                    missing_columns.append(req_col)
-
-            if missing_columns:
-                print(f"⚠️ В таблице users отсутствуют колонки: {missing_columns}")
-                print("🔄 Пробую пересоздать таблицу...")
-
-                # Сначала делаем backup если есть данные
-                cursor.execute("SELECT COUNT(*) as count FROM users")
-                count_result = cursor.fetchone()
-                has_data = count_result['count'] > 0 if count_result else False
-
-                if has_data:
-                    print("⚠️ В таблице есть данные! Создаю новую таблицу users_new")
-
-                    # Создаем новую таблицу с правильной структурой
-                    cursor.execute("""
-                        CREATE TABLE users_new (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            username VARCHAR(50) UNIQUE NOT NULL,
-                            email VARCHAR(100) UNIQUE NOT NULL,
-                            password_hash VARCHAR(255) NOT NULL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            last_login TIMESTAMP NULL,
-                            is_active BOOLEAN DEFAULT TRUE
-                        )
-                    """)
-
-                    # Переименовываем таблицы
-                    cursor.execute("DROP TABLE IF EXISTS users_old")
-                    cursor.execute("RENAME TABLE users TO users_old, users_new TO users")
-                    print("✅ Таблица пересоздана, старые данные в users_old")
-                else:
-                    # Если данных нет, просто пересоздаем
-                    cursor.execute("DROP TABLE users")
-                    cursor.execute("""
-                        CREATE TABLE users (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            username VARCHAR(50) UNIQUE NOT NULL,
-                            email VARCHAR(100) UNIQUE NOT NULL,
-                            password_hash VARCHAR(255) NOT NULL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            last_login TIMESTAMP NULL,
-                            is_active BOOLEAN DEFAULT TRUE
-                        )
-                    """)
-                    print("✅ Таблица пересоздана")
-
-                conn.commit()
 
-            return True
+job_queue = JobQueue(get_db, **JOB_CONFIG)
+category_memo = CategoryMemo(get_db, platform='wildberries', **CATEGORY_MEMO_CONFIG)
+product_counts = ProductCounts(get_db, **PRODUCT_COUNT_CONFIG)
+product_stats = ProductStats(get_db)
+migration_runner = MigrationRunner(get_db)
+
+
+def check_and_fix_table_structure():
+    """Проверяет и исправляет структуру таблицы users (при старте это делает миграция users_table)"""
+    try:
+        with get_db() as conn, conn.cursor() as cursor:
+            fix_users_table(cursor)
+            conn.commit()
+        return True
 
     except Exception as e:
         print(f"❌ Ошибка при проверке структуры таблицы: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 
 def init_database():
-    """Инициализация таблиц products и users"""
+    """Инициализация таблиц: миграции схемы products и users, таблицы подсистем"""
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
-            # Таблица для товаров
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS products (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    seller_id VARCHAR(255),
-                    title TEXT,
-                    brand VARCHAR(255),
-                    category VARCHAR(255),
-                    price DECIMAL(12, 2),
-                    platform VARCHAR(20) DEFAULT 'ozon',
-                    rating DECIMAL(3, 2),
-                    image_url TEXT,
-                    product_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_seller_platform (seller_id, platform),
-                    INDEX idx_platform (platform)
-                )
-            """)
+        # Схема products и users — версионными миграциями (примененные хранятся в schema_migrations)
+        applied = migration_runner.run()
+        if applied:
+            print(f"✅ Применены миграции: {', '.join(map(str, applied))}")
 
-            conn.commit()
+        # Таблица фоновых задач парсинга
+        job_queue.ensure_table()
+
+        # Память категорий WB
+        category_memo.ensure_table()
 
-        # Проверяем и исправляем структуру таблицы users
-        check_and_fix_table_structure()
+        # Сводки для /stats и счетчиков /products (при первом запуске заполняются по products)
+        product_stats.ensure_tables()
 
-        print("✅ Таблицы 'products' и 'users' готовы")
+        print("✅ Таблицы 'products', 'users', 'parse_jobs', 'category_memo' и сводки /stats готовы")
         return True
     except Exception as e:
         print(f"❌ Ошибка БД: {e}")
@@ -306,82 +435,388 @@ def extract_wb_entity_info(url):
     return None
 
 
-def save_to_database(products, seller_id, platform='ozon'):
-    """Сохраняет товары в БД"""
-    saved_count = 0
+# Размер пачки строк для многострочного INSERT
+DB_INSERT_CHUNK_SIZE = 500
+
+# Способ записи: 'upsert' — обновление по (platform, seller_id, external_id), 'insert' — всегда новые строки
+DB_INGEST_MODE = 'upsert'
+
+PRODUCT_COLUMNS = ('seller_id', 'external_id', 'title', 'brand', 'category', 'price', 'platform', 'rating',
+                   'image_url', 'product_url')
+
+# Колонки, изменение которых означает, что товар нужно перезаписать
+PRODUCT_TRACKED_COLUMNS = ('title', 'brand', 'category', 'price', 'rating', 'image_url', 'product_url')
+
+_EXTERNAL_ID_POS = PRODUCT_COLUMNS.index('external_id')
+_TRACKED_POS = [(column, PRODUCT_COLUMNS.index(column)) for column in PRODUCT_TRACKED_COLUMNS]
+_PRICE_POS = PRODUCT_COLUMNS.index('price')
+_RATING_POS = PRODUCT_COLUMNS.index('rating')
+
+_INSERT_SQL = (
+    f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(PRODUCT_COLUMNS))})"
+)
+_UPSERT_SQL = _INSERT_SQL + " ON DUPLICATE KEY UPDATE " + ", ".join(
+    f"{column} = VALUES({column})" for column in PRODUCT_TRACKED_COLUMNS
+)
+
+_PRICE_CLEAN_RE = re.compile(r'[^\d.]')
+
+
+def normalize_product(product, seller_id, platform):
+    """Приводит товар парсера (Ozon/WB, разные регистры ключей) к строке таблицы products"""
+    price = None
+    price_str = product.get('PRICE') or product.get('price')
+    if price_str:
+        price_clean = _PRICE_CLEAN_RE.sub('', str(price_str))
+        if price_clean:
+            try:
+                price = float(price_clean)
+            except ValueError:
+                price = None
+
+    title = product.get('NAME') or product.get('title') or product.get('name') or ''
+    brand = product.get('BRAND') or product.get('brand') or ''
+    category = (product.get('SUBCATEGORY') or product.get('CATEGORY') or product.get('category')
+                or product.get('subcategory') or '')
+
+    # Для Wildberries получаем дополнительные поля
+    rating = product.get('rating') or product.get('RATING')
+    if rating:
+        try:
+            rating = float(rating)
+        except (TypeError, ValueError):
+            rating = None
+    else:
+        rating = None
+
+    image_url = product.get('image') or product.get('IMAGE') or product.get('image_url') or ''
+    product_url = product.get('url') or product.get('URL') or ''
+
+    # ID товара на маркетплейсе (артикул WB / ID Ozon) — ключ для upsert
+    external_id = str(product.get('ID') or product.get('id') or '').strip()[:64] or None
+
+    return (
+        seller_id,
+        external_id,
+        str(title)[:500],
+        str(brand)[:255],
+        str(category)[:255],
+        price,
+        platform,
+        rating,
+        str(image_url)[:500],
+        str(product_url)[:500]
+    )
+
+
+def normalize_products(products, seller_id, platform):
+    """Нормализует весь список товаров за один проход. Возвращает (строки, ошибки)"""
+    rows = []
+    errors = []
+    for idx, product in enumerate(products):
+        try:
+            rows.append(normalize_product(product, seller_id, platform))
+        except Exception as e:
+            errors.append({'index': idx, 'error': str(e)})
+    return rows, errors
+
+
+def _product_changed(stored, row):
+    """Сравнивает строку из БД с новой нормализованной строкой"""
+    for column, pos in _TRACKED_POS:
+        old_value = stored[column]
+        new_value = row[pos]
+        if column in ('price', 'rating'):
+            # В БД DECIMAL с двумя знаками — сравниваем с тем же округлением
+            old_value = None if old_value is None else round(float(old_value), 2)
+            new_value = None if new_value is None else round(float(new_value), 2)
+        elif old_value is None:
+            old_value = ''
+        if old_value != new_value:
+            return True
+    return False
+
+
+def _upsert_chunk(cursor, chunk, seller_id, platform, reused_ids=frozenset(), delta=None):
+    """
+    Записывает пачку в режиме upsert. Существующие строки читаются одним SELECT,
+    в INSERT ... ON DUPLICATE KEY UPDATE попадают только новые и изменившиеся товары.
+    У существующих товаров, кроме reused_ids, обновляется scraped_at.
+    Изменение сводки /stats (новые товары, сдвиг цен и рейтингов) копится в delta.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    keyed = {}
+    without_id = []
+    for row in chunk:
+        external_id = row[_EXTERNAL_ID_POS]
+        if external_id:
+            # Повторы внутри пачки: побеждает последний
+            keyed[external_id] = row
+        else:
+            without_id.append(row)
+    counts['unchanged'] += len(chunk) - len(keyed) - len(without_id)
+
+    existing = {}
+    if keyed:
+        placeholders = ', '.join(['%s'] * len(keyed))
+        cursor.execute(f"""
+            SELECT external_id, {', '.join(PRODUCT_TRACKED_COLUMNS)}
+            FROM products
+            WHERE platform = %s AND seller_id = %s AND external_id IN ({placeholders})
+        """, [platform, seller_id, *keyed])
+        existing = {stored['external_id']: stored for stored in cursor.fetchall()}
+
+    to_write = []
+    for external_id, row in keyed.items():
+        stored = existing.get(external_id)
+        if stored is None:
+            counts['inserted'] += 1
+            to_write.append(row)
+            if delta is not None:
+                delta.add(row[_PRICE_POS], row[_RATING_POS])
+        elif _product_changed(stored, row):
+            counts['updated'] += 1
+            to_write.append(row)
+            if delta is not None:
+                delta.add(stored['price'], stored['rating'], sign=-1, count_product=False)
+                delta.add(row[_PRICE_POS], row[_RATING_POS], count_product=False)
+        else:
+            counts['unchanged'] += 1
+
+    if to_write:
+        cursor.executemany(_UPSERT_SQL, to_write)
+
+    # Карточку открывали — товар свежий, даже если ничего не изменилось
+    touched = [external_id for external_id in existing if external_id not in reused_ids]
+    if touched:
+        placeholders = ', '.join(['%s'] * len(touched))
+        cursor.execute(f"""
+            UPDATE products SET scraped_at = CURRENT_TIMESTAMP
+            WHERE platform = %s AND seller_id = %s AND external_id IN ({placeholders})
+        """, [platform, seller_id, *touched])
 
+    # Без ID товар не с чем сопоставить — пишем как есть
+    if without_id:
+        cursor.executemany(_INSERT_SQL, without_id)
+        counts['inserted'] += len(without_id)
+        if delta is not None:
+            for row in without_id:
+                delta.add(row[_PRICE_POS], row[_RATING_POS])
+
+    return counts
+
+
+def save_to_database(products, seller_id, platform='ozon', chunk_size=None, mode=None, reused_ids=None):
+    """
+    Сохраняет товары в БД пачками.
+
+    Товары нормализуются один раз, затем пишутся многострочными INSERT'ами
+    по chunk_size строк в одной транзакции. Каждая пачка защищена SAVEPOINT'ом:
+    упавшая пачка откатывается и попадает в отчет, остальные сохраняются.
+
+    mode='upsert' (по умолчанию DB_INGEST_MODE) обновляет товары по ключу
+    (platform, seller_id, external_id) и не трогает неизменившиеся строки,
+    mode='insert' всегда добавляет новые строки.
+
+    reused_ids — external_id товаров, карточки которых в инкрементальном режиме
+    не открывались: их scraped_at не обновляется, чтобы срок свежести шел дальше.
+
+    Возвращает отчет: {'saved', 'inserted', 'updated', 'unchanged', 'failed', 'chunks', 'errors'}
+    """
+    chunk_size = chunk_size or DB_INSERT_CHUNK_SIZE
+    mode = mode or DB_INGEST_MODE
+    if mode not in ('upsert', 'insert'):
+        raise ValueError(f"Неизвестный режим записи: {mode}")
+
+    report = {'saved': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+              'failed': 0, 'chunks': 0, 'errors': []}
+
+    rows, normalize_errors = normalize_products(products, seller_id, platform)
+    for error in normalize_errors:
+        print(f"⚠️ Товар #{error['index']} пропущен: {error['error']}")
+        report['errors'].append({'stage': 'normalize', **error})
+    report['failed'] += len(normalize_errors)
+
+    if not rows:
+        return report
+
+    stats_delta = StatsDelta()
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
-            for product in products:
+        with get_db() as conn, conn.cursor() as cursor:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                report['chunks'] += 1
+                chunk_delta = StatsDelta()
+                cursor.execute("SAVEPOINT products_chunk")
                 try:
-                    price = None
-                    if product.get('PRICE') or product.get('price'):
-                        price_str = product.get('PRICE') or product.get('price') or ''
-                        price_clean = re.sub(r'[^\d.]', '', str(price_str))
-                        if price_clean:
-                            try:
-                                price = float(price_clean)
-                            except:
-                                price = None
-
-                    title = product.get('NAME') or product.get('title') or product.get('name') or ''
-                    brand = product.get('BRAND') or product.get('brand') or ''
-                    category = product.get('SUBCATEGORY') or product.get('category') or product.get('subcategory') or ''
-
-                    # Для Wildberries получаем дополнительные поля
-                    rating = product.get('rating') or product.get('RATING')
-                    if rating:
-                        try:
-                            rating = float(rating)
-                        except:
-                            rating = None
-
-                    image_url = product.get('image') or product.get('IMAGE') or product.get('image_url') or ''
-                    product_url = product.get('url') or product.get('URL') or ''
-
-                    cursor.execute("""
-                        INSERT INTO products (seller_id, title, brand, category, price, platform, rating, image_url, product_url)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        seller_id,
-                        title[:500] if title else '',
-                        brand[:255] if brand else '',
-                        category[:255] if category else '',
-                        price,
-                        platform,
-                        rating,
-                        image_url[:500] if image_url else '',
-                        product_url[:500] if product_url else ''
-                    ))
-                    saved_count += 1
+                    if mode == 'upsert':
+                        counts = _upsert_chunk(cursor, chunk, seller_id, platform,
+                                               reused_ids=frozenset(reused_ids or ()), delta=chunk_delta)
+                    else:
+                        # PyMySQL сворачивает executemany с INSERT ... VALUES в многострочный INSERT
+                        cursor.executemany(_INSERT_SQL, chunk)
+                        counts = {'inserted': len(chunk)}
+                        for row in chunk:
+                            chunk_delta.add(row[_PRICE_POS], row[_RATING_POS])
+                    cursor.execute("RELEASE SAVEPOINT products_chunk")
+                    # Откаченная пачка в сводку не попадает
+                    stats_delta.merge(chunk_delta)
+                    for key, value in counts.items():
+                        report[key] += value
+                    report['saved'] += len(chunk)
+                except pymysql.err.OperationalError:
+                    # Соединение потеряно — дальше писать нельзя
+                    raise
                 except Exception as e:
-                    print(f"⚠️ Ошибка сохранения товара: {e}")
-                    continue
+                    cursor.execute("ROLLBACK TO SAVEPOINT products_chunk")
+                    print(f"⚠️ Ошибка сохранения пачки строк {start}-{start + len(chunk) - 1}: {e}")
+                    report['failed'] += len(chunk)
+                    report['errors'].append({
+                        'stage': 'insert',
+                        'chunk': report['chunks'],
+                        'rows': [start, start + len(chunk) - 1],
+                        'error': str(e)
+                    })
+
+            # Сводка продавца и платформы — в той же транзакции, что и сами товары
+            product_stats.apply(cursor, seller_id, platform, stats_delta)
+            conn.commit()
 
-        conn.commit()
-        conn.close()
-        return saved_count
+        product_counts.invalidate()
+        if response_cache:
+            response_cache.invalidate(seller_id, platform)
 
     except Exception as e:
         print(f"❌ Ошибка БД при сохранении: {e}")
-        return 0
+        # Транзакция откатилась целиком
+        report.update({'saved': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': len(products)})
+        report['errors'].append({'stage': 'transaction', 'error': str(e)})
+
+    return report
+
+
+def load_known_products(seller_id, platform, max_staleness_hours=None):
+    """
+    Сохраненные товары продавца для инкрементального режима: {external_id: строка}.
+    В строке, кроме колонок products, есть флаг stale — карточку пора перепарсить
+    по сроку давности, даже если цена не менялась.
+    """
+    if max_staleness_hours is None:
+        max_staleness_hours = INCREMENTAL_CONFIG['max_staleness_hours']
+
+    with get_db() as conn, conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT external_id, {', '.join(PRODUCT_TRACKED_COLUMNS)},
+                   (scraped_at IS NULL OR scraped_at < NOW() - INTERVAL %s SECOND) AS stale
+            FROM products
+            WHERE platform = %s AND seller_id = %s AND external_id IS NOT NULL
+        """, [int(max_staleness_hours * 3600), platform, seller_id])
+        return {row['external_id']: row for row in cursor.fetchall()}
+
+
+def product_needs_refresh(known, external_id, price):
+    """
+    Нужно ли открывать карточку товара: новый товар, устаревшая запись
+    или цена в сетке отличается от сохраненной
+    """
+    stored = known.get(str(external_id or ''))
+    if stored is None or stored['stale']:
+        return True
+
+    # Цену в сетке не нашли — сравнивать не с чем
+    try:
+        price = float(_PRICE_CLEAN_RE.sub('', str(price or '')) or 0)
+    except ValueError:
+        price = 0
+    if not price or stored['price'] is None:
+        return True
+    return round(price, 2) != round(float(stored['price']), 2)
+
+
+def _load_known_products_safe(seller_id, platform):
+    """load_known_products, при ошибке БД — пустой словарь (полный парсинг)"""
+    try:
+        known = load_known_products(seller_id, platform)
+        print(f"🗂️  Известных товаров продавца в БД: {len(known)}")
+        return known
+    except Exception as e:
+        print(f"⚠️  Не удалось загрузить сохраненные товары, полный парсинг: {e}")
+        return {}
 
 
 class WildberriesSellerParser:
-    def __init__(self, headless=True, delay_range=(3, 7)):
+    USER_AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
+    ]
+
+    # Путь к chromedriver: ChromeDriverManager().install() ходит в сеть, делаем это один раз
+    _driver_path = None
+
+    def __init__(self, headless=True, delay_range=(3, 7), driver=None,
+                 category_concurrency=1, category_page_timeout=15, category_settle_time=3,
+                 rate_limiter=None, page_cache=None, category_memo=None,
+                 html_backend=None, breadcrumb_early_stop=False,
+                 listing_first_timeout=30, listing_scroll_timeout=8, listing_quiet_time=0.5,
+                 listing_max_scrolls=30, listing_stall_limit=2):
+        """
+        driver — уже запущенный браузер (например, из пула wb_browser_pool).
+        Такой браузер парсер не закрывает, а только считает загруженные страницы.
+
+        category_concurrency — сколько страниц товаров грузить одновременно
+        (в отдельных вкладках) при определении категорий; rate_limiter
+        разводит все загрузки страниц по времени для одного хоста и получает
+        обратную связь: нормальная страница, капча или пустая страница
+        (AdaptivePacer по ней ускоряется или притормаживает). Паузы и время
+        загрузки страниц копятся в self.pacing (PacingRun).
+
+        page_cache — дисковый кэш страниц товаров (page_cache.PageCache):
+        закэшированные страницы при определении категорий не загружаются.
+
+        category_memo — память категорий (category_memo.CategoryMemo): страница
+        открывается только для незнакомых товаров, по одной на предмет.
+
+        html_backend — парсер HTML (html_backends.HtmlBackend), по умолчанию
+        html.parser. breadcrumb_early_stop — со страницы товара разбирать
+        только область хлебных крошек, а не всю страницу.
+
+        listing_* — подгрузка сетки продавца (_wait_and_load_products):
+        сек ожидания первых карточек и новых после прокрутки, сек тишины
+        на странице, после которых порция считается пришедшей, предел
+        прокруток и число прокруток подряд без новых карточек до остановки.
+        """
         self.delay_range = delay_range
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
-        ]
+        self.user_agents = self.USER_AGENTS
+        self.pages_loaded = 0
+        self.reused_ids = set()
+        self.owns_driver = driver is None
+        self.category_concurrency = max(1, category_concurrency)
+        self.category_page_timeout = category_page_timeout
+        self.category_settle_time = category_settle_time
+        self.rate_limiter = rate_limiter or HostRateLimiter(min_interval=delay_range[0])
+        self.page_cache = page_cache
+        self.category_memo = category_memo
+        self.html_backend = html_backend or HtmlBackend('html.parser')
+        self.breadcrumb_early_stop = breadcrumb_early_stop
+        self.listing_first_timeout = listing_first_timeout
+        self.listing_scroll_timeout = listing_scroll_timeout
+        self.listing_quiet_time = listing_quiet_time
+        self.listing_max_scrolls = listing_max_scrolls
+        self.listing_stall_limit = listing_stall_limit
+        self.category_visits = 0
+        self.category_visits_avoided = 0
+        self.pacing = PacingRun()
+
+        if driver is not None:
+            from selenium.webdriver.support.ui import WebDriverWait
+            self.driver = driver
+            self.wait = WebDriverWait(self.driver, 30)
+            return
+
         print("🚀 Инициализация браузера Wildberries...")
         try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-
             self.driver = self._init_driver(headless)
             from selenium.webdriver.support.ui import WebDriverWait
             self.wait = WebDriverWait(self.driver, 30)
@@ -394,7 +829,8 @@ class WildberriesSellerParser:
             print(f"❌ Ошибка инициализации браузера: {e}")
             self.driver = None
 
-    def _init_driver(self, headless):
+    @classmethod
+    def _init_driver(cls, headless):
         from selenium import webdriver
         from selenium.webdriver.chrome.options import Options
         from selenium.webdriver.chrome.service import Service
@@ -412,7 +848,7 @@ class WildberriesSellerParser:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument(f"--user-agent={random.choice(self.user_agents)}")
+        chrome_options.add_argument(f"--user-agent={random.choice(cls.USER_AGENTS)}")
         chrome_options.add_argument("--lang=ru-RU,ru;q=0.9")
         chrome_options.add_argument("--accept-lang=ru-RU,ru;q=0.9")
 
@@ -427,7 +863,9 @@ class WildberriesSellerParser:
 
         try:
             # Пробуем автоматическую установку драйвера
-            service = Service(ChromeDriverManager().install())
+            if cls._driver_path is None:
+                cls._driver_path = ChromeDriverManager().install()
+            service = Service(cls._driver_path)
             driver = webdriver.Chrome(service=service, options=chrome_options)
 
             driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
@@ -467,18 +905,31 @@ class WildberriesSellerParser:
                 print("3. Убедитесь, что браузер установлен в одной из стандартных папок")
                 raise Exception(f"Не удалось инициализировать браузер. Установите Chrome или Edge. Ошибка: {str(e2)}")
 
-    def _smart_delay(self, custom_range=None):
-        min_d, max_d = custom_range if custom_range else self.delay_range
-        delay = random.uniform(min_d, max_d)
-        print(f"   ⏳ Ожидание {delay:.1f} сек...")
-        time.sleep(delay)
-        return delay
+    def _pace(self, url):
+        """Пауза вежливости перед запросом к хосту url (по rate_limiter)"""
+        return self.pacing.slept(self.rate_limiter.wait(urlparse(url).netloc))
+
+    # Страница-заглушка антибота WB вместо витрины или карточки
+    _BLOCKED_PAGE_JS = """
+        return /captcha|почти готово|доступ ограничен|подозрительн/i.test(document.title + ' ' + location.href);
+    """
+
+    def _page_blocked(self):
+        try:
+            return bool(self.driver.execute_script(self._BLOCKED_PAGE_JS))
+        except Exception:
+            return False
 
-    def parse_seller_products(self, seller_url, max_products=50):
+    def parse_seller_products(self, seller_url, max_products=50, progress=None, known_products=None):
         """
         Парсит все товары продавца или бренда по ссылке.
         Пример ссылки: https://www.wildberries.ru/seller/42582
         Или: https://www.wildberries.ru/brands/fashion-lines
+
+        progress(done, total) — необязательный колбэк хода парсинга карточек.
+        known_products — сохраненные товары (load_known_products): страницы
+        неизменившихся товаров не открываются, категория берется из БД,
+        их ID попадают в self.reused_ids.
         """
         if not self.driver:
             print("❌ Браузер не инициализирован")
@@ -507,13 +958,13 @@ class WildberriesSellerParser:
         all_products = []
 
         try:
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support import expected_conditions as EC
-
-            # 1. Загружаем страницу
+            # 1. Загружаем страницу (появления карточек ждет _wait_and_load_products)
             print(f"\n📥 Загружаю страницу...")
-            self.driver.get(seller_url)
-            self._smart_delay((4, 6))
+            host = urlparse(seller_url).netloc
+            self._pace(seller_url)
+            with self.pacing.fetching():
+                self.driver.get(seller_url)
+            self.pages_loaded += 1
 
             # 2. Ждем загрузки товаров и прокручиваем
             print(f"\n⬇ Загружаю товары...")
@@ -521,36 +972,26 @@ class WildberriesSellerParser:
             print(f"📦 Загружено товаров: {loaded_count}")
 
             if loaded_count == 0:
-                print("❌ Не удалось загрузить товары")
+                blocked = self._page_blocked()
+                self.rate_limiter.failure(host, 'captcha' if blocked else 'empty')
+                print("❌ Не удалось загрузить товары" + (" (страница антибота)" if blocked else ""))
                 return []
+            self.rate_limiter.success(host)
 
             # 3. Получаем HTML
             page_source = self.driver.page_source
 
             # 4. Парсим товары
             print(f"\n🔄 Начинаю парсинг товаров...")
-            all_products = self._parse_products_page_html(page_source, entity_info, max_products)
+            all_products = self._parse_products_page_html(page_source, entity_info, max_products,
+                                                          progress=progress, known_products=known_products)
 
-            # Форматируем для API
-            formatted_products = []
-            for product in all_products:
-                formatted_product = {
-                    "ID": product.get('id', ''),
-                    "NAME": product.get('name', ''),
-                    "BRAND": product.get('brand', ''),
-                    "PRICE": product.get('price', 0),
-                    "RATING": product.get('rating', 0.0),
-                    "CATEGORY": product.get('category', ''),
-                    "URL": product.get('url', ''),
-                    "IMAGE": product.get('image', ''),
-                    "PLATFORM": "wildberries",
-                    "SELLER_ID": seller_id,
-                    "ENTITY_TYPE": entity_type,
-                    "ENTITY_NAME": entity_name
-                }
-                formatted_products.append(formatted_product)
+            pacing = self.pacing.summary()
+            print(f"⏱ Паузы: {pacing['sleep_sec']} сек, загрузка страниц: {pacing['fetch_sec']} сек "
+                  f"({pacing['pages']} стр.) за {pacing['wall_sec']} сек")
 
-            return formatted_products
+            # Форматируем для API
+            return self.format_products(all_products, entity_info)
 
         except Exception as e:
             print(f"\n❌ Ошибка при парсинге Wildberries: {e}")
@@ -558,89 +999,91 @@ class WildberriesSellerParser:
             traceback.print_exc()
             return []
 
-    def _wait_and_load_products(self, max_products):
-        """Ожидает загрузки товаров и прокручивает страницу."""
-        print("   ⏳ Ожидаю загрузки товаров...")
-
-        try:
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support import expected_conditions as EC
-
-            # Ожидаем появления товаров
-            self.wait.until(
-                EC.presence_element_located((By.CSS_SELECTOR,
-                                             "article.product-card, div.product-card, [data-nm-id], .card, .product-card"))
-            )
-        except Exception as e:
-            print(f"   ⚠ Товары не появились, пробую продолжить: {e}")
+    @staticmethod
+    def format_products(products, entity_info):
+        """Приводит товары к формату ответа API (ключи в верхнем регистре)"""
+        if entity_info['type'] == "seller":
+            seller_id = f"wb_seller_{entity_info['id']}"
+        else:
+            seller_id = f"wb_brand_{entity_info['id']}"
+
+        formatted_products = []
+        for product in products:
+            formatted_product = {
+                "ID": product.get('id', ''),
+                "NAME": product.get('name', ''),
+                "BRAND": product.get('brand', ''),
+                "PRICE": product.get('price', 0),
+                "RATING": product.get('rating', 0.0),
+                "CATEGORY": product.get('category', ''),
+                "URL": product.get('url', ''),
+                "IMAGE": product.get('image', ''),
+                "PLATFORM": "wildberries",
+                "SELLER_ID": seller_id,
+                "ENTITY_TYPE": entity_info['type'],
+                "ENTITY_NAME": entity_info['name']
+            }
+            formatted_products.append(formatted_product)
 
-        # Даем время для полной загрузки
-        self._smart_delay((2, 3))
+        return formatted_products
 
-        # Считаем начальное количество товаров
-        try:
-            from selenium.webdriver.common.by import By
+    def _wait_for_cards(self, previous, target, timeout):
+        """Ждет карточки сверх previous (до target) — wb_listing.wait_for_cards"""
+        return wait_for_cards(self.driver, previous, target, self.listing_quiet_time, timeout)
 
-            products = self.driver.find_elements(By.CSS_SELECTOR,
-                                                 "article.product-card, div.product-card, [data-nm-id], .card, .product-card, article[class*='card'], div[class*='card']")
-            last_count = len(products)
-            print(f"   📦 Начальное количество товаров: {last_count}")
-        except Exception as e:
-            print(f"   ⚠ Ошибка при подсчете товаров: {e}")
-            last_count = 0
+    def _wait_and_load_products(self, max_products):
+        """
+        Ожидает карточки товаров и подгружает их прокруткой.
 
-        same_count = 0
-        scroll_attempts = 0
-        max_scrolls = 10
+        Пауз нет: после каждой прокрутки браузер сам сообщает, когда пришли
+        новые карточки и страница затихла (wb_listing.CARD_WATCH_JS), и прокрутка
+        продолжается сразу. Загрузка заканчивается, как только карточек
+        max_products, или после listing_stall_limit прокруток без новых.
+        """
+        print("   ⏳ Ожидаю загрузки товаров...")
+        started = time.monotonic()
 
-        while scroll_attempts < max_scrolls and last_count < max_products:
-            scroll_attempts += 1
+        count, reason = self._wait_for_cards(0, max_products, self.listing_first_timeout)
+        if not count:
+            print(f"   ⚠ Товары не появились ({reason})")
+            return 0
+        print(f"   📦 Начальное количество товаров: {count} ({time.monotonic() - started:.1f} сек)")
 
-            # Прокручиваем
+        stalls = 0
+        scrolls = 0
+        while count < max_products and scrolls < self.listing_max_scrolls:
+            scrolls += 1
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self._smart_delay((2, 3))
-
-            # Считаем товары
-            try:
-                from selenium.webdriver.common.by import By
-
-                products = self.driver.find_elements(By.CSS_SELECTOR,
-                                                     "article.product-card, div.product-card, [data-nm-id], .card, .product-card, article[class*='card'], div[class*='card']")
-                current_count = len(products)
-                print(f"   📍 Прокрутка {scroll_attempts}: {current_count} товаров")
-
-                if current_count == last_count:
-                    same_count += 1
-                    if same_count >= 2:
-                        print("   ✅ Загрузка товаров завершена")
-                        return min(current_count, max_products)
-                else:
-                    same_count = 0
-                    last_count = current_count
-
-                if current_count >= max_products:
-                    print(f"   ✅ Достигнуто максимальное количество: {max_products}")
-                    return max_products
+            current, reason = self._wait_for_cards(count, max_products, self.listing_scroll_timeout)
+            print(f"   📍 Прокрутка {scrolls}: {current} товаров ({reason}, {time.monotonic() - started:.1f} сек)")
 
-            except Exception as e:
-                print(f"   ⚠ Ошибка при подсчете: {e}")
+            if current > count:
+                count = current
+                stalls = 0
+            else:
+                stalls += 1
+                if stalls >= self.listing_stall_limit:
+                    print("   ✅ Загрузка товаров завершена")
+                    break
 
-        return min(last_count, max_products)
+        if count >= max_products:
+            print(f"   ✅ Достигнуто максимальное количество: {max_products}")
+        return min(count, max_products)
 
-    def _parse_products_page_html(self, html_content, entity_info, max_products):
+    def _parse_products_page_html(self, html_content, entity_info, max_products, progress=None,
+                                  known_products=None):
         """Парсит товары со страницы."""
-        from bs4 import BeautifulSoup
-
         products_data = []
-        soup = BeautifulSoup(html_content, 'html.parser')
+        backend = self.html_backend
+        root = backend.parse(html_content)
 
         print(f"   🔎 Поиск товаров...")
 
         # Находим все карточки товаров
-        all_cards = soup.select('article.product-card, div.product-card, [data-nm-id]')
+        all_cards = backend.select(root, 'article.product-card, div.product-card, [data-nm-id]')
 
         if not all_cards:
-            all_cards = soup.select('.product-card, .card, [class*="card"]')
+            all_cards = backend.select(root, '.product-card, .card, [class*="card"]')
 
         if not all_cards:
             print("   ❌ Товары не найдены")
@@ -651,34 +1094,109 @@ class WildberriesSellerParser:
         print(f"   Найдено карточек: {len(all_cards)}")
         print(f"   Обрабатываю: {len(cards_to_process)} товаров\n")
 
+        total = len(cards_to_process)
+        if progress:
+            progress(0, total)
+
         for idx, card in enumerate(cards_to_process, 1):
             try:
                 product_data = self._parse_product_card(card, idx, entity_info)
                 if product_data:
-                    # Получаем категорию с отдельной страницы товара
-                    print(f"   [{idx:3}] 🌐 Перехожу на страницу товара для определения категории...")
-                    category = self._get_category_from_product_page(product_data['url'])
-                    product_data['category'] = category
-
                     products_data.append(product_data)
-
             except Exception as e:
                 print(f"   [{idx}] ⚠ Ошибка: {e}")
                 continue
 
+        # Инкрементальный режим: у товаров, которые не изменились в сетке, категорию берем из БД
+        to_resolve = []
+        for product_data in products_data:
+            if known_products and not product_needs_refresh(known_products, product_data['id'],
+                                                            product_data['price']):
+                product_data['category'] = known_products[product_data['id']]['category'] or 'Не определена'
+                self.reused_ids.add(product_data['id'])
+            else:
+                to_resolve.append(product_data)
+        if known_products:
+            print(f"   ♻️  Без изменений с прошлого парсинга: {len(products_data) - len(to_resolve)} товаров")
+
+        # Категории берем со страниц товаров — грузим их параллельно в нескольких вкладках
+        skipped = total - len(to_resolve)
+        print(f"\n   🌐 Определяю категории: {len(to_resolve)} страниц товаров, "
+              f"до {self.category_concurrency} одновременно...")
+
+        def on_category(done):
+            if progress:
+                progress(skipped + done, total)
+
+        categories = self._resolve_categories_memoized(to_resolve, on_done=on_category)
+        for product_data, category in zip(to_resolve, categories):
+            product_data['category'] = category
+
+        if progress:
+            progress(total, total)
+
         print(f"\n📊 Успешно обработано: {len(products_data)} товаров")
         return products_data
 
+    # Цепочки селекторов полей карточки в сетке: по каждому полю берется первый
+    # селектор, давший подходящее значение. Компилируются один раз, карточка обходится один раз
+    _CARD_EXTRACTOR = CardExtractor({
+        'link': ['a[href*="/catalog/"]'],
+        'name': [
+            'span.goods-name',
+            'a.goods-name',
+            '.product-card__name',
+            '.card__name',
+            '[class*="name"]',
+            '.goods-card__name',
+            '.j-card-name'
+        ],
+        'brand': [
+            'span.brand-name',
+            'a.brand-name',
+            '.product-card__brand',
+            '.card__brand',
+            '[class*="brand"]',
+            '.goods-card__brand',
+            '.j-card-brand'
+        ],
+        'price': [
+            'ins.price-block__final-price',
+            'span.price-block__final-price',
+            '.price__lower-price',
+            '.lower-price',
+            '.final-price',
+            '[class*="price__final"]',
+            '.j-final-price'
+        ],
+        'rating': [
+            'span.rating',
+            '.product-card__rating',
+            '.card__rating',
+            '[class*="rating"]',
+            '.goods-card__rating'
+        ],
+        'image': [
+            'img[src*="images"]',
+            'img[src*="wbxcontent"]',
+            '.product-card__img img',
+            '.card__img img',
+            'img'
+        ],
+    }, collect={'links': 'a[href]'})
+
     def _parse_product_card(self, card, card_number, entity_info):
-        """Парсит карточку товара."""
+        """Парсит карточку товара (BeautifulSoup или selectolax) за один обход ее поддерева."""
+        nodes = nodes_for(card)
+        found, collected = self._CARD_EXTRACTOR.extract(card, nodes)
 
         # Извлекаем ID
-        product_id = card.get('data-nm-id', '')
+        product_id = nodes.attr(card, 'data-nm-id') or ''
 
         if not product_id:
-            link_elem = card.select_one('a[href*="/catalog/"]')
-            if link_elem:
-                href = link_elem.get('href', '')
+            link_elem = found['link'][0]
+            if link_elem is not None:
+                href = nodes.attr(link_elem, 'href') or ''
                 match = re.search(r'/catalog/(\d+)/', href)
                 if match:
                     product_id = match.group(1)
@@ -696,6 +1214,7 @@ class WildberriesSellerParser:
             'rating': 0.0,
             'image': '',
             'category': '',
+            'subject_key': self._extract_subject_key(card, collected['links']),
             'entity_id': entity_info.get('id', ''),
             'entity_type': entity_info.get('type', ''),
             'entity_name': entity_info.get('name', '')
@@ -703,39 +1222,17 @@ class WildberriesSellerParser:
 
         try:
             # 1. НАЗВАНИЕ ТОВАРА
-            name_selectors = [
-                'span.goods-name',
-                'a.goods-name',
-                '.product-card__name',
-                '.card__name',
-                '[class*="name"]',
-                '.goods-card__name',
-                '.j-card-name'
-            ]
-
-            for selector in name_selectors:
-                name_element = card.select_one(selector)
-                if name_element:
-                    name_text = name_element.get_text(strip=True)
+            for name_element in found['name']:
+                if name_element is not None:
+                    name_text = nodes.text(name_element)
                     if name_text and len(name_text) > 2:
                         product_data['name'] = name_text
                         break
 
             # 2. БРЕНД
-            brand_selectors = [
-                'span.brand-name',
-                'a.brand-name',
-                '.product-card__brand',
-                '.card__brand',
-                '[class*="brand"]',
-                '.goods-card__brand',
-                '.j-card-brand'
-            ]
-
-            for selector in brand_selectors:
-                brand_element = card.select_one(selector)
-                if brand_element:
-                    brand_text = brand_element.get_text(strip=True)
+            for brand_element in found['brand']:
+                if brand_element is not None:
+                    brand_text = nodes.text(brand_element)
                     if brand_text:
                         brand_text = re.sub(r'^[^a-zA-Zа-яА-Я]+', '', brand_text)
                         brand_text = re.sub(r'[^a-zA-Zа-яА-Я0-9\s&]+$', '', brand_text)
@@ -743,38 +1240,18 @@ class WildberriesSellerParser:
                         break
 
             # 3. ЦЕНА
-            price_selectors = [
-                'ins.price-block__final-price',
-                'span.price-block__final-price',
-                '.price__lower-price',
-                '.lower-price',
-                '.final-price',
-                '[class*="price__final"]',
-                '.j-final-price'
-            ]
-
-            for selector in price_selectors:
-                price_element = card.select_one(selector)
-                if price_element:
-                    price_text = price_element.get_text(strip=True)
+            for price_element in found['price']:
+                if price_element is not None:
+                    price_text = nodes.text(price_element)
                     price_value = self._extract_price(price_text)
                     if price_value:
                         product_data['price'] = price_value
                         break
 
             # 4. РЕЙТИНГ
-            rating_selectors = [
-                'span.rating',
-                '.product-card__rating',
-                '.card__rating',
-                '[class*="rating"]',
-                '.goods-card__rating'
-            ]
-
-            for selector in rating_selectors:
-                rating_element = card.select_one(selector)
-                if rating_element:
-                    rating_text = rating_element.get_text(strip=True)
+            for rating_element in found['rating']:
+                if rating_element is not None:
+                    rating_text = nodes.text(rating_element)
                     match = re.search(r'[\d,\.]+', rating_text)
                     if match:
                         try:
@@ -784,18 +1261,9 @@ class WildberriesSellerParser:
                     break
 
             # 5. ИЗОБРАЖЕНИЕ
-            img_selectors = [
-                'img[src*="images"]',
-                'img[src*="wbxcontent"]',
-                '.product-card__img img',
-                '.card__img img',
-                'img'
-            ]
-
-            for selector in img_selectors:
-                img_element = card.select_one(selector)
-                if img_element:
-                    src = img_element.get('src') or img_element.get('data-src')
+            for img_element in found['image']:
+                if img_element is not None:
+                    src = nodes.attr(img_element, 'src') or nodes.attr(img_element, 'data-src')
                     if src:
                         if src.startswith('//'):
                             src = 'https:' + src
@@ -822,114 +1290,312 @@ class WildberriesSellerParser:
             print(f"   [{card_number}] ❌ Ошибка парсинга: {e}")
             return None
 
+    _SUBJECT_ATTRS = ('data-subject-id', 'data-subject', 'data-card-subject')
+    _SUBJECT_QUERY_RE = re.compile(r'[?&](?:subject|subjectId|subject_id)=(\d+)')
+    _CATALOG_PATH_RE = re.compile(r'/catalog/((?:[a-z0-9-]*[a-z-][a-z0-9-]*/?)+)')
+
+    @classmethod
+    def _extract_subject_key(cls, card, links):
+        """
+        Предмет WB из карточки в сетке: атрибут subject или ссылка
+        с subject=... / каталожным путем (/catalog/elektronika/...).
+        Товары одного предмета лежат в одной категории. links — ссылки карточки (a[href])
+        """
+        nodes = nodes_for(card)
+        for attr in cls._SUBJECT_ATTRS:
+            value = nodes.attr(card, attr)
+            if value:
+                return f"subject:{value}"
+
+        for link in links:
+            href = nodes.attr(link, 'href') or ''
+            match = cls._SUBJECT_QUERY_RE.search(href)
+            if match:
+                return f"subject:{match.group(1)}"
+            match = cls._CATALOG_PATH_RE.search(href)
+            if match:
+                return f"path:{match.group(1).strip('/')}"
+        return None
+
+    def _resolve_categories_memoized(self, products, on_done=None):
+        """
+        Категории товаров с учетом category_memo. Страница открывается только
+        для товаров, которых нет в памяти, причем по одной на каждый еще не
+        известный предмет — остальные товары предмета получают ее категорию.
+        Все нужные страницы грузятся одним пакетом через _resolve_categories.
+        """
+        if not self.category_memo:
+            self.category_visits += len(products)
+            return self._resolve_categories([p['url'] for p in products], on_done=on_done)
+
+        categories = [None] * len(products)
+        known = self.category_memo.lookup(products)
+
+        groups = {}  # предмет (или сам товар, если предмет неизвестен) -> индексы товаров
+        for idx, product in enumerate(products):
+            if product['id'] in known:
+                categories[idx] = known[product['id']]
+            else:
+                groups.setdefault(product.get('subject_key') or f"product:{product['id']}", []).append(idx)
+
+        from_memo = len(products) - sum(len(indexes) for indexes in groups.values())
+        if from_memo:
+            print(f"   🧠 Категории из памяти: {from_memo} товаров")
+            if on_done:
+                on_done(from_memo)
+
+        representatives = [indexes[0] for indexes in groups.values()]
+
+        def on_visit(visited):
+            if on_done:
+                on_done(from_memo + visited)
+
+        resolved = self._resolve_categories([products[idx]['url'] for idx in representatives], on_done=on_visit)
+
+        product_categories = {}
+        subject_categories = {}
+        for (group_key, indexes), category in zip(groups.items(), resolved):
+            for idx in indexes:
+                categories[idx] = category
+            if category == "Не определена":
+                continue
+            product_categories[products[indexes[0]]['id']] = category
+            if not group_key.startswith('product:'):
+                subject_categories[group_key] = category
+
+        self.category_memo.remember(product_categories, subject_categories)
+
+        avoided = len(products) - len(representatives)
+        self.category_visits += len(representatives)
+        self.category_visits_avoided += avoided
+        self.category_memo.record_visits(len(representatives), avoided)
+        if on_done:
+            on_done(len(products))
+        print(f"   🧠 Страниц товаров открыто: {len(representatives)}, не понадобилось: {avoided}")
+        return categories
+
     def _get_category_from_product_page(self, product_url):
         """Переходит на страницу товара и извлекает категорию."""
+        return self._resolve_categories([product_url])[0]
+
+    def _extract_category_from_html(self, page_source):
+        """Извлекает категорию из хлебных крошек страницы товара."""
         category = "Не определена"
 
-        try:
-            # Открываем новую вкладку для товара
-            original_window = self.driver.current_window_handle
-            self.driver.execute_script("window.open('');")
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+        if self.breadcrumb_early_stop:
+            # Все селекторы ниже требуют breadcrumb в классе: без такой области искать нечего,
+            # иначе разбираем только ее. Если в ней категории не нашлось — вся страница, как раньше
+            fragment = breadcrumb_fragment(page_source)
+            if fragment is None:
+                return category
+            category = self._category_from_breadcrumbs(fragment)
+            if category != "Не определена":
+                return category
+        return self._category_from_breadcrumbs(page_source)
+
+    def _category_from_breadcrumbs(self, html):
+        """Категория по хлебным крошкам в HTML (страница целиком или ее кусок)."""
+        category = "Не определена"
 
-            # Загружаем страницу товара
-            self.driver.get(product_url)
-            self._smart_delay((2, 4))
+        backend = self.html_backend
+        root = backend.parse(html)
+
+        # Ищем хлебные крошки
+        breadcrumb_selectors = [
+            '.breadcrumbs',
+            '.breadcrumb',
+            '.nav-breadcrumbs',
+            '.breadcrumbs__container',
+            '.bread-crumbs',
+            '.catalog-breadcrumbs',
+            '[class*="breadcrumb"]',
+            '[class*="breadcrumbs"]'
+        ]
 
-            # Получаем HTML страницы
-            page_source = self.driver.page_source
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(page_source, 'html.parser')
-
-            # Ищем хлебные крошки
-            breadcrumb_selectors = [
-                '.breadcrumbs',
-                '.breadcrumb',
-                '.nav-breadcrumbs',
-                '.breadcrumbs__container',
-                '.bread-crumbs',
-                '.catalog-breadcrumbs',
-                '[class*="breadcrumb"]',
-                '[class*="breadcrumbs"]'
-            ]
-
-            breadcrumb_found = False
-            breadcrumb_items = []
-
-            # Пробуем найти список элементов хлебных крошек
-            for selector in ['.breadcrumbs__list', '.catalog-breadcrumbs__list', '.breadcrumbs ul', '.breadcrumbs li']:
-                list_items = soup.select(f'{selector} li, {selector} > *')
-                if list_items:
-                    for item in list_items:
-                        text = item.get_text(strip=True)
-                        if text and len(text) > 1:
-                            breadcrumb_items.append(text)
-                    if breadcrumb_items:
+        breadcrumb_found = False
+        breadcrumb_items = []
+
+        # Пробуем найти список элементов хлебных крошек
+        for selector in ['.breadcrumbs__list', '.catalog-breadcrumbs__list', '.breadcrumbs ul', '.breadcrumbs li']:
+            list_items = backend.select(root, f'{selector} li, {selector} > *')
+            if list_items:
+                for item in list_items:
+                    text = backend.text(item)
+                    if text and len(text) > 1:
+                        breadcrumb_items.append(text)
+                if breadcrumb_items:
+                    breadcrumb_found = True
+                    break
+
+        # Если не нашли список, ищем просто текст хлебных крошек
+        if not breadcrumb_found:
+            for selector in breadcrumb_selectors:
+                breadcrumb_elem = backend.select_one(root, selector)
+                if breadcrumb_elem is not None:
+                    breadcrumb_text = backend.text(breadcrumb_elem, separator='>')
+                    if breadcrumb_text:
+                        items = [item.strip() for item in breadcrumb_text.split('>') if item.strip()]
+                        breadcrumb_items = items
                         breadcrumb_found = True
                         break
 
-            # Если не нашли список, ищем просто текст хлебных крошек
-            if not breadcrumb_found:
-                for selector in breadcrumb_selectors:
-                    breadcrumb_elem = soup.select_one(selector)
-                    if breadcrumb_elem:
-                        breadcrumb_text = breadcrumb_elem.get_text(strip=True, separator='>')
-                        if breadcrumb_text:
-                            items = [item.strip() for item in breadcrumb_text.split('>') if item.strip()]
-                            breadcrumb_items = items
-                            breadcrumb_found = True
-                            break
+        # Если нашли хлебные крошки, обрабатываем их
+        if breadcrumb_items:
+            # Фильтруем элементы
+            filtered_items = []
+            for item in breadcrumb_items:
+                excluded_words = [
+                    'Главная', 'Главное', 'Home', 'Каталог', 'Catalog',
+                    'Все товары', 'Все', 'Все категории', 'Поиск',
+                    'реклама', 'промо', 'акция', 'скидка', 'распродажа',
+                    'Wildberries', 'WB', 'Корзина', 'Избранное'
+                ]
 
-            # Если нашли хлебные крошки, обрабатываем их
-            if breadcrumb_items:
-                # Фильтруем элементы
-                filtered_items = []
-                for item in breadcrumb_items:
-                    excluded_words = [
-                        'Главная', 'Главное', 'Home', 'Каталог', 'Catalog',
-                        'Все товары', 'Все', 'Все категории', 'Поиск',
-                        'реклама', 'промо', 'акция', 'скидка', 'распродажа',
-                        'Wildberries', 'WB', 'Корзина', 'Избранное'
-                    ]
-
-                    item_lower = item.lower()
-                    should_exclude = False
-
-                    for word in excluded_words:
-                        if word.lower() in item_lower:
-                            should_exclude = True
-                            break
+                item_lower = item.lower()
+                should_exclude = False
 
-                    if len(item) < 2 or len(item) > 50:
+                for word in excluded_words:
+                    if word.lower() in item_lower:
                         should_exclude = True
+                        break
+
+                if len(item) < 2 or len(item) > 50:
+                    should_exclude = True
+
+                if not should_exclude:
+                    filtered_items.append(item)
+
+            # Определяем категорию
+            if filtered_items:
+                candidates = filtered_items[1:-1] if len(filtered_items) > 2 else filtered_items
+                if candidates:
+                    for candidate in reversed(candidates):
+                        if 3 <= len(candidate) <= 40:
+                            category = candidate
+                            break
+
+        return category
+
+    # Страница считается готовой, когда ушла старая (метка __wbPending пропадает
+    # вместе с документом), загрузилась новая и на ней отрисованы хлебные крошки
+    _CATEGORY_PAGE_STATE_JS = """
+        if (window.__wbPending || document.readyState !== 'complete') { return 'loading'; }
+        if (/captcha|почти готово|доступ ограничен|подозрительн/i.test(document.title + ' ' + location.href)) {
+            return 'blocked';
+        }
+        return document.querySelector('[class*="breadcrumb"]') ? 'ready' : 'loaded';
+    """
 
-                    if not should_exclude:
-                        filtered_items.append(item)
+    def _resolve_categories(self, product_urls, on_done=None):
+        """
+        Определяет категории товаров, загружая их страницы параллельно
+        в category_concurrency вкладках. Навигация запускается без ожидания
+        (location.href), затем вкладки опрашиваются по очереди. Запросы
+        к хосту разводятся rate_limiter'ом, исход каждой загрузки (хлебные
+        крошки, капча, пустая страница) уходит ему же. Страницы из page_cache
+        не загружаются.
+
+        Возвращает категории в порядке product_urls.
+        """
+        categories = ["Не определена"] * len(product_urls)
+        done = 0
+        pending = []
+
+        for idx, url in enumerate(product_urls):
+            html = self.page_cache.get(url) if self.page_cache else None
+            if html is None:
+                pending.append((idx, url))
+                continue
+            categories[idx] = self._extract_category_from_html(html)
+            done += 1
+            print(f"   [{idx + 1:3}] 🏷️ {categories[idx]} (из кэша)")
+            if on_done:
+                on_done(done)
 
-                # Определяем категорию
-                if filtered_items:
-                    candidates = filtered_items[1:-1] if len(filtered_items) > 2 else filtered_items
-                    if candidates:
-                        for candidate in reversed(candidates):
-                            if 3 <= len(candidate) <= 40:
-                                category = candidate
-                                break
+        if not pending:
+            return categories
 
-            # Закрываем вкладку и возвращаемся к основной
-            self.driver.close()
-            self.driver.switch_to.window(original_window)
+        driver = self.driver
+        main_window = driver.current_window_handle
+        pending.reverse()
+        busy = {}     # вкладка -> (индекс товара, время старта загрузки)
+        tabs = []
 
-            return category
+        try:
+            existing = set(driver.window_handles)
+            for _ in range(min(self.category_concurrency, len(pending))):
+                driver.execute_script("window.open('about:blank');")
+            tabs = [h for h in driver.window_handles if h not in existing]
+            free = list(tabs)
+
+            while pending or busy:
+                # Запускаем загрузку во всех свободных вкладках
+                while free and pending:
+                    idx, url = pending.pop()
+                    self._pace(url)
+                    handle = free.pop()
+                    driver.switch_to.window(handle)
+                    driver.execute_script("window.__wbPending = true; window.location.href = arguments[0];", url)
+                    self.pages_loaded += 1
+                    busy[handle] = (idx, time.monotonic())
+
+                time.sleep(0.2)
+
+                # Забираем готовые страницы
+                for handle, (idx, started) in list(busy.items()):
+                    driver.switch_to.window(handle)
+                    try:
+                        state = driver.execute_script(self._CATEGORY_PAGE_STATE_JS)
+                    except Exception:
+                        # Во время смены документа скрипт может упасть — считаем, что грузится
+                        state = 'loading'
+                    elapsed = time.monotonic() - started
+
+                    if state == 'loading' and elapsed < self.category_page_timeout:
+                        continue
+                    if state == 'loaded' and elapsed < min(self.category_settle_time, self.category_page_timeout):
+                        continue
+
+                    self.pacing.fetched(elapsed)
+                    host = urlparse(product_urls[idx]).netloc
+                    if state == 'ready':
+                        self.rate_limiter.success(host)
+                    else:
+                        self.rate_limiter.failure(host, {'blocked': 'captcha', 'loaded': 'empty'}.get(state, 'error'))
+
+                    try:
+                        page_source = driver.page_source
+                        categories[idx] = self._extract_category_from_html(page_source)
+                        # Кэшируем только дорисованные страницы, а не капчу или недогруженный документ
+                        if self.page_cache and state == 'ready':
+                            self.page_cache.put(product_urls[idx], page_source)
+                    except Exception as e:
+                        print(f"       ⚠ Ошибка при получении категории: {e}")
+
+                    del busy[handle]
+                    free.append(handle)
+                    done += 1
+                    print(f"   [{idx + 1:3}] 🏷️ {categories[idx]}")
+                    if on_done:
+                        on_done(done)
 
         except Exception as e:
-            print(f"       ⚠ Ошибка при получении категории: {e}")
+            print(f"       ⚠ Ошибка при получении категорий: {e}")
+
+        finally:
+            # Закрываем вкладки и возвращаемся к основной
+            for handle in tabs:
+                try:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                except Exception:
+                    pass
             try:
-                if len(self.driver.window_handles) > 1:
-                    self.driver.close()
-                    self.driver.switch_to.window(self.driver.window_handles[0])
-            except:
+                driver.switch_to.window(main_window)
+            except Exception:
                 pass
-            return category
+
+        return categories
 
     def _extract_price(self, text):
         """Извлекает цену из текста."""
@@ -945,31 +1611,31 @@ class WildberriesSellerParser:
         return 0
 
     def close(self):
-        """Закрытие браузера."""
+        """Закрытие браузера (браузер из пула не закрывается — его возвращают в пул)."""
         try:
-            if self.driver:
+            if self.driver and self.owns_driver:
                 self.driver.quit()
                 print("✅ Браузер Wildberries закрыт.")
         except:
             pass
 
 
-def create_user(username, email, password):
-    """Создает нового пользователя с хешированным паролем"""
-    try:
-        # Проверяем, что таблица users существует и имеет правильную структуру
-        check_and_fix_table_structure()
+def _create_wb_driver():
+    """Фабрика браузеров для пула: headless Chrome с настройками парсера WB"""
+    print("🚀 Запуск браузера Wildberries для пула...")
+    return WildberriesSellerParser._init_driver(headless=True)
 
-        # Хешируем пароль с помощью Werkzeug
-        password_hash = generate_password_hash(password)
 
-        conn = get_db()
-        with conn.cursor() as cursor:
-            # Проверяем структуру таблицы перед вставкой
-            cursor.execute("DESCRIBE users")
-            columns = cursor.fetchall()
-            print(f"📋 Колонки в таблице users перед вставкой: {[col['Field'] for col in columns]}")
+wb_browser_pool = BrowserPool(_create_wb_driver, **BROWSER_POOL_CONFIG)
+
+
+def create_user(username, email, password):
+    """Создает нового пользователя с хешированным паролем (схему users проверяют миграции при старте)"""
+    try:
+        # Хешируем пароль в пуле процессов
+        password_hash = password_hasher.hash(password)
 
+        with get_db() as conn, conn.cursor() as cursor:
             cursor.execute("""
                 INSERT INTO users (username, email, password_hash)
                 VALUES (%s, %s, %s)
@@ -977,8 +1643,9 @@ def create_user(username, email, password):
             user_id = cursor.lastrowid
             conn.commit()
 
-        conn.close()
         return user_id
+    except HasherBusyError:
+        raise
     except pymysql.err.IntegrityError as e:
         if 'Duplicate entry' in str(e):
             if 'username' in str(e):
@@ -991,10 +1658,13 @@ def create_user(username, email, password):
 
 
 def authenticate_user(username, password):
-    """Аутентифицирует пользователя по логину и паролю"""
+    """
+    Аутентифицирует пользователя по логину и паролю.
+    Хеш, посчитанный не текущим методом, заменяется новым (пароль известен только здесь).
+    HasherBusyError пробрасывается — это не ошибка учетных данных
+    """
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
+        with get_db() as conn, conn.cursor() as cursor:
             # Ищем пользователя по username или email
             cursor.execute("""
                 SELECT id, username, email, password_hash, is_active 
@@ -1004,25 +1674,36 @@ def authenticate_user(username, password):
 
             user = cursor.fetchone()
 
-            if not user:
-                return None, "Пользователь не найден"
+        if not user:
+            return None, "Пользователь не найден"
+
+        if not user['is_active']:
+            return None, "Аккаунт заблокирован"
 
-            if not user['is_active']:
-                return None, "Аккаунт заблокирован"
+        # Проверка пароля — в пуле процессов, соединение с БД на это время не занято
+        if not password_hasher.verify(user['password_hash'], password):
+            return None, "Неверный пароль"
 
-            # Проверяем пароль с помощью check_password_hash
-            if not check_password_hash(user['password_hash'], password):
-                return None, "Неверный пароль"
+        new_hash = password_hasher.hash(password) if password_hasher.needs_rehash(user['password_hash']) else None
 
+        with get_db() as conn, conn.cursor() as cursor:
             # Обновляем время последнего входа
-            cursor.execute("""
-                UPDATE users 
-                SET last_login = CURRENT_TIMESTAMP 
-                WHERE id = %s
-            """, (user['id'],))
+            if new_hash:
+                cursor.execute("""
+                    UPDATE users 
+                    SET last_login = CURRENT_TIMESTAMP, password_hash = %s 
+                    WHERE id = %s
+                """, (new_hash, user['id']))
+            else:
+                cursor.execute("""
+                    UPDATE users 
+                    SET last_login = CURRENT_TIMESTAMP 
+                    WHERE id = %s
+                """, (user['id'],))
             conn.commit()
 
-        conn.close()
+        # В кэше профиль с прежним last_login; токены пользователя остаются в кэше
+        auth_cache.invalidate_user(user['id'])
 
         # Возвращаем пользователя без хеша пароля
         user_data = {
@@ -1032,6 +1713,8 @@ def authenticate_user(username, password):
         }
 
         return user_data, None
+    except HasherBusyError:
+        raise
     except Exception as e:
         return None, f"Ошибка аутентификации: {str(e)}"
 
@@ -1042,6 +1725,7 @@ def generate_token(user_id, username):
         payload = {
             'user_id': user_id,
             'username': username,
+            'iat': int(time.time()),  # токены, выданные до смены пароля, отзываются
             'exp': datetime.utcnow() + timedelta(days=7)  # Токен на 7 дней
         }
         token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
@@ -1051,9 +1735,14 @@ def generate_token(user_id, username):
 
 
 def verify_token(token):
-    """Проверяет JWT токен"""
+    """Проверяет JWT токен (уже проверенные берутся из auth_cache до их exp)"""
+    payload = auth_cache.get_token(token)
+    if payload is not None:
+        return payload, None
+
     try:
         payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        auth_cache.put_token(token, payload)
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, "Токен истек"
@@ -1063,10 +1752,28 @@ def verify_token(token):
         return None, f"Ошибка проверки токена: {str(e)}"
 
 
+def load_user(user_id):
+    """Строка пользователя без хеша пароля или None"""
+    with get_db() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, username, email, created_at, last_login, is_active, password_changed_at
+            FROM users 
+            WHERE id = %s
+        """, (user_id,))
+        return cursor.fetchone()
+
+
+def token_revoked(payload, user):
+    """Токен выдан до последней смены пароля (password_changed_at хранится в UTC)"""
+    changed_at = user.get('password_changed_at')
+    if not changed_at:
+        return False
+    changed_ts = changed_at.replace(tzinfo=timezone.utc).timestamp()
+    return payload.get('iat', 0) < changed_ts
+
+
 def token_required(f):
     """Декоратор для защиты эндпоинтов требующих аутентификации"""
-    from functools import wraps
-
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -1090,10 +1797,32 @@ def token_required(f):
                 'error': error
             }), 401
 
-        # Добавляем данные пользователя в контекст запроса
-        request.user_id = payload['user_id']
-        request.username = payload['username']
-
+        # Строка пользователя — из auth_cache, в БД только при промахе
+        try:
+            user = auth_cache.get_user(payload['user_id'], load_user)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f"Ошибка проверки пользователя: {str(e)}"
+            }), 500
+
+        if not user or not user['is_active']:
+            return jsonify({
+                'success': False,
+                'error': 'Пользователь не найден' if not user else 'Аккаунт заблокирован'
+            }), 401
+
+        if token_revoked(payload, user):
+            return jsonify({
+                'success': False,
+                'error': 'Токен отозван: пароль был изменен, войдите заново'
+            }), 401
+
+        # Добавляем данные пользователя в контекст запроса
+        request.user_id = payload['user_id']
+        request.username = payload['username']
+        request.user = user
+
         return f(*args, **kwargs)
 
     return decorated
@@ -1103,6 +1832,17 @@ def token_required(f):
 # ЭНДПОИНТЫ АУТЕНТИФИКАЦИИ
 # ============================================
 
+def _too_busy(error, retry_after=1, status=503):
+    """Ответ 503/429 с Retry-After"""
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': int(retry_after + 0.999)
+    })
+    response.headers['Retry-After'] = str(int(retry_after + 0.999))
+    return response, status
+
+
 @app.route('/register', methods=['POST'])
 def register():
     """
@@ -1191,6 +1931,8 @@ def register():
             'token': token
         }), 201
 
+    except HasherBusyError as e:
+        return _too_busy(e)
     except Exception as e:
         error_msg = str(e)
         status = 400
@@ -1232,6 +1974,10 @@ def login():
         description: Успешный вход
       401:
         description: Неверные учетные данные
+      429:
+        description: Слишком много попыток входа (см. Retry-After)
+      503:
+        description: Проверка паролей перегружена, повторите позже
     """
     try:
         data = request.get_json()
@@ -1251,15 +1997,26 @@ def login():
                 'error': 'Username и password обязательны'
             }), 400
 
+        # Ограничение попыток: по IP и по логину
+        ip = request.remote_addr or 'unknown'
+        login_key = str(username).lower()
+        retry_after = max(login_limiter.retry_after('ip', ip), login_limiter.retry_after('user', login_key))
+        if retry_after:
+            return _too_busy("Слишком много попыток входа, повторите позже", retry_after, status=429)
+        login_limiter.hit('ip', ip)
+
         # Аутентифицируем пользователя
         user_data, error = authenticate_user(username, password)
 
         if error:
+            login_limiter.hit('user', login_key)
             return jsonify({
                 'success': False,
                 'error': error
             }), 401
 
+        login_limiter.reset('user', login_key)
+
         # Генерируем токен
         token = generate_token(user_data['id'], user_data['username'])
 
@@ -1270,6 +2027,8 @@ def login():
             'token': token
         })
 
+    except HasherBusyError as e:
+        return _too_busy(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1281,6 +2040,376 @@ def login():
 # ЭНДПОИНТЫ ПАРСИНГА
 # ============================================
 
+def ozon_product_to_dict(product, seller_id):
+    """Product из ozon_csv_parser -> товар в формате API/save_to_database"""
+    return {
+        "ID": product.id or '',
+        "NAME": product.name,
+        "BRAND": product.brand or '',
+        "PRICE": product.price or '',
+        "CATEGORY": product.category or '',
+        "SUBCATEGORY": product.subcategory or '',
+        "URL": product.url,
+        "IMAGE": product.images[0] if product.images else '',
+        "RATING": product.rating or '',
+        "FEEDBACKS": product.feedbacks or '',
+        "PLATFORM": "ozon",
+        "SELLER_ID": seller_id
+    }
+
+
+def run_ozon_parse(seller_url, progress=None, incremental=None):
+    """
+    Парсит продавца Ozon и сохраняет товары в БД пачками по мере готовности карточек.
+    Возвращает (тело ответа, HTTP-статус); используется и эндпоинтом, и фоновыми задачами.
+
+    incremental (по умолчанию INCREMENTAL_CONFIG['enabled']) — открывать карточки
+    только новых, подешевевших/подорожавших и устаревших товаров.
+    """
+    try:
+        print(f"🚀 Начинаю парсинг продавца Ozon: {seller_url}")
+
+        # Извлекаем seller_id
+        seller_id = extract_seller_id(seller_url)
+        print(f"📋 Seller ID: {seller_id}")
+
+        if incremental is None:
+            incremental = INCREMENTAL_CONFIG['enabled']
+
+        needs_refresh = None
+        skipped = []
+        if incremental:
+            known = _load_known_products_safe(seller_id, 'ozon')
+            if known:
+                def needs_refresh(item):
+                    if product_needs_refresh(known, item.id, item.price):
+                        return True
+                    skipped.append(item.id)
+                    return False
+
+        # Готовые карточки пишутся в БД пачками, не дожидаясь конца парсинга
+        save_report = {'saved': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+                       'failed': 0, 'chunks': 0, 'errors': []}
+
+        def save_batch(batch):
+            report = save_to_database([ozon_product_to_dict(product, seller_id) for product in batch],
+                                      seller_id, 'ozon')
+            print(f"💾 Сохранена пачка товаров: {report['saved']} из {len(batch)}")
+            for key, value in report.items():
+                save_report[key] += value
+
+        # Парсер Ozon работает в этом же процессе, в общем браузере ozon_runner
+        print("⚡ Запускаю парсер Ozon...")
+        pacing = PacingRun()
+        try:
+            products = ozon_runner.parse_seller(seller_url, progress=progress, needs_refresh=needs_refresh,
+                                                pacing=pacing, on_batch=save_batch, **OZON_PARSER_CONFIG)
+        except ImportError as e:
+            return {
+                'success': False,
+                'error': 'Не установлены зависимости для парсинга Ozon',
+                'instructions': 'Установите зависимости: pip install playwright && playwright install chromium',
+                'details': str(e)
+            }, 500
+
+        if not products and not skipped:
+            return {
+                'success': False,
+                'error': 'Парсер не нашел товаров у продавца'
+            }, 500
+
+        products_json = [ozon_product_to_dict(product, seller_id) for product in products]
+
+        print(f"✅ Спарсено товаров: {len(products_json)}, без изменений: {len(skipped)}, "
+              f"сохранено в БД: {save_report['saved']}")
+        if progress:
+            progress(len(products_json), len(products_json))
+
+        # Возвращаем результат
+        return {
+            'success': True,
+            'message': f'✅ Парсинг Ozon завершен успешно!',
+            'seller_url': seller_url,
+            'seller_id': seller_id,
+            'platform': 'ozon',
+            'total_products': len(products_json),
+            'incremental': needs_refresh is not None,
+            'skipped_unchanged': len(skipped),
+            'pacing': pacing.summary(),
+            'saved_to_db': save_report['saved'],
+            'inserted': save_report['inserted'],
+            'updated': save_report['updated'],
+            'unchanged': save_report['unchanged'],
+            'save_errors': save_report['errors'],
+            'products': products_json[:50]  # Возвращаем первые 50 товаров
+        }, 200
+
+    except concurrent.futures.TimeoutError:
+        return {
+            'success': False,
+            'error': 'Таймаут парсинга (слишком долго)'
+        }, 500
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"❌ Критическая ошибка: {error_details}")
+
+        return {
+            'success': False,
+            'error': str(e),
+            'details': error_details[-500:] if error_details else ''
+        }, 500
+
+
+def _fetch_wb_products_with_browser(seller_url, max_products=50, progress=None, known_products=None):
+    """
+    Парсит товары WB в браузере из пула.
+    Возвращает (товары, сводка, None) или (None, None, (тело ответа с ошибкой, HTTP-статус)).
+    В сводке — ID товаров, взятых из БД без захода на страницу (reused_ids),
+    и сколько страниц товаров открыто / не понадобилось благодаря памяти категорий.
+    """
+    # Берем прогретый браузер из пула (при первом запросе он будет запущен)
+    try:
+        html_backend = get_wb_html_backend()
+        print("🔄 Получаю браузер из пула...")
+        browser = wb_browser_pool.acquire()
+    except ImportError as e:
+        return None, None, ({
+            'success': False,
+            'error': 'Не установлены зависимости для парсинга Wildberries',
+            'instructions': 'Установите зависимости: pip install selenium webdriver-manager beautifulsoup4'
+        }, 500)
+    except BrowserPoolTimeoutError as e:
+        return None, None, ({
+            'success': False,
+            'error': str(e)
+        }, 503)
+    except Exception as e:
+        print(f"❌ Ошибка инициализации браузера: {e}")
+        return None, None, ({
+            'success': False,
+            'error': 'Не удалось инициализировать браузер. Установите Google Chrome или Microsoft Edge.',
+            'details': str(e),
+            'installation_guide': {
+                'chrome': 'https://www.google.com/chrome/',
+                'edge': 'https://www.microsoft.com/edge',
+                'instructions': 'Установите браузер в одну из стандартных папок или укажите путь к нему'
+            }
+        }, 500)
+
+    parser = WildberriesSellerParser(driver=browser.driver, rate_limiter=host_rate_limiter,
+                                     page_cache=page_cache, category_memo=category_memo,
+                                     html_backend=html_backend,
+                                     breadcrumb_early_stop=WB_HTML_CONFIG['breadcrumb_early_stop'],
+                                     **WB_CATEGORY_CONFIG, **WB_LISTING_CONFIG)
+
+    try:
+        # Парсим товары
+        print("🔄 Начинаю парсинг...")
+        products = parser.parse_seller_products(seller_url, max_products, progress=progress,
+                                                known_products=known_products)
+        summary = {
+            'reused_ids': parser.reused_ids,
+            'category_visits': parser.category_visits,
+            'category_visits_avoided': parser.category_visits_avoided,
+            'pacing': parser.pacing.summary(),
+        }
+        return products, summary, None
+
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"❌ Ошибка при парсинге Wildberries: {error_details}")
+
+        return None, None, ({
+            'success': False,
+            'error': str(e),
+            'details': error_details[-500:] if error_details else ''
+        }, 500)
+
+    finally:
+        # Возвращаем браузер в пул; упавший или изношенный браузер пул перезапустит
+        wb_browser_pool.release(browser, pages=parser.pages_loaded)
+
+
+def run_wb_parse(seller_url, max_products=50, progress=None, incremental=None):
+    """
+    Парсит продавца или бренд Wildberries и сохраняет товары в БД.
+    Возвращает (тело ответа, HTTP-статус); используется и эндпоинтом, и фоновыми задачами.
+
+    incremental (по умолчанию INCREMENTAL_CONFIG['enabled']) — в браузере открывать
+    страницы только новых, изменившихся в цене и устаревших товаров. JSON-каталог
+    и так отдает все данные без захода на страницы товаров.
+    """
+    try:
+        print(f"🚀 Начинаю парсинг Wildberries: {seller_url}")
+
+        # Извлекаем информацию о сущности
+        entity_info = extract_wb_entity_info(seller_url)
+        if not entity_info:
+            return {
+                'success': False,
+                'error': 'Не удалось распознать URL Wildberries. Проверьте формат ссылки.'
+            }, 400
+
+        entity_type = entity_info['type']
+        entity_id = entity_info['id']
+        entity_name = entity_info['name']
+
+        # Формируем seller_id для БД
+        if entity_type == "seller":
+            seller_id = f"wb_seller_{entity_id}"
+        else:
+            seller_id = f"wb_brand_{entity_id}"
+
+        print(f"📋 Entity ID: {entity_id}")
+        print(f"📋 Entity Type: {entity_type}")
+        print(f"📋 Entity Name: {entity_name}")
+        print(f"📋 Seller ID для БД: {seller_id}")
+        print(f"📊 Максимальное количество товаров: {max_products}")
+
+        if incremental is None:
+            incremental = INCREMENTAL_CONFIG['enabled']
+
+        products_data = None
+        source = 'browser'
+        browser_summary = {'reused_ids': set(), 'category_visits': 0, 'category_visits_avoided': 0, 'pacing': None}
+
+        # Сначала пробуем JSON-каталог WB: миллисекунды на товар вместо секунд в браузере
+        if WB_FETCH_MODE == 'api':
+            try:
+                print("🔄 Запрашиваю товары через JSON-каталог WB...")
+                products = wb_api_client.fetch_entity_products(entity_info, max_products, progress=progress)
+                products_data = WildberriesSellerParser.format_products(products, entity_info)
+                source = 'api'
+            except (WildberriesBlockedError, requests.RequestException, KeyError, ValueError) as e:
+                print(f"⚠️  JSON-каталог недоступен ({e}), переключаюсь на браузер")
+            else:
+                if not products_data:
+                    print("⚠️  JSON-каталог не вернул товаров, переключаюсь на браузер")
+
+        if not products_data:
+            known = _load_known_products_safe(seller_id, 'wildberries') if incremental else {}
+            products_data, summary, error_response = _fetch_wb_products_with_browser(
+                seller_url, max_products, progress, known_products=known
+            )
+            if error_response:
+                return error_response
+            source = 'browser'
+            browser_summary = summary
+
+        if not products_data:
+            return {
+                'success': False,
+                'error': 'Не удалось получить данные товаров'
+            }, 500
+
+        print(f"✅ Спарсено товаров: {len(products_data)}")
+
+        # Сохраняем в БД
+        print("💾 Сохраняю в базу данных...")
+        save_report = save_to_database(products_data, seller_id, 'wildberries', reused_ids=browser_summary['reused_ids'])
+
+        # Форматируем ответ
+        response_data = {
+            'success': True,
+            'message': f'✅ Парсинг Wildberries завершен успешно!',
+            'seller_url': seller_url,
+            'seller_id': seller_id,
+            'platform': 'wildberries',
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'entity_name': entity_name,
+            'total_products': len(products_data),
+            'source': source,
+            'incremental': source == 'browser' and bool(incremental),
+            'skipped_unchanged': len(browser_summary['reused_ids']),
+            'category_pages_visited': browser_summary['category_visits'],
+            'category_visits_avoided': browser_summary['category_visits_avoided'],
+            'pacing': browser_summary['pacing'],
+            'saved_to_db': save_report['saved'],
+            'inserted': save_report['inserted'],
+            'updated': save_report['updated'],
+            'unchanged': save_report['unchanged'],
+            'save_errors': save_report['errors'],
+            'products': products_data[:50]  # Возвращаем первые 50 товаров
+        }
+
+        # Добавляем статистику
+        if products_data:
+            prices = []
+            for p in products_data:
+                price = p.get('PRICE')
+                if isinstance(price, (int, float)):
+                    prices.append(price)
+                elif isinstance(price, str):
+                    try:
+                        prices.append(float(price))
+                    except:
+                        pass
+
+            ratings = []
+            for p in products_data:
+                rating = p.get('RATING')
+                if isinstance(rating, (int, float)):
+                    ratings.append(rating)
+                elif isinstance(rating, str):
+                    try:
+                        ratings.append(float(rating))
+                    except:
+                        pass
+
+            if prices:
+                response_data['price_stats'] = {
+                    'min': min(prices),
+                    'max': max(prices),
+                    'avg': sum(prices) / len(prices),
+                    'count': len(prices)
+                }
+
+            if ratings:
+                response_data['rating_stats'] = {
+                    'min': min(ratings),
+                    'max': max(ratings),
+                    'avg': sum(ratings) / len(ratings),
+                    'count': len(ratings)
+                }
+
+        return response_data, 200
+
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"❌ Критическая ошибка при парсинге Wildberries: {error_details}")
+
+        return {
+            'success': False,
+            'error': str(e),
+            'details': error_details[-500:] if error_details else ''
+        }, 500
+
+
+def _flag(value):
+    """Булев параметр запроса: true/1/yes"""
+    return value is True or str(value).lower() in ('1', 'true', 'yes')
+
+
+def _ozon_job(params, progress):
+    payload, _ = run_ozon_parse(params['url'], progress=progress,
+                                incremental=False if params.get('full') else None)
+    return payload
+
+
+def _wb_job(params, progress):
+    payload, _ = run_wb_parse(params['url'], params.get('max_products', 50), progress=progress,
+                              incremental=False if params.get('full') else None)
+    return payload
+
+
+job_queue.register('ozon', _ozon_job)
+job_queue.register('wildberries', _wb_job)
+
+
 @app.route('/parse', methods=['GET'])
 def parse_seller():
     """
@@ -1295,6 +2424,12 @@ def parse_seller():
         required: true
         description: URL продавца Ozon
         example: "https://www.ozon.ru/seller/dareu-2265016/"
+      - name: full
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Полный перепарсинг — открыть карточки всех товаров, даже не изменившихся
     responses:
       200:
         description: Результат парсинга в JSON формате
@@ -1313,8 +2448,31 @@ def parse_seller():
               type: string
             total_products:
               type: integer
+            incremental:
+              type: boolean
+              description: Карточки открывались только для новых, изменившихся и устаревших товаров
+            skipped_unchanged:
+              type: integer
+              description: Товары, карточки которых не открывались (цена в сетке не изменилась)
+            pacing:
+              type: object
+              description: Паузы вежливости и загрузка страниц за парсинг (wall_sec, sleep_sec, fetch_sec, pages, sleep_share)
             saved_to_db:
               type: integer
+            inserted:
+              type: integer
+              description: Новые товары
+            updated:
+              type: integer
+              description: Товары, у которых изменились цена/рейтинг/название
+            unchanged:
+              type: integer
+              description: Товары без изменений (строки в БД не трогались)
+            save_errors:
+              type: array
+              description: Пачки/товары, которые не удалось сохранить
+              items:
+                type: object
             products:
               type: array
               items:
@@ -1364,119 +2522,10 @@ def parse_seller():
                 'error': 'Параметр "url" обязателен. Пример: /parse?url=https://www.ozon.ru/seller/dareu-2265016/'
             }), 400
 
-        print(f"🚀 Начинаю парсинг продавца Ozon: {seller_url}")
+        incremental = False if _flag(request.args.get('full')) else None
+        payload, status = run_ozon_parse(seller_url, incremental=incremental)
+        return jsonify(payload), status
 
-        # Извлекаем seller_id
-        seller_id = extract_seller_id(seller_url)
-        print(f"📋 Seller ID: {seller_id}")
-
-        # Шаг 1: Запускаем твой парсер для создания CSV
-        temp_csv = tempfile.NamedTemporaryFile(
-            mode='w',
-            suffix='.csv',
-            delete=False,
-            encoding='utf-8-sig'
-        )
-        temp_csv.close()
-
-        print(f"📁 Создаю временный CSV: {temp_csv.name}")
-
-        # Запускаем ozon_csv_parser.py
-        cmd = [
-            'python', 'ozon_csv_parser.py',
-            '-s', seller_url,
-            '-o', temp_csv.name
-        ]
-
-        print(f"⚡ Запускаю парсер: {' '.join(cmd)}")
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            timeout=300  # 5 минут таймаут
-        )
-
-        print(f"📊 Статус парсера: {result.returncode}")
-        if result.stdout:
-            print(f"📝 Вывод парсера: {result.stdout[:500]}...")
-        if result.stderr:
-            print(f"⚠️ Ошибки парсера: {result.stderr[:500]}...")
-
-        # Проверяем, создался ли CSV файл
-        if not os.path.exists(temp_csv.name) or os.path.getsize(temp_csv.name) == 0:
-            return jsonify({
-                'success': False,
-                'error': 'Парсер не создал CSV файл',
-                'parser_output': result.stdout,
-                'parser_error': result.stderr
-            }), 500
-
-        # Шаг 2: Конвертируем CSV в JSON (как в process_products.py)
-        print("🔄 Конвертирую CSV в JSON...")
-
-        # Читаем CSV и создаем JSON структуру
-        products_json = []
-        with open(temp_csv.name, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-
-            # Авто-поиск колонки ID
-            columns = reader.fieldnames
-            id_col = None
-
-            for col in columns:
-                if "id" in col.lower():
-                    id_col = col
-                    break
-
-            if id_col is None:
-                id_col = columns[0] if columns else 'id'
-
-            for row in reader:
-                product = {
-                    "ID": row.get(id_col, ''),
-                    "NAME": row.get("name", row.get("title", "")),
-                    "BRAND": row.get("brand", ""),
-                    "PRICE": row.get("price", ""),
-                    "SUBCATEGORY": row.get("subcategory", row.get("category", "")),
-                    "URL": row.get("url", ""),
-                    "RATING": row.get("rating", ""),
-                    "FEEDBACKS": row.get("feedbacks", ""),
-                    "PLATFORM": "ozon",
-                    "SELLER_ID": seller_id
-                }
-                products_json.append(product)
-
-        print(f"✅ Спарсено товаров: {len(products_json)}")
-
-        # Шаг 3: Сохраняем в БД
-        print("💾 Сохраняю в базу данных...")
-        saved_count = save_to_database(products_json, seller_id, 'ozon')
-
-        # Шаг 4: Очищаем временные файлы
-        try:
-            os.unlink(temp_csv.name)
-        except:
-            pass
-
-        # Возвращаем результат
-        return jsonify({
-            'success': True,
-            'message': f'✅ Парсинг Ozon завершен успешно!',
-            'seller_url': seller_url,
-            'seller_id': seller_id,
-            'platform': 'ozon',
-            'total_products': len(products_json),
-            'saved_to_db': saved_count,
-            'products': products_json[:50]  # Возвращаем первые 50 товаров
-        })
-
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'error': 'Таймаут парсинга (слишком долго)'
-        }), 500
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -1509,6 +2558,12 @@ def parse_wildberries():
         required: false
         default: 50
         description: Максимальное количество товаров для парсинга
+      - name: full
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Полный перепарсинг — открыть карточки всех товаров, даже не изменившихся
     responses:
       200:
         description: Результат парсинга в JSON формате
@@ -1533,8 +2588,41 @@ def parse_wildberries():
               type: string
             total_products:
               type: integer
+            source:
+              type: string
+              enum: [api, browser]
+              description: Откуда получены товары — JSON-каталог WB или браузер
+            incremental:
+              type: boolean
+              description: Карточки открывались только для новых, изменившихся и устаревших товаров
+            skipped_unchanged:
+              type: integer
+              description: Товары, карточки которых не открывались (цена в сетке не изменилась)
+            category_pages_visited:
+              type: integer
+              description: Страниц товаров открыто ради категории (браузерный режим)
+            category_visits_avoided:
+              type: integer
+              description: Страниц товаров, которые не пришлось открывать благодаря памяти категорий
+            pacing:
+              type: object
+              description: Паузы вежливости и загрузка страниц за парсинг в браузере (null для JSON-каталога)
             saved_to_db:
               type: integer
+            inserted:
+              type: integer
+              description: Новые товары
+            updated:
+              type: integer
+              description: Товары, у которых изменились цена/рейтинг/название
+            unchanged:
+              type: integer
+              description: Товары без изменений (строки в БД не трогались)
+            save_errors:
+              type: array
+              description: Пачки/товары, которые не удалось сохранить
+              items:
+                type: object
             products:
               type: array
               items:
@@ -1614,160 +2702,242 @@ def parse_wildberries():
                 'error': 'Параметр "url" обязателен. Пример: /parse-wb?url=https://www.wildberries.ru/seller/42582'
             }), 400
 
-        print(f"🚀 Начинаю парсинг Wildberries: {seller_url}")
+        incremental = False if _flag(request.args.get('full')) else None
+        payload, status = run_wb_parse(seller_url, max_products, incremental=incremental)
+        return jsonify(payload), status
 
-        # Извлекаем информацию о сущности
-        entity_info = extract_wb_entity_info(seller_url)
-        if not entity_info:
-            return jsonify({
-                'success': False,
-                'error': 'Не удалось распознать URL Wildberries. Проверьте формат ссылки.'
-            }), 400
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"❌ Критическая ошибка в эндпоинте /parse-wb: {error_details}")
 
-        entity_type = entity_info['type']
-        entity_id = entity_info['id']
-        entity_name = entity_info['name']
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'details': error_details[-500:] if error_details else ''
+        }), 500
 
-        # Формируем seller_id для БД
-        if entity_type == "seller":
-            seller_id = f"wb_seller_{entity_id}"
-        else:
-            seller_id = f"wb_brand_{entity_id}"
 
-        print(f"📋 Entity ID: {entity_id}")
-        print(f"📋 Entity Type: {entity_type}")
-        print(f"📋 Entity Name: {entity_name}")
-        print(f"📋 Seller ID для БД: {seller_id}")
-        print(f"📊 Максимальное количество товаров: {max_products}")
+# ============================================
+# ФОНОВЫЕ ЗАДАЧИ ПАРСИНГА
+# ============================================
 
-        # Проверяем, установлен ли Chrome
-        try:
-            # Создаем парсер Wildberries
-            print("🔄 Инициализирую парсер Wildberries...")
-            parser = WildberriesSellerParser(headless=True)
+def _job_params():
+    """Параметры задачи из JSON тела или query строки"""
+    data = request.get_json(silent=True) or {}
+    params = dict(request.args)
+    params.update(data)
+    return params
 
-            if not parser.driver:
-                return jsonify({
-                    'success': False,
-                    'error': 'Не удалось инициализировать браузер. Установите Google Chrome или Microsoft Edge.',
-                    'installation_guide': {
-                        'chrome': 'https://www.google.com/chrome/',
-                        'edge': 'https://www.microsoft.com/edge',
-                        'instructions': 'Установите браузер в одну из стандартных папок или укажите путь к нему'
-                    }
-                }), 500
 
-            try:
-                # Парсим товары
-                print("🔄 Начинаю парсинг...")
-                products_data = parser.parse_seller_products(seller_url, max_products)
+def _submit_job(kind, params):
+    try:
+        job_id = job_queue.submit(kind, params)
+    except QueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
 
-                if not products_data:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Не удалось получить данные товаров'
-                    }), 500
-
-                print(f"✅ Спарсено товаров: {len(products_data)}")
-
-                # Сохраняем в БД
-                print("💾 Сохраняю в базу данных...")
-                saved_count = save_to_database(products_data, seller_id, 'wildberries')
-
-                # Форматируем ответ
-                response_data = {
-                    'success': True,
-                    'message': f'✅ Парсинг Wildberries завершен успешно!',
-                    'seller_url': seller_url,
-                    'seller_id': seller_id,
-                    'platform': 'wildberries',
-                    'entity_type': entity_type,
-                    'entity_id': entity_id,
-                    'entity_name': entity_name,
-                    'total_products': len(products_data),
-                    'saved_to_db': saved_count,
-                    'products': products_data[:50]  # Возвращаем первые 50 товаров
-                }
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': JobQueue.STATUS_QUEUED,
+        'status_url': f'/jobs/{job_id}'
+    }), 202
 
-                # Добавляем статистику
-                if products_data:
-                    prices = []
-                    for p in products_data:
-                        price = p.get('PRICE')
-                        if isinstance(price, (int, float)):
-                            prices.append(price)
-                        elif isinstance(price, str):
-                            try:
-                                prices.append(float(price))
-                            except:
-                                pass
-
-                    ratings = []
-                    for p in products_data:
-                        rating = p.get('RATING')
-                        if isinstance(rating, (int, float)):
-                            ratings.append(rating)
-                        elif isinstance(rating, str):
-                            try:
-                                ratings.append(float(rating))
-                            except:
-                                pass
-
-                    if prices:
-                        response_data['price_stats'] = {
-                            'min': min(prices),
-                            'max': max(prices),
-                            'avg': sum(prices) / len(prices),
-                            'count': len(prices)
-                        }
 
-                    if ratings:
-                        response_data['rating_stats'] = {
-                            'min': min(ratings),
-                            'max': max(ratings),
-                            'avg': sum(ratings) / len(ratings),
-                            'count': len(ratings)
-                        }
+@app.route('/parse', methods=['POST'])
+def parse_seller_async():
+    """
+    Поставить парсинг продавца Ozon в очередь
+    ---
+    tags:
+      - Парсинг
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - url
+          properties:
+            url:
+              type: string
+              example: "https://www.ozon.ru/seller/dareu-2265016/"
+            full:
+              type: boolean
+              default: false
+              description: Полный перепарсинг без инкрементального режима
+    responses:
+      202:
+        description: Задача поставлена в очередь, статус — GET /jobs/{job_id}
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            job_id:
+              type: string
+            status:
+              type: string
+            status_url:
+              type: string
+      400:
+        description: Отсутствует URL
+      503:
+        description: Очередь задач заполнена
+    """
+    try:
+        params = _job_params()
+        seller_url = params.get('url')
 
-                return jsonify(response_data)
+        if not seller_url:
+            return jsonify({
+                'success': False,
+                'error': 'Параметр "url" обязателен'
+            }), 400
 
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"❌ Ошибка при парсинге Wildberries: {error_details}")
+        return _submit_job('ozon', {'url': seller_url, 'full': _flag(params.get('full'))})
 
-                return jsonify({
-                    'success': False,
-                    'error': str(e),
-                    'details': error_details[-500:] if error_details else ''
-                }), 500
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
-            finally:
-                # Закрываем парсер
-                parser.close()
 
-        except ImportError as e:
+@app.route('/parse-wb', methods=['POST'])
+def parse_wildberries_async():
+    """
+    Поставить парсинг продавца или бренда Wildberries в очередь
+    ---
+    tags:
+      - Парсинг
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - url
+          properties:
+            url:
+              type: string
+              example: "https://www.wildberries.ru/seller/42582"
+            max_products:
+              type: integer
+              default: 50
+            full:
+              type: boolean
+              default: false
+              description: Полный перепарсинг без инкрементального режима
+    responses:
+      202:
+        description: Задача поставлена в очередь, статус — GET /jobs/{job_id}
+      400:
+        description: Отсутствует или не распознан URL
+      503:
+        description: Очередь задач заполнена
+    """
+    try:
+        params = _job_params()
+        seller_url = params.get('url')
+
+        if not seller_url:
             return jsonify({
                 'success': False,
-                'error': 'Не установлены зависимости для парсинга Wildberries',
-                'instructions': 'Установите зависимости: pip install selenium webdriver-manager beautifulsoup4'
-            }), 500
-        except Exception as e:
+                'error': 'Параметр "url" обязателен'
+            }), 400
+
+        if not extract_wb_entity_info(seller_url):
             return jsonify({
                 'success': False,
-                'error': f'Ошибка инициализации парсера: {str(e)}',
-                'chrome_install_guide': 'Установите Google Chrome: https://www.google.com/chrome/'
-            }), 500
+                'error': 'Не удалось распознать URL Wildberries. Проверьте формат ссылки.'
+            }), 400
+
+        try:
+            max_products = int(params.get('max_products', 50))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'max_products должен быть числом'
+            }), 400
+
+        return _submit_job('wildberries', {'url': seller_url, 'max_products': max_products,
+                                           'full': _flag(params.get('full'))})
 
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"❌ Критическая ошибка в эндпоинте /parse-wb: {error_details}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Статус фоновой задачи парсинга
+    ---
+    tags:
+      - Парсинг
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Состояние задачи
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            job:
+              type: object
+              properties:
+                job_id:
+                  type: string
+                kind:
+                  type: string
+                status:
+                  type: string
+                  enum: [queued, running, done, failed]
+                progress:
+                  type: object
+                  properties:
+                    done:
+                      type: integer
+                    total:
+                      type: integer
+                result:
+                  type: object
+                error:
+                  type: string
+      404:
+        description: Задача не найдена
+    """
+    try:
+        job = job_queue.get(job_id)
 
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Задача не найдена'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+
+    except Exception as e:
         return jsonify({
             'success': False,
-            'error': str(e),
-            'details': error_details[-500:] if error_details else ''
+            'error': str(e)
         }), 500
 
 
@@ -1812,27 +2982,10 @@ def get_profile():
         description: Неавторизован
     """
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, username, email, created_at, last_login, is_active
-                FROM users 
-                WHERE id = %s
-            """, (request.user_id,))
-
-            user = cursor.fetchone()
-
-        conn.close()
-
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'Пользователь не найден'
-            }), 404
-
+        # Строку пользователя уже загрузил token_required (из auth_cache)
         return jsonify({
             'success': True,
-            'user': user
+            'user': request.user
         })
 
     except Exception as e:
@@ -1847,6 +3000,7 @@ def get_profile():
 def change_password():
     """
     Изменить пароль пользователя
+    Все ранее выданные токены пользователя перестают действовать — нужно войти заново.
     ---
     tags:
       - Аутентификация
@@ -1903,9 +3057,7 @@ def change_password():
                 'error': 'Новый пароль должен содержать минимум 6 символов'
             }), 400
 
-        # Проверяем текущий пароль
-        conn = get_db()
-        with conn.cursor() as cursor:
+        with get_db() as conn, conn.cursor() as cursor:
             cursor.execute("""
                 SELECT password_hash 
                 FROM users 
@@ -1914,39 +3066,125 @@ def change_password():
 
             result = cursor.fetchone()
 
-            if not result:
-                conn.close()
-                return jsonify({
-                    'success': False,
-                    'error': 'Пользователь не найден'
-                }), 404
+        if not result:
+            return jsonify({
+                'success': False,
+                'error': 'Пользователь не найден'
+            }), 404
+
+        # Проверяем текущий пароль
+        if not password_hasher.verify(result['password_hash'], current_password):
+            return jsonify({
+                'success': False,
+                'error': 'Неверный текущий пароль'
+            }), 401
+
+        # Хешируем и сохраняем новый пароль
+        new_password_hash = password_hasher.hash(new_password)
+
+        with get_db() as conn, conn.cursor() as cursor:
+            # Токены с iat раньше этого момента token_required больше не принимает
+            cursor.execute("""
+                UPDATE users 
+                SET password_hash = %s, password_changed_at = %s 
+                WHERE id = %s
+            """, (new_password_hash, datetime.utcnow().replace(microsecond=0), request.user_id))
+
+            conn.commit()
+
+        auth_cache.invalidate_user(request.user_id)
+
+        return jsonify({
+            'success': True,
+            'message': 'Пароль успешно изменен'
+        })
+
+    except HasherBusyError as e:
+        return _too_busy(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/deactivate', methods=['POST'])
+@token_required
+def deactivate_account():
+    """
+    Заблокировать свой аккаунт
+    ---
+    tags:
+      - Аутентификация
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - password
+          properties:
+            password:
+              type: string
+    responses:
+      200:
+        description: Аккаунт заблокирован, токены пользователя больше не принимаются
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            message:
+              type: string
+      401:
+        description: Неверный пароль
+    """
+    try:
+        data = request.get_json()
+        password = (data or {}).get('password')
+
+        if not password:
+            return jsonify({
+                'success': False,
+                'error': 'Требуется пароль'
+            }), 400
+
+        with get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT password_hash 
+                FROM users 
+                WHERE id = %s
+            """, (request.user_id,))
 
-            # Проверяем текущий пароль
-            if not check_password_hash(result['password_hash'], current_password):
-                conn.close()
-                return jsonify({
-                    'success': False,
-                    'error': 'Неверный текущий пароль'
-                }), 401
+            result = cursor.fetchone()
 
-            # Хешируем и сохраняем новый пароль
-            new_password_hash = generate_password_hash(new_password)
+        if not result or not password_hasher.verify(result['password_hash'], password):
+            return jsonify({
+                'success': False,
+                'error': 'Неверный пароль'
+            }), 401
 
+        with get_db() as conn, conn.cursor() as cursor:
             cursor.execute("""
                 UPDATE users 
-                SET password_hash = %s 
+                SET is_active = FALSE 
                 WHERE id = %s
-            """, (new_password_hash, request.user_id))
+            """, (request.user_id,))
 
             conn.commit()
 
-        conn.close()
+        auth_cache.invalidate_user(request.user_id)
 
         return jsonify({
             'success': True,
-            'message': 'Пароль успешно изменен'
+            'message': 'Аккаунт заблокирован'
         })
 
+    except HasherBusyError as e:
+        return _too_busy(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1958,7 +3196,181 @@ def change_password():
 # ОБЩИЕ ЭНДПОИНТЫ
 # ============================================
 
+# Колонки products, которые можно запросить через fields=
+PRODUCT_LIST_FIELDS = ('id', 'seller_id', 'external_id', 'title', 'brand', 'category', 'price', 'platform',
+                       'rating', 'image_url', 'product_url', 'created_at', 'scraped_at')
+
+PRODUCT_STREAM_FORMATS = ('ndjson', 'json-stream')
+
+PRODUCT_COUNT_MODES = ('estimate', 'exact', 'none')
+
+# Наибольшая страница format=json (выборка держится в памяти); потоковые форматы не ограничены
+PRODUCT_MAX_PAGE_SIZE = 1000
+
+# Фильтры, которые сводка seller_stats не покрывает
+PRODUCT_NON_COUNTER_FILTERS = ('category', 'brand', 'price_min', 'price_max', 'rating_min', 'q')
+
+
+def _parse_product_fields(value):
+    """Список колонок из fields=a,b,c; None — все колонки. Неизвестная колонка — ValueError"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PRODUCT_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(PRODUCT_LIST_FIELDS)}")
+    return list(dict.fromkeys(fields))
+
+
+def _encode_products_cursor(row):
+    """Курсор keyset-пагинации: (created_at, id) последнего товара страницы"""
+    raw = f"{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_products_cursor(value):
+    """(created_at, id) из курсора. Испорченный курсор — ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный cursor: {e}")
+
+
+def _products_filters(args):
+    """
+    WHERE для /products из query-параметров. Возвращает (sql, params).
+    Некорректное значение фильтра — ValueError.
+    """
+    where = " WHERE 1=1"
+    params = []
+
+    for name, column in (('seller_id', 'seller_id'), ('platform', 'platform'),
+                         ('category', 'category'), ('brand', 'brand')):
+        value = args.get(name)
+        if value:
+            where += f" AND {column} = %s"
+            params.append(value)
+
+    for name, condition in (('price_min', 'price >= %s'), ('price_max', 'price <= %s'),
+                            ('rating_min', 'rating >= %s')):
+        value = args.get(name)
+        if value not in (None, ''):
+            try:
+                params.append(float(value))
+            except ValueError:
+                raise ValueError(f"{name} должен быть числом")
+            where += f" AND {condition}"
+
+    text = (args.get('q') or '').strip()
+    if text:
+        # Полнотекстовый индекс ft_title; каждое слово — префикс (мыш* найдет «мышь», «мышка»)
+        # Операторы BOOLEAN MODE (+ - * " и т.п.) из запроса пользователя не пропускаем
+        words = re.findall(r'\w+', text)
+        if words:
+            where += " AND MATCH(title) AGAINST(%s IN BOOLEAN MODE)"
+            params.append(' '.join(f"+{word}*" for word in words))
+
+    return where, params
+
+
+def _stream_rows(query, params):
+    """
+    Строки запроса по одной через серверный курсор (SSDictCursor): результат
+    не собирается в память ни на стороне MySQL-клиента, ни в Python.
+    """
+    conn = db_pool.acquire()
+    finished = False
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        cursor.execute(query, params)
+        for row in cursor:
+            yield row
+        cursor.close()
+        finished = True
+    finally:
+        # Недочитанный результат (клиент отключился, ошибка) дешевле закрыть
+        # вместе с соединением, чем дочитывать с сервера
+        db_pool.release(conn, broken=not finished)
+
+
+def _stream_products_response(query, params, output_format, limit=None):
+    """Потоковый ответ /products: NDJSON (строка на товар) или JSON, отдаваемый частями"""
+    dumps = app.json.dumps
+
+    def generate_ndjson():
+        try:
+            for row in _stream_rows(query, params):
+                yield dumps(row) + '\n'
+        except Exception as e:
+            print(f"❌ Ошибка потоковой выдачи товаров: {e}")
+            yield dumps({'success': False, 'error': str(e)}) + '\n'
+
+    def generate_json():
+        count = 0
+        last_row = None
+        yield '{"success": true, "products": ['
+        try:
+            for row in _stream_rows(query, params):
+                yield (',' if count else '') + dumps(row)
+                count += 1
+                last_row = row
+        except Exception as e:
+            # Статус уже отправлен — сообщаем об ошибке в теле
+            print(f"❌ Ошибка потоковой выдачи товаров: {e}")
+            yield f'], "count": {count}, "error": {dumps(str(e))}}}'
+            return
+        next_cursor = _encode_products_cursor(last_row) if limit and count == limit else None
+        yield f'], "count": {count}, "next_cursor": {dumps(next_cursor)}}}'
+
+    if output_format == 'ndjson':
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json()), mimetype='application/json')
+
+
+def cached_response(scope_params=()):
+    """
+    Декоратор: кэширует JSON-ответ 200 эндпоинта в response_cache и отдает ETag.
+    scope_params — параметры запроса (seller_id, platform), по которым ответ
+    сбрасывается при записи товаров. Потоковые ответы не кэшируются.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if response_cache is None:
+                return f(*args, **kwargs)
+
+            key = ResponseCache.make_key(request.endpoint, request.args)
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, etag = cached
+                response = Response(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                generation = response_cache.generation()
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                scope = ResponseCache.scope(*(request.args.get(name) for name in scope_params))
+                response_cache.put(key, scope, body, etag, generation)
+                response.headers['X-Cache'] = 'MISS'
+
+            response.set_etag(etag)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                response_cache.record_not_modified()
+            return response
+
+        return decorated
+
+    return decorator
+
+
 @app.route('/products', methods=['GET'])
+@cached_response(scope_params=('seller_id', 'platform'))
 def get_products():
     """
     Получить все товары из базы данных
@@ -1976,12 +3388,79 @@ def get_products():
         type: string
         required: false
         description: Платформа (ozon, wildberries)
+      - name: category
+        in: query
+        type: string
+        required: false
+        description: Категория (точное совпадение)
+      - name: brand
+        in: query
+        type: string
+        required: false
+        description: Бренд (точное совпадение)
+      - name: price_min
+        in: query
+        type: number
+        required: false
+        description: Цена от
+      - name: price_max
+        in: query
+        type: number
+        required: false
+        description: Цена до
+      - name: rating_min
+        in: query
+        type: number
+        required: false
+        description: Рейтинг не ниже
+      - name: q
+        in: query
+        type: string
+        required: false
+        description: Поиск по названию (слова по префиксу, все должны встречаться)
       - name: limit
         in: query
         type: integer
         required: false
         default: 100
-        description: Максимальное количество товаров
+        minimum: 1
+        description: >
+          Максимальное количество товаров (размер страницы). Для format=json
+          не больше 1000, потоковые форматы не ограничены
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: >
+          Курсор следующей страницы (next_cursor из предыдущего ответа).
+          Страницы идут по (created_at, id) от новых к старым и не замедляются с глубиной, в отличие от OFFSET
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Колонки через запятую (по умолчанию все), например id,title,price
+      - name: count
+        in: query
+        type: string
+        required: false
+        enum: [estimate, exact, none]
+        default: estimate
+        description: >
+          Как считать total. estimate — по счетчикам продавцов (точно для фильтров
+          seller_id/platform) или по оценке плана запроса для остальных фильтров;
+          exact — COUNT(*) по всем фильтрам; none — не считать.
+          Итоги кэшируются до следующего сохранения товаров
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [json, ndjson, json-stream]
+        default: json
+        description: >
+          json — обычный ответ с total;
+          ndjson — поток, по товару в строке (application/x-ndjson), без next_cursor;
+          json-stream — тот же JSON-объект, отдаваемый частями по мере чтения из БД (без total).
+          Потоковые режимы не держат выборку в памяти и подходят для больших limit
     responses:
       200:
         description: Список товаров
@@ -1992,61 +3471,108 @@ def get_products():
               type: boolean
             total:
               type: integer
+            total_is_estimate:
+              type: boolean
+              description: total — оценка (count=estimate с фильтрами кроме seller_id/platform)
             count:
               type: integer
+            next_cursor:
+              type: string
+              description: Курсор следующей страницы (null — страниц больше нет)
             products:
               type: array
               items:
                 type: object
+      304:
+        description: Ответ не изменился (If-None-Match совпал с ETag)
+      400:
+        description: >
+          Неизвестное поле в fields, неизвестный format или count, некорректный фильтр,
+          cursor или limit меньше 1
       500:
         description: Ошибка сервера
     """
     try:
-        seller_id = request.args.get('seller_id')
-        platform = request.args.get('platform')
         limit = request.args.get('limit', 100, type=int)
+        output_format = request.args.get('format', 'json')
+        count_mode = request.args.get('count', 'estimate')
+
+        if limit < 1:
+            return jsonify({
+                'success': False,
+                'error': 'limit должен быть не меньше 1'
+            }), 400
+        if output_format == 'json':
+            limit = min(limit, PRODUCT_MAX_PAGE_SIZE)
 
-        conn = get_db()
-        with conn.cursor() as cursor:
-            # Строим запрос в зависимости от параметров
-            query = "SELECT * FROM products WHERE 1=1"
-            params = []
+        if count_mode not in PRODUCT_COUNT_MODES:
+            return jsonify({
+                'success': False,
+                'error': f"Неизвестный count: {count_mode}. Доступны: {', '.join(PRODUCT_COUNT_MODES)}"
+            }), 400
 
-            if seller_id:
-                query += " AND seller_id = %s"
-                params.append(seller_id)
+        if output_format not in ('json',) + PRODUCT_STREAM_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Неизвестный format: {output_format}. Доступны: json, {', '.join(PRODUCT_STREAM_FORMATS)}"
+            }), 400
 
-            if platform:
-                query += " AND platform = %s"
-                params.append(platform)
+        # Строим условия в зависимости от параметров
+        try:
+            fields = _parse_product_fields(request.args.get('fields'))
+            where, where_params = _products_filters(request.args)
+            cursor_value = request.args.get('cursor')
+            page_after = _decode_products_cursor(cursor_value) if cursor_value else None
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
 
-            query += " ORDER BY created_at DESC LIMIT %s"
-            params.append(limit)
+        # Для курсора нужны created_at и id, даже если их не просили в fields
+        if fields:
+            fields += [column for column in ('id', 'created_at') if column not in fields]
+        columns = ', '.join(fields) if fields else '*'
 
-            cursor.execute(query, params)
-            products = cursor.fetchall()
+        # Keyset-пагинация: следующая страница начинается сразу после (created_at, id)
+        # последнего товара предыдущей, по индексам (..., created_at, id) без OFFSET
+        page_where, page_params = where, list(where_params)
+        if page_after:
+            created_at, last_id = page_after
+            page_where += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+            page_params += [created_at, created_at, last_id]
 
-            # Получаем общее количество
-            count_query = "SELECT COUNT(*) as total FROM products WHERE 1=1"
-            count_params = []
+        query = f"SELECT {columns} FROM products{page_where} ORDER BY created_at DESC, id DESC LIMIT %s"
 
-            if seller_id:
-                count_query += " AND seller_id = %s"
-                count_params.append(seller_id)
+        if output_format in PRODUCT_STREAM_FORMATS:
+            return _stream_products_response(query, page_params + [limit], output_format, limit=limit)
 
-            if platform:
-                count_query += " AND platform = %s"
-                count_params.append(platform)
+        with get_db() as conn, conn.cursor() as cursor:
+            # Одна лишняя строка показывает, есть ли следующая страница
+            cursor.execute(query, page_params + [limit + 1])
+            products = cursor.fetchall()
 
-            cursor.execute(count_query, count_params)
-            total = cursor.fetchone()['total']
+        # Общее количество — без второго полного прохода по products
+        total, total_is_estimate = None, False
+        if count_mode == 'exact':
+            total = product_counts.exact(where, where_params)
+        elif count_mode == 'estimate':
+            if any(request.args.get(name) for name in PRODUCT_NON_COUNTER_FILTERS):
+                total, total_is_estimate = product_counts.estimate(where, where_params), True
+            else:
+                total = product_counts.from_counters(request.args.get('seller_id'), request.args.get('platform'))
 
-        conn.close()
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_cursor = _encode_products_cursor(products[-1])
 
         return jsonify({
             'success': True,
             'total': total,
+            'total_is_estimate': total_is_estimate,
             'count': len(products),
+            'next_cursor': next_cursor,
             'products': products
         })
 
@@ -2058,9 +3584,10 @@ def get_products():
 
 
 @app.route('/stats', methods=['GET'])
+@cached_response()
 def get_stats():
     """
-    Статистика по БД
+    Статистика по БД (из сводных таблиц, пересчет: python API.py rebuild-stats)
     ---
     tags:
       - Данные
@@ -2078,50 +3605,14 @@ def get_stats():
               type: array
             top_sellers:
               type: array
+      304:
+        description: Статистика не изменилась (If-None-Match совпал с ETag)
       500:
         description: Ошибка сервера
     """
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
-            # Общая статистика
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_products,
-                    COUNT(DISTINCT seller_id) as total_sellers,
-                    COUNT(DISTINCT platform) as total_platforms,
-                    AVG(price) as avg_price,
-                    MIN(created_at) as first_parse,
-                    MAX(created_at) as last_parse
-                FROM products
-            """)
-            stats = cursor.fetchone()
-
-            # Статистика по платформам
-            cursor.execute("""
-                SELECT 
-                    platform,
-                    COUNT(*) as product_count,
-                    COUNT(DISTINCT seller_id) as seller_count,
-                    AVG(price) as avg_price,
-                    AVG(rating) as avg_rating
-                FROM products
-                GROUP BY platform
-                ORDER BY product_count DESC
-            """)
-            platforms = cursor.fetchall()
-
-            # Топ продавцов
-            cursor.execute("""
-                SELECT seller_id, platform, COUNT(*) as product_count
-                FROM products
-                GROUP BY seller_id, platform
-                ORDER BY product_count DESC
-                LIMIT 20
-            """)
-            sellers = cursor.fetchall()
-
-        conn.close()
+        # Сводные таблицы ведет save_to_database — полного прохода по products нет
+        stats, platforms, sellers = product_stats.summary(top_n=20)
 
         return jsonify({
             'success': True,
@@ -2205,8 +3696,7 @@ def check_users_table():
         description: Таблица не существует
     """
     try:
-        conn = get_db()
-        with conn.cursor() as cursor:
+        with get_db() as conn, conn.cursor() as cursor:
             # Проверяем, существует ли таблица
             cursor.execute("SHOW TABLES LIKE 'users'")
             table_exists = cursor.fetchone()
@@ -2225,8 +3715,6 @@ def check_users_table():
             cursor.execute("SHOW CREATE TABLE users")
             create_stmt = cursor.fetchone()
 
-        conn.close()
-
         return jsonify({
             'success': True,
             'table_exists': True,
@@ -2241,6 +3729,267 @@ def check_users_table():
         }), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Метрики внутренних подсистем (пул соединений с БД, очередь задач, пул браузеров, ограничитель запросов, JSON-каталог WB, парсер Ozon, кэш страниц, память категорий, итоги /products)
+    ---
+    tags:
+      - Отладка
+    responses:
+      200:
+        description: Метрики
+        schema:
+          type: object
+          properties:
+            success:
+              type: boolean
+            db_pool:
+              type: object
+              properties:
+                size:
+                  type: integer
+                idle:
+                  type: integer
+                in_use:
+                  type: integer
+                checkouts:
+                  type: integer
+                waits:
+                  type: integer
+                timeouts:
+                  type: integer
+                wait_time_avg_ms:
+                  type: number
+                wait_time_max_ms:
+                  type: number
+            jobs:
+              type: object
+              properties:
+                pending:
+                  type: integer
+                running:
+                  type: integer
+                queued:
+                  type: integer
+            browser_pool:
+              type: object
+              properties:
+                alive:
+                  type: integer
+                idle:
+                  type: integer
+                in_use:
+                  type: integer
+                checkouts:
+                  type: integer
+                reuses:
+                  type: integer
+                created:
+                  type: integer
+                recycled:
+                  type: integer
+                crashed:
+                  type: integer
+                wait_time_avg_ms:
+                  type: number
+                wait_time_max_ms:
+                  type: number
+            host_rate_limiter:
+              type: object
+              properties:
+                requests:
+                  type: integer
+                delayed:
+                  type: integer
+                delay_total_sec:
+                  type: number
+                successes:
+                  type: integer
+                failures:
+                  type: object
+                  description: Капча, блокировки, пустые страницы и ошибки
+                intervals:
+                  type: object
+                  description: Текущий интервал (сек) по хостам
+            wb_api_rate_limiter:
+              type: object
+              description: Паузы JSON-каталога WB (WB_API_PACING_CONFIG), поля как у host_rate_limiter
+            wb_api:
+              type: object
+              properties:
+                requests:
+                  type: integer
+                pages:
+                  type: integer
+                products:
+                  type: integer
+                blocked:
+                  type: integer
+                request_time_avg_ms:
+                  type: number
+            ozon_runner:
+              type: object
+              properties:
+                runs:
+                  type: integer
+                failures:
+                  type: integer
+                in_flight:
+                  type: integer
+                browser_launches:
+                  type: integer
+                browser_running:
+                  type: boolean
+                run_time_avg_sec:
+                  type: number
+            page_cache:
+              type: object
+              description: Кэш страниц товаров (null, если выключен в PAGE_CACHE_CONFIG)
+              properties:
+                hits:
+                  type: integer
+                misses:
+                  type: integer
+                hit_rate:
+                  type: number
+                expired:
+                  type: integer
+                stores:
+                  type: integer
+                deduplicated:
+                  type: integer
+                evictions:
+                  type: integer
+                entries:
+                  type: integer
+                bytes:
+                  type: integer
+            category_memo:
+              type: object
+              properties:
+                lookups:
+                  type: integer
+                product_hits:
+                  type: integer
+                subject_hits:
+                  type: integer
+                visits:
+                  type: integer
+                visits_avoided:
+                  type: integer
+                avoided_rate:
+                  type: number
+            product_counts:
+              type: object
+              properties:
+                cache_hits:
+                  type: integer
+                cache_misses:
+                  type: integer
+                counter_queries:
+                  type: integer
+                estimate_queries:
+                  type: integer
+                exact_queries:
+                  type: integer
+                cached_totals:
+                  type: integer
+            product_stats:
+              type: object
+              properties:
+                applied:
+                  type: integer
+                rebuilds:
+                  type: integer
+            auth_cache:
+              type: object
+              properties:
+                token_hits:
+                  type: integer
+                token_misses:
+                  type: integer
+                token_hit_rate:
+                  type: number
+                user_hits:
+                  type: integer
+                user_misses:
+                  type: integer
+                user_hit_rate:
+                  type: number
+                db_queries_saved:
+                  type: integer
+                invalidations:
+                  type: integer
+            password_hasher:
+              type: object
+              properties:
+                hashes:
+                  type: integer
+                verifies:
+                  type: integer
+                rejected:
+                  type: integer
+                pending:
+                  type: integer
+                pool_restarts:
+                  type: integer
+                avg_time_ms:
+                  type: number
+            login_limiter:
+              type: object
+              properties:
+                attempts:
+                  type: integer
+                limited:
+                  type: integer
+                evicted:
+                  type: integer
+                  description: Ключей вытеснено сверх max_keys (перебор IP или логинов)
+                tracked_keys:
+                  type: integer
+            response_cache:
+              type: object
+              properties:
+                backend:
+                  type: string
+                hits:
+                  type: integer
+                misses:
+                  type: integer
+                hit_rate:
+                  type: number
+                not_modified:
+                  type: integer
+                invalidations:
+                  type: integer
+                invalidated_entries:
+                  type: integer
+                evictions:
+                  type: integer
+                entries:
+                  type: integer
+    """
+    return jsonify({
+        'success': True,
+        'db_pool': db_pool.stats(),
+        'jobs': job_queue.stats(),
+        'browser_pool': wb_browser_pool.stats(),
+        'host_rate_limiter': host_rate_limiter.stats(),
+        'wb_api_rate_limiter': wb_api_rate_limiter.stats(),
+        'wb_api': wb_api_client.stats(),
+        'ozon_runner': ozon_runner.stats(),
+        'page_cache': page_cache.stats() if page_cache else None,
+        'category_memo': category_memo.stats(),
+        'product_counts': product_counts.stats(),
+        'product_stats': product_stats.stats(),
+        'response_cache': response_cache.stats() if response_cache else None,
+        'auth_cache': auth_cache.stats(),
+        'password_hasher': password_hasher.stats(),
+        'login_limiter': login_limiter.stats()
+    })
+
+
 # ============================================
 # ТЕСТОВЫЕ ЭНДПОИНТЫ ДЛЯ SWAGGER
 # ============================================
@@ -2577,7 +4326,7 @@ def index():
             <div class="endpoint parse-endpoint">
                 <h3>🛒 GET /parse <span class="platform-badge ozon-badge">OZON</span></h3>
                 <p><strong>Парсинг продавца Ozon</strong></p>
-                <p>Запускает ozon_csv_parser.py для парсинга продавца</p>
+                <p>Парсит продавца парсером parser_ozon прямо в процессе API (Playwright)</p>
                 <code>curl "http://localhost:5000/parse?url=https://www.ozon.ru/seller/dareu-2265016/"</code>
             </div>
 
@@ -2593,6 +4342,15 @@ def index():
                 </ul>
             </div>
 
+            <div class="endpoint parse-endpoint">
+                <h3>⏳ POST /parse, POST /parse-wb → GET /jobs/&lt;job_id&gt;</h3>
+                <p><strong>Фоновый парсинг</strong></p>
+                <p>Сразу возвращает job_id; статус, прогресс и результат — в /jobs/&lt;job_id&gt;</p>
+                <code>curl -X POST http://localhost:5000/parse-wb \\
+  -H "Content-Type: application/json" \\
+  -d '{"url": "https://www.wildberries.ru/seller/42582", "max_products": 50}'</code>
+            </div>
+
             <div class="endpoint">
                 <h3>📊 GET /stats</h3>
                 <p><strong>Статистика по БД</strong></p>
@@ -2751,6 +4509,18 @@ def index():
 
 
 if __name__ == '__main__':
+    # python API.py rebuild-stats — пересчитать сводки /stats по products (после бэкфилла или ручных правок)
+    if sys.argv[1:] == ['rebuild-stats']:
+        if not init_database():
+            sys.exit(1)
+        started = time.time()
+        sellers = product_stats.rebuild()
+        product_counts.invalidate()
+        if response_cache:
+            response_cache.clear()
+        print(f"✅ Сводки /stats пересчитаны: {sellers} продавцов за {time.time() - started:.1f} с")
+        sys.exit(0)
+
     # Устанавливаем дополнительные зависимости
     print("🔧 Проверка зависимостей...")
     print("Для парсинга Wildberries требуется:")
@@ -2761,11 +4531,49 @@ if __name__ == '__main__':
     print("=" * 70)
     print("🔧 Инициализация Ozon & Wildberries Parser API с аутентификацией...")
 
+    # В debug-режиме модуль запускается дважды: родитель reloader'а только следит за файлами,
+    # запросы обслуживает дочерний процесс. Пулы, браузеры и восстановление задач — только в нем
+    serving_process = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+    # Процессы хеширования паролей запускаем первыми, пока в процессе нет других потоков
+    if serving_process:
+        try:
+            started = password_hasher.warm_up()
+            print(f"✅ Пул хеширования паролей готов ({started} процессов)")
+        except Exception as e:
+            print(f"⚠️  Не удалось запустить процессы хеширования паролей: {e}")
+
+        try:
+            opened = db_pool.warm_up()
+            print(f"✅ Пул соединений с БД готов ({opened} соединений)")
+        except Exception as e:
+            print(f"⚠️  Не удалось заранее открыть соединения с БД: {e}")
+
     if init_database():
         print("✅ База данных готова")
+        if serving_process:
+            try:
+                recovered = job_queue.recover()
+                if recovered:
+                    print(f"🔄 Возобновлено незавершенных задач парсинга: {recovered}")
+            except Exception as e:
+                print(f"⚠️  Не удалось восстановить задачи парсинга: {e}")
     else:
         print("⚠️  Проблемы с БД, но API продолжит работу")
 
+    if BROWSER_POOL_WARM_ON_START and serving_process:
+        def _warm_browser_pool():
+            try:
+                started = wb_browser_pool.warm_up()
+                print(f"✅ Пул браузеров Wildberries готов ({started} браузеров)")
+            except Exception as e:
+                print(f"⚠️  Не удалось заранее запустить браузеры: {e}")
+
+        threading.Thread(target=_warm_browser_pool, daemon=True).start()
+    atexit.register(wb_browser_pool.close_all)
+    atexit.register(ozon_runner.close)
+    atexit.register(password_hasher.close)
+
     print("\n" + "=" * 70)
     print("🚀 Ozon & Wildberries Parser API with Auth ЗАПУЩЕН!")
     print("=" * 70)
@@ -2774,13 +4582,16 @@ if __name__ == '__main__':
     print("🔍 Тест Swagger:      http://localhost:5000/test-swagger")
     print("🔍 Тест Chrome:       http://localhost:5000/test-chrome")
     print("\n🎯 Эндпоинты парсинга:")
-    print("   GET /parse    - Парсинг Ozon (требуется ozon_csv_parser.py)")
+    print("   GET /parse    - Парсинг Ozon (требуется playwright: playwright install chromium)")
     print("   GET /parse-wb - Парсинг Wildberries (требуется Chrome/Edge)")
+    print("   POST /parse, POST /parse-wb - то же в фоне, статус: GET /jobs/<job_id>")
     print("\n🔧 Отладка и настройка:")
     print("   GET  /test-chrome        - проверить установку Chrome")
     print("   GET  /install-dependencies - установить зависимости")
     print("   GET  /check-users-table  - проверить таблицу users")
     print("   POST /db-fix             - исправить структуру БД")
+    print("   python API.py rebuild-stats - пересчитать сводки /stats по таблице products")
+    print("   GET  /metrics            - метрики пулов (БД, браузеры) и очереди задач")
     print("=" * 70)
     print("\n🔐 Первые шаги:")
     print("1. Проверьте Swagger: http://localhost:5000/apidocs")
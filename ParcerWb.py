@@ -12,11 +12,31 @@ from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 import os
+from urllib.parse import urlparse
+import requests
+
+from rate_limit import AdaptivePacer, PacingRun
+from wb_api import WildberriesApiClient, WildberriesBlockedError
+from wb_listing import wait_for_cards
 
 
 class WildberriesSellerParser:
-    def __init__(self, headless=True, delay_range=(3, 7)):
+    def __init__(self, headless=True, delay_range=(3, 7), rate_limiter=None,
+                 listing_first_timeout=30, listing_scroll_timeout=8, listing_quiet_time=0.5,
+                 listing_max_scrolls=30, listing_stall_limit=2):
+        """
+        rate_limiter — паузы вежливости между загрузками страниц одного хоста
+        с обратной связью (по умолчанию AdaptivePacer, начиная с delay_range[0]
+        сек). listing_* — подгрузка сетки, как у парсера в API.py.
+        """
         self.delay_range = delay_range
+        self.rate_limiter = rate_limiter or AdaptivePacer(initial_interval=delay_range[0])
+        self.pacing = PacingRun()
+        self.listing_first_timeout = listing_first_timeout
+        self.listing_scroll_timeout = listing_scroll_timeout
+        self.listing_quiet_time = listing_quiet_time
+        self.listing_max_scrolls = listing_max_scrolls
+        self.listing_stall_limit = listing_stall_limit
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
@@ -68,12 +88,20 @@ class WildberriesSellerParser:
             print(f"❌ Ошибка инициализации драйвера: {e}")
             raise
 
-    def _smart_delay(self, custom_range=None):
-        min_d, max_d = custom_range if custom_range else self.delay_range
-        delay = random.uniform(min_d, max_d)
-        print(f"   ⏳ Ожидание {delay:.1f} сек...")
-        time.sleep(delay)
-        return delay
+    def _pace(self, url):
+        """Пауза вежливости перед запросом к хосту url (по rate_limiter)"""
+        return self.pacing.slept(self.rate_limiter.wait(urlparse(url).netloc))
+
+    # Страница-заглушка антибота WB вместо витрины или карточки
+    _BLOCKED_PAGE_JS = """
+        return /captcha|почти готово|доступ ограничен|подозрительн/i.test(document.title + ' ' + location.href);
+    """
+
+    def _page_blocked(self):
+        try:
+            return bool(self.driver.execute_script(self._BLOCKED_PAGE_JS))
+        except Exception:
+            return False
 
     def parse_seller_products(self, seller_url, max_products=200):
         """
@@ -102,26 +130,31 @@ class WildberriesSellerParser:
         all_products = []
 
         try:
-            # 1. Загружаем страницу
+            # 1. Загружаем страницу (появления карточек ждет _wait_and_load_products)
             print(f"\n📥 Загружаю страницу...")
-            self.driver.get(seller_url)
-            self._smart_delay((4, 6))
-
-            # 2. Получаем информацию о продавце/бренде
-            seller_info = self._parse_entity_info()
-            seller_info['entity_id'] = entity_id
-            seller_info['entity_type'] = entity_type
-            seller_info['entity_name'] = entity_name
-            seller_info['seller_id'] = entity_id
+            host = urlparse(seller_url).netloc
+            self._pace(seller_url)
+            with self.pacing.fetching():
+                self.driver.get(seller_url)
 
-            # 3. Ждем загрузки товаров и прокручиваем
+            # 2. Ждем загрузки товаров и прокручиваем
             print(f"\n⬇ Загружаю товары...")
             loaded_count = self._wait_and_load_products(max_products)
             print(f"📦 Загружено товаров: {loaded_count}")
 
             if loaded_count == 0:
-                print("❌ Не удалось загрузить товары")
+                blocked = self._page_blocked()
+                self.rate_limiter.failure(host, 'captcha' if blocked else 'empty')
+                print("❌ Не удалось загрузить товары" + (" (страница антибота)" if blocked else ""))
                 return []
+            self.rate_limiter.success(host)
+
+            # 3. Получаем информацию о продавце/бренде
+            seller_info = self._parse_entity_info()
+            seller_info['entity_id'] = entity_id
+            seller_info['entity_type'] = entity_type
+            seller_info['entity_name'] = entity_name
+            seller_info['seller_id'] = entity_id
 
             # 4. Получаем HTML
             page_source = self.driver.page_source
@@ -142,7 +175,8 @@ class WildberriesSellerParser:
             traceback.print_exc()
             return []
 
-    def _extract_entity_info(self, url):
+    @staticmethod
+    def _extract_entity_info(url):
         """Извлекает информацию о сущности (продавец или бренд) из URL."""
         patterns = [
             {'type': 'seller', 'pattern': r'/seller/(\d+)', 'name': None},
@@ -218,66 +252,45 @@ class WildberriesSellerParser:
         return entity_info
 
     def _wait_and_load_products(self, max_products):
-        """Ожидает загрузки товаров и прокручивает страницу."""
-        print("   ⏳ Ожидаю загрузки товаров...")
-
-        try:
-            # Ожидаем появления товаров
-            self.wait.until(
-                EC.presence_element_located((By.CSS_SELECTOR,
-                                             "article.product-card, div.product-card, [data-nm-id], .card, .product-card"))
-            )
-        except Exception as e:
-            print(f"   ⚠ Товары не появились, пробую продолжить: {e}")
-
-        # Даем время для полной загрузки
-        self._smart_delay((2, 3))
-
-        # Считаем начальное количество товаров
-        try:
-            products = self.driver.find_elements(By.CSS_SELECTOR,
-                                                 "article.product-card, div.product-card, [data-nm-id], .card, .product-card, article[class*='card'], div[class*='card']")
-            last_count = len(products)
-            print(f"   📦 Начальное количество товаров: {last_count}")
-        except Exception as e:
-            print(f"   ⚠ Ошибка при подсчете товаров: {e}")
-            last_count = 0
+        """
+        Ожидает карточки товаров и подгружает их прокруткой.
 
-        same_count = 0
-        scroll_attempts = 0
-        max_scrolls = 15
+        Пауз нет: после каждой прокрутки браузер сам сообщает, когда пришли
+        новые карточки и страница затихла (wb_listing.CARD_WATCH_JS), и прокрутка
+        продолжается сразу. Загрузка заканчивается, как только карточек
+        max_products, или после listing_stall_limit прокруток без новых.
+        """
+        print("   ⏳ Ожидаю загрузки товаров...")
+        started = time.monotonic()
 
-        while scroll_attempts < max_scrolls and last_count < max_products:
-            scroll_attempts += 1
+        count, reason = wait_for_cards(self.driver, 0, max_products, self.listing_quiet_time,
+                                       self.listing_first_timeout)
+        if not count:
+            print(f"   ⚠ Товары не появились ({reason})")
+            return 0
+        print(f"   📦 Начальное количество товаров: {count} ({time.monotonic() - started:.1f} сек)")
 
-            # Прокручиваем
+        stalls = 0
+        scrolls = 0
+        while count < max_products and scrolls < self.listing_max_scrolls:
+            scrolls += 1
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self._smart_delay((2, 3))
-
-            # Считаем товары
-            try:
-                products = self.driver.find_elements(By.CSS_SELECTOR,
-                                                     "article.product-card, div.product-card, [data-nm-id], .card, .product-card, article[class*='card'], div[class*='card']")
-                current_count = len(products)
-                print(f"   📍 Прокрутка {scroll_attempts}: {current_count} товаров")
-
-                if current_count == last_count:
-                    same_count += 1
-                    if same_count >= 2:
-                        print("   ✅ Загрузка товаров завершена")
-                        return min(current_count, max_products)
-                else:
-                    same_count = 0
-                    last_count = current_count
-
-                if current_count >= max_products:
-                    print(f"   ✅ Достигнуто максимальное количество: {max_products}")
-                    return max_products
-
-            except Exception as e:
-                print(f"   ⚠ Ошибка при подсчете: {e}")
+            current, reason = wait_for_cards(self.driver, count, max_products, self.listing_quiet_time,
+                                             self.listing_scroll_timeout)
+            print(f"   📍 Прокрутка {scrolls}: {current} товаров ({reason}, {time.monotonic() - started:.1f} сек)")
+
+            if current > count:
+                count = current
+                stalls = 0
+            else:
+                stalls += 1
+                if stalls >= self.listing_stall_limit:
+                    print("   ✅ Загрузка товаров завершена")
+                    break
 
-        return min(last_count, max_products)
+        if count >= max_products:
+            print(f"   ✅ Достигнуто максимальное количество: {max_products}")
+        return min(count, max_products)
 
     def _parse_products_page_html(self, html_content, entity_info, max_products):
         """Парсит товары со страницы."""
@@ -513,9 +526,17 @@ class WildberriesSellerParser:
             self.driver.execute_script("window.open('');")
             self.driver.switch_to.window(self.driver.window_handles[-1])
 
-            # Загружаем страницу товара
-            self.driver.get(product_url)
-            self._smart_delay((2, 4))
+            # Загружаем страницу товара и ждем хлебные крошки вместо фиксированной паузы
+            host = urlparse(product_url).netloc
+            self._pace(product_url)
+            with self.pacing.fetching():
+                self.driver.get(product_url)
+                try:
+                    WebDriverWait(self.driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="breadcrumb"]')))
+                    self.rate_limiter.success(host)
+                except Exception:
+                    self.rate_limiter.failure(host, 'captcha' if self._page_blocked() else 'empty')
 
             # Получаем HTML страницы
             page_source = self.driver.page_source
@@ -979,50 +1000,66 @@ def main():
         input()
 
 
-def run_parser(seller_url, max_products=200):
+def fetch_products_via_api(seller_url, max_products=200):
+    """
+    Получает товары через JSON-каталог WB, без браузера.
+    Возвращает None, если API недоступно (блокировка, сеть) — тогда нужен Selenium.
+    """
+    entity_info = WildberriesSellerParser._extract_entity_info(seller_url)
+    if not entity_info:
+        return None
+
+    client = WildberriesApiClient()
+    try:
+        return client.fetch_entity_products(entity_info, max_products)
+    except (WildberriesBlockedError, requests.RequestException, KeyError, ValueError) as e:
+        print(f"⚠ JSON-каталог недоступен ({e}), переключаюсь на браузер")
+        return None
+    finally:
+        client.close()
+
+
+def run_parser(seller_url, max_products=200, use_api=True):
     """
     Функция для запуска парсера напрямую без интерфейса.
     Используйте эту функцию, если хотите интегрировать парсер в другой код.
 
+    При use_api=True товары сначала запрашиваются через JSON-каталог WB,
+    браузер запускается, только если API не ответило.
+
     Пример использования:
         from parser import run_parser
         results = run_parser("https://www.wildberries.ru/seller/42582", 100)
     """
-    parser = WildberriesSellerParser(headless=True)
+    print(f"🚀 Начинаю парсинг {seller_url}...")
+    products_data = fetch_products_via_api(seller_url, max_products) if use_api else None
 
-    try:
-        print(f"🚀 Начинаю парсинг {seller_url}...")
-        products_data = parser.parse_seller_products(seller_url, max_products)
-
-        if products_data:
-            entity_info = {
-                'entity_id': products_data[0].get('entity_id', ''),
-                'entity_type': products_data[0].get('entity_type', ''),
-                'entity_name': products_data[0].get('entity_name', ''),
-                'seller_name': products_data[0].get('seller_name', ''),
-            }
-
-            # Форматируем результаты
-            formatted_results = []
-            for product in products_data:
-                formatted_product = {
-                    "id": product.get('id', ''),
-                    "url": product.get('url', ''),
-                    "name": product.get('name', ''),
-                    "brand": product.get('brand', ''),
-                    "price": product.get('price', 0),
-                    "rating": product.get('rating', 0.0),
-                    "image": product.get('image', ''),
-                    "category": product.get('category', ''),
-                }
-                formatted_results.append(formatted_product)
+    if not products_data:
+        parser = WildberriesSellerParser(headless=True)
+        try:
+            products_data = parser.parse_seller_products(seller_url, max_products)
+        finally:
+            parser.close()
 
-            return formatted_results
-        else:
-            return []
+    if not products_data:
+        return []
+
+    # Форматируем результаты
+    formatted_results = []
+    for product in products_data:
+        formatted_product = {
+            "id": product.get('id', ''),
+            "url": product.get('url', ''),
+            "name": product.get('name', ''),
+            "brand": product.get('brand', ''),
+            "price": product.get('price', 0),
+            "rating": product.get('rating', 0.0),
+            "image": product.get('image', ''),
+            "category": product.get('category', ''),
+        }
+        formatted_results.append(formatted_product)
 
-    finally:
-        parser.close()
+    return formatted_results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class AuthCache:
+    """
+    Кэш проверенных JWT и строк пользователей для token_required и /profile.
+
+    Проверенный payload токена хранится до его exp (но не дольше token_ttl),
+    поэтому повторный запрос с тем же токеном не вызывает jwt.decode.
+    Строка пользователя из users хранится user_ttl секунд. Оба кэша
+    ограничены по размеру (LRU). invalidate_user сбрасывает строку
+    пользователя — вызывается при входе, смене пароля и блокировке; токены
+    при этом не трогаются: отзыв токенов решает token_required по строке
+    пользователя (is_active, password_changed_at).
+    """
+
+    def __init__(self, token_cache_size=4096, user_cache_size=1024, token_ttl=600, user_ttl=300):
+        self.token_cache_size = token_cache_size
+        self.user_cache_size = user_cache_size
+        self.token_ttl = token_ttl
+        self.user_ttl = user_ttl
+
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()  # sha256 токена -> (payload, до какого времени действует)
+        self._users = OrderedDict()   # user_id -> (строка users, время загрузки)
+        self._generations = {}        # user_id -> число сбросов, растет в invalidate_user
+        self._metrics = {
+            'token_hits': 0,
+            'token_misses': 0,
+            'user_hits': 0,
+            'user_misses': 0,
+            'invalidations': 0,
+        }
+
+    @staticmethod
+    def _token_key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    # ============================================
+    # ТОКЕНЫ
+    # ============================================
+
+    def get_token(self, token):
+        """Payload проверенного ранее токена или None"""
+        key = self._token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and now < entry[1]:
+                self._tokens.move_to_end(key)
+                self._metrics['token_hits'] += 1
+                return entry[0]
+            if entry is not None:
+                del self._tokens[key]
+            self._metrics['token_misses'] += 1
+        return None
+
+    def put_token(self, token, payload):
+        """Запоминает payload токена, прошедшего jwt.decode"""
+        expires_at = time.time() + self.token_ttl
+        if payload.get('exp') is not None:
+            expires_at = min(expires_at, float(payload['exp']))
+
+        key = self._token_key(token)
+        with self._lock:
+            self._tokens[key] = (payload, expires_at)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.token_cache_size:
+                self._tokens.popitem(last=False)
+
+    # ============================================
+    # ПОЛЬЗОВАТЕЛИ
+    # ============================================
+
+    def get_user(self, user_id, load):
+        """Строка пользователя из кэша или load(user_id) (None — пользователя нет, не кэшируется)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and now - entry[1] < self.user_ttl:
+                self._users.move_to_end(user_id)
+                self._metrics['user_hits'] += 1
+                return entry[0]
+            self._metrics['user_misses'] += 1
+            generation = self._generations.get(user_id, 0)
+
+        user = load(user_id)
+        if user is None:
+            return None
+
+        with self._lock:
+            # Пока шел SELECT, строку сбросили (блокировка, смена пароля) — она могла
+            # прочитаться до UPDATE, такую не кэшируем
+            if self._generations.get(user_id, 0) != generation:
+                return user
+            self._users[user_id] = (user, now)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.user_cache_size:
+                self._users.popitem(last=False)
+        return user
+
+    def invalidate_user(self, user_id):
+        """Сбрасывает строку пользователя (вызывать после UPDATE users)"""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._metrics['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            token_lookups = metrics['token_hits'] + metrics['token_misses']
+            user_lookups = metrics['user_hits'] + metrics['user_misses']
+            metrics.update({
+                'token_hit_rate': round(metrics['token_hits'] / token_lookups, 3) if token_lookups else 0.0,
+                'user_hit_rate': round(metrics['user_hits'] / user_lookups, 3) if user_lookups else 0.0,
+                # Каждое попадание по пользователю — несделанный SELECT из users
+                'db_queries_saved': metrics['user_hits'],
+                'tokens': len(self._tokens),
+                'users': len(self._users),
+            })
+        return metrics
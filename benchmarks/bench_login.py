@@ -0,0 +1,140 @@
+"""
+Бенчмарк /login под нагрузкой: хеширование пароля в потоке запроса (workers=0,
+как раньше) против пула процессов PasswordHasher.
+
+Поднимает API в этом же процессе (многопоточный сервер werkzeug) на тестовой
+базе, заводит пользователя и запускает --clients параллельных клиентов, каждый
+делает --requests входов. Одновременно отдельный клиент раз в --probe-interval
+секунд запрашивает /products — его задержка показывает, насколько вход
+тормозит остальные эндпоинты. Ограничение попыток входа на время теста снято.
+
+Пример:
+    python benchmarks/bench_login.py --clients 200 --requests 5 --workers 0 2 4
+"""
+import argparse
+import concurrent.futures
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql  # noqa: E402
+import requests  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import API  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+from password_hasher import PasswordHasher  # noqa: E402
+from rate_limit import AttemptLimiter  # noqa: E402
+
+USERNAME = 'bench_login_user'
+PASSWORD = 'bench-password'
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[max(0, int(len(values) * share) - 1)]
+
+
+def describe(values):
+    if not values:
+        return "нет данных"
+    return (f"медиана {statistics.median(values) * 1000:8.1f} мс, p95 {percentile(values, 0.95) * 1000:8.1f} мс, "
+            f"max {max(values) * 1000:8.1f} мс")
+
+
+def run(base_url, clients, per_client, probe_interval):
+    login_latencies = []
+    probe_latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def client(_):
+        session = requests.Session()
+        for _ in range(per_client):
+            started = time.perf_counter()
+            response = session.post(f"{base_url}/login", json={'username': USERNAME, 'password': PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                login_latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def probe():
+        session = requests.Session()
+        while not done.is_set():
+            started = time.perf_counter()
+            session.get(f"{base_url}/products", params={'limit': 20, 'count': 'none'})
+            probe_latencies.append(time.perf_counter() - started)
+            done.wait(probe_interval)
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+
+    return elapsed, login_latencies, probe_latencies, statuses
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк /login под параллельной нагрузкой")
+    cli.add_argument("--clients", type=int, default=200, help="Параллельных клиентов")
+    cli.add_argument("--requests", type=int, default=5, help="Входов на клиента")
+    cli.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4],
+                     help="Процессов хеширования (0 — в потоке запроса)")
+    cli.add_argument("--probe-interval", type=float, default=0.05, help="Сек между запросами /products")
+    cli.add_argument("--port", type=int, default=5055)
+    cli.add_argument("--database", default="marketplace_bench", help="Имя тестовой базы")
+    args = cli.parse_args()
+
+    server_config = {k: v for k, v in API.DB_CONFIG.items() if k != 'database'}
+    conn = pymysql.connect(**server_config)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` CHARACTER SET utf8mb4")
+    conn.close()
+
+    # Все функции API берут соединения из API.db_pool — подменяем его на тестовую базу
+    API.db_pool = ConnectionPool({**API.DB_CONFIG, 'database': args.database}, **API.DB_POOL_CONFIG)
+    API.init_database()
+    API.login_limiter = AttemptLimiter({'ip': (10 ** 9, 1), 'user': (10 ** 9, 1)})
+    API.response_cache = None
+
+    with API.get_db() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM users WHERE username = %s", (USERNAME,))
+        conn.commit()
+    API.create_user(USERNAME, f"{USERNAME}@bench.local", PASSWORD)
+
+    server = make_server('127.0.0.1', args.port, API.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"📊 /login: {args.clients} клиентов по {args.requests} входов, метод {API.password_hasher.method}")
+    try:
+        for workers in args.workers:
+            API.password_hasher = PasswordHasher(**{**API.PASSWORD_HASH_CONFIG, 'workers': workers,
+                                                    'max_pending': args.clients})
+            API.password_hasher.warm_up()
+
+            elapsed, logins, probes, statuses = run(base_url, args.clients, args.requests, args.probe_interval)
+            API.password_hasher.close()
+
+            label = f"workers={workers}" if workers else "в потоке запроса"
+            print(f"\n   {label}: {len(logins) / elapsed:.1f} входов/сек, ответы {statuses}")
+            print(f"   /login     {describe(logins)}")
+            print(f"   /products  {describe(probes)}")
+    finally:
+        server.shutdown()
+        with API.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE username = %s", (USERNAME,))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Бенчмарк загрузки карточек Ozon: профили full/fast и блокировка ресурсов.
+
+Для каждого варианта (профиль, блокировка) парсит одни и те же карточки
+и печатает время на товар и объем переданных байт (тела + заголовки ответов).
+
+По умолчанию поднимает локальный стаб карточки товара: HTML с JSON-LD,
+галереей картинок, шрифтом, видео и скриптом аналитики. Реальные карточки
+можно передать через --urls (нужна сеть и playwright install chromium).
+
+Пример:
+    python benchmarks/bench_ozon_page_load.py -n 10
+    python benchmarks/bench_ozon_page_load.py --urls https://www.ozon.ru/product/...
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'parser_ozon'))
+
+from ozon_csv_parser import OzonParser  # noqa: E402
+
+VARIANTS = [
+    ("full", False),
+    ("full", True),
+    ("fast", False),
+    ("fast", True),
+]
+
+
+def product_html(product_id, base):
+    ld = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": f"Тестовый товар {product_id}",
+        "brand": {"@type": "Brand", "name": "Dareu"},
+        "description": "Описание товара " * 20,
+        "image": [f"{base}/img/{product_id}-{i}.jpg" for i in range(3)],
+        "aggregateRating": {"ratingValue": "4.8", "reviewCount": "1234"},
+        "offers": {"@type": "Offer", "price": "2490", "priceCurrency": "RUB"},
+    }
+    gallery = "".join(f'<img src="{base}/img/{product_id}-{i}.jpg">' for i in range(12))
+    return f"""<!doctype html><html><head>
+<script type="application/ld+json">{json.dumps(ld, ensure_ascii=False)}</script>
+<style>@font-face {{ font-family: Stub; src: url({base}/fonts/stub.woff2); }} body {{ font-family: Stub; }}</style>
+<script src="{base}/analytics/tag.js"></script>
+</head><body>
+<h1>Тестовый товар {product_id}</h1>
+<div data-widget="webPrice"><span>2 490 ₽</span></div>
+<div data-widget="webGallery">{gallery}</div>
+<video src="{base}/media/promo.mp4" autoplay muted></video>
+</body></html>""".encode()
+
+
+def make_handler(base_holder, latency):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+
+            base = base_holder[0]
+            if self.path.startswith('/product/'):
+                product_id = self.path.rstrip('/').rsplit('-', 1)[-1]
+                body, content_type = product_html(product_id, base), 'text/html; charset=utf-8'
+            elif self.path.startswith('/img/'):
+                body, content_type = b'\xff' * 150_000, 'image/jpeg'
+            elif self.path.startswith('/fonts/'):
+                body, content_type = b'\x00' * 60_000, 'font/woff2'
+            elif self.path.startswith('/media/'):
+                body, content_type = b'\x00' * 500_000, 'video/mp4'
+            elif self.path.startswith('/analytics/'):
+                body, content_type = b'/*' + b' ' * 40_000 + b'*/', 'application/javascript'
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+async def run_variant(urls, profile, block_resources):
+    parser = OzonParser(profile=profile, block_resources=block_resources)
+    transferred = [0]
+
+    async def on_finished(request):
+        try:
+            sizes = await request.sizes()
+            transferred[0] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            pass
+
+    await parser.setup_browser()
+    try:
+        parser.page.on("requestfinished", on_finished)
+        started = time.perf_counter()
+        for url in urls:
+            await parser.parse_product(url)
+        elapsed = time.perf_counter() - started
+    finally:
+        await parser.close_browser()
+
+    return elapsed, transferred[0], parser.stats
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('-n', '--products', type=int, default=10, help="карточек стаба")
+    arg_parser.add_argument('--latency-ms', type=float, default=30, help="задержка ответа стаба")
+    arg_parser.add_argument('--urls', nargs='+', help="реальные карточки вместо стаба")
+    args = arg_parser.parse_args()
+
+    server = None
+    if args.urls:
+        urls = args.urls
+    else:
+        base_holder = [None]
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(base_holder, args.latency_ms / 1000))
+        base_holder[0] = f"http://127.0.0.1:{server.server_port}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        urls = [f"{base_holder[0]}/product/test-{100000 + i}/" for i in range(args.products)]
+
+    print(f"Карточек: {len(urls)}\n")
+    print(f"{'профиль':<8} {'блок.':<6} {'сек/товар':>10} {'КБ/товар':>10} {'заблок.':>8} {'быстрых':>8}")
+    for profile, block_resources in VARIANTS:
+        elapsed, transferred, stats = await run_variant(urls, profile, block_resources)
+        print(f"{profile:<8} {'да' if block_resources else 'нет':<6} "
+              f"{elapsed / len(urls):>10.3f} {transferred / len(urls) / 1024:>10.1f} "
+              f"{stats['requests_blocked']:>8} {stats['fast_path']:>8}")
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
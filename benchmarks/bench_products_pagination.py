@@ -0,0 +1,166 @@
+"""
+Бенчмарк выборок /products: OFFSET против keyset-пагинации и фильтры по индексам.
+
+Создает таблицу-копию products (CREATE TABLE ... LIKE, с теми же индексами
+из migrations.PRODUCT_INDEXES), заполняет ее синтетическими товарами и для каждого
+запроса печатает медианное время и план EXPLAIN: какой индекс выбран,
+сколько строк оценено и нет ли filesort.
+
+Нужен MySQL из API.DB_CONFIG. Заполнение 10 млн строк занимает десятки минут —
+таблица не удаляется без --drop, повторный запуск с тем же --rows ее переиспользует.
+
+Пример:
+    python benchmarks/bench_products_pagination.py --rows 10000000 --depths 1 100 1000 10000
+    python benchmarks/bench_products_pagination.py --rows 100000 --drop
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql  # noqa: E402
+
+from API import DB_CONFIG, init_database  # noqa: E402
+
+PLATFORMS = ['ozon', 'wildberries']
+CATEGORIES = [f"Категория {i}" for i in range(200)]
+BRANDS = [f"Бренд {i}" for i in range(2000)]
+WORDS = ['мышь', 'клавиатура', 'наушники', 'коврик', 'кабель', 'игровая', 'беспроводная', 'черный', 'белый', 'rgb']
+
+ORDER = "ORDER BY created_at DESC, id DESC"
+
+
+def fill_table(conn, table, rows, batch):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+        have = cursor.fetchone()['n']
+    if have >= rows:
+        print(f"В {table} уже {have} строк, заполнение пропущено")
+        return
+
+    print(f"Заполняю {table}: {have} -> {rows} строк...")
+    start_time = datetime.now() - timedelta(days=365)
+    sql = (f"INSERT INTO {table} (seller_id, external_id, title, brand, category, price, platform, rating, "
+           f"image_url, product_url, created_at, scraped_at) "
+           f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)")
+
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        for offset in range(have, rows, batch):
+            values = []
+            for i in range(offset, min(offset + batch, rows)):
+                created_at = start_time + timedelta(seconds=i * 365 * 86400 // rows)
+                values.append((
+                    f"seller-{i % 5000}", str(i),
+                    " ".join(random.sample(WORDS, 3)) + f" {i}",
+                    random.choice(BRANDS), random.choice(CATEGORIES),
+                    round(random.uniform(100, 100000), 2), random.choice(PLATFORMS),
+                    round(random.uniform(3, 5), 2), '', f"https://example.com/{i}",
+                    created_at, created_at,
+                ))
+            cursor.executemany(sql, values)
+            conn.commit()
+            done = min(offset + batch, rows)
+            if done % (batch * 50) == 0 or done == rows:
+                rate = (done - have) / (time.perf_counter() - started)
+                print(f"  {done:>11,} строк ({rate:,.0f} строк/с)")
+
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+
+
+def measure(conn, query, params, repeats):
+    timings = []
+    with conn.cursor() as cursor:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+
+        cursor.execute("EXPLAIN " + query, params)
+        plan = cursor.fetchall()
+    return statistics.median(timings), plan
+
+
+def print_result(title, elapsed, plan):
+    first = plan[0]
+    extra = "; ".join(row.get('Extra') or '' for row in plan)
+    marker = "  ⚠ filesort" if 'filesort' in extra else ''
+    print(f"{title:<46} {elapsed * 1000:>10.2f} мс  key={first.get('key')!s:<28} "
+          f"rows~{first.get('rows')!s:<10}{marker}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--rows', type=int, default=10_000_000, help="строк в тестовой таблице")
+    arg_parser.add_argument('--table', default='products_bench', help="имя тестовой таблицы")
+    arg_parser.add_argument('--batch', type=int, default=10_000, help="строк в одном INSERT")
+    arg_parser.add_argument('--limit', type=int, default=100, help="размер страницы")
+    arg_parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 1000, 10000], help="номера страниц")
+    arg_parser.add_argument('--repeats', type=int, default=5, help="повторов каждого запроса")
+    arg_parser.add_argument('--drop', action='store_true', help="удалить тестовую таблицу в конце")
+    args = arg_parser.parse_args()
+
+    # products с актуальными индексами — образец для тестовой таблицы
+    init_database()
+
+    conn = pymysql.connect(**DB_CONFIG)
+    table = args.table
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} LIKE products")
+        fill_table(conn, table, args.rows, args.batch)
+
+        print(f"\nПагинация, страница по {args.limit}:")
+        for depth in args.depths:
+            offset = (depth - 1) * args.limit
+            elapsed, plan = measure(conn, f"SELECT * FROM {table} {ORDER} LIMIT %s OFFSET %s",
+                                    [args.limit, offset], args.repeats)
+            print_result(f"OFFSET, страница {depth}", elapsed, plan)
+
+            if offset == 0:
+                continue
+            # Курсор — последняя строка предыдущей страницы
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT created_at, id FROM {table} {ORDER} LIMIT 1 OFFSET %s", [offset - 1])
+                last = cursor.fetchone()
+            if not last:
+                continue
+            elapsed, plan = measure(
+                conn,
+                f"SELECT * FROM {table} WHERE (created_at < %s OR (created_at = %s AND id < %s)) {ORDER} LIMIT %s",
+                [last['created_at'], last['created_at'], last['id'], args.limit], args.repeats,
+            )
+            print_result(f"keyset, страница {depth}", elapsed, plan)
+
+        print(f"\nФильтры, первая страница по {args.limit}:")
+        filters = [
+            ("seller_id + platform", "seller_id = %s AND platform = %s", ['seller-42', 'ozon']),
+            ("platform", "platform = %s", ['wildberries']),
+            ("category", "category = %s", [CATEGORIES[7]]),
+            ("brand", "brand = %s", [BRANDS[42]]),
+            ("platform + price_min/max", "platform = %s AND price BETWEEN %s AND %s", ['ozon', 1000, 1500]),
+            ("rating_min", "rating >= %s", [4.9]),
+            ("q (полнотекстовый)", "MATCH(title) AGAINST(%s IN BOOLEAN MODE)", ['+мышь* +беспроводная*']),
+        ]
+        for title, condition, params in filters:
+            elapsed, plan = measure(conn, f"SELECT * FROM {table} WHERE {condition} {ORDER} LIMIT %s",
+                                    params + [args.limit], args.repeats)
+            print_result(title, elapsed, plan)
+
+        if args.drop:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {table}")
+            print(f"\nТаблица {table} удалена")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Бенчмарк регистрации: старый create_user (SHOW TABLES + DESCRIBE users перед
+каждым INSERT) против нынешнего, где схему проверяют миграции при старте.
+
+Пишет в отдельную базу (по умолчанию marketplace_bench), боевые данные не трогает.
+Стоимость хеширования пароля одинакова в обоих вариантах и по умолчанию
+перекрывает разницу в запросах к БД — --hash-method с малым числом итераций
+(например pbkdf2:sha256:1000) показывает чистую стоимость обращений к БД.
+
+Пример:
+    python benchmarks/bench_registration.py -n 500 --threads 1 8 32
+    python benchmarks/bench_registration.py -n 2000 --hash-method pbkdf2:sha256:1000
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql  # noqa: E402
+
+import API  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+
+
+def legacy_create_user(username, email, password):
+    """Старая реализация: проверка структуры users и DESCRIBE перед каждым INSERT"""
+    API.check_and_fix_table_structure()
+    password_hash = API.password_hasher.hash(password)
+    with API.get_db() as conn, conn.cursor() as cursor:
+        cursor.execute("DESCRIBE users")
+        cursor.fetchall()
+        cursor.execute("""
+            INSERT INTO users (username, email, password_hash)
+            VALUES (%s, %s, %s)
+        """, (username, email, password_hash))
+        user_id = cursor.lastrowid
+        conn.commit()
+    return user_id
+
+
+def clear_users(prefix):
+    with API.get_db() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM users WHERE username LIKE %s", (prefix + '%',))
+        conn.commit()
+
+
+def run(label, create, count, threads):
+    prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+
+    def register(i):
+        started = time.perf_counter()
+        create(f"{prefix}{i}", f"{prefix}{i}@bench.local", "bench-password")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Старый вариант печатал структуру users на каждой регистрации — в бенчмарке это шум
+    with contextlib.redirect_stdout(io.StringIO()), \
+            concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(register, range(count)))
+    elapsed = time.perf_counter() - started
+    clear_users(prefix)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"   {label:22} потоков {threads:3}: {count / elapsed:8.1f} рег/сек, "
+          f"медиана {statistics.median(latencies) * 1000:7.1f} мс, p95 {p95 * 1000:7.1f} мс")
+    return elapsed
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк регистрации пользователей")
+    cli.add_argument("-n", "--count", type=int, default=500, help="Регистраций в каждом прогоне")
+    cli.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32], help="Параллельных клиентов")
+    cli.add_argument("--hash-method", default=None, help="Метод хеширования (по умолчанию PASSWORD_HASH_CONFIG)")
+    cli.add_argument("--database", default="marketplace_bench", help="Имя тестовой базы")
+    args = cli.parse_args()
+
+    server_config = {k: v for k, v in API.DB_CONFIG.items() if k != 'database'}
+    conn = pymysql.connect(**server_config)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` CHARACTER SET utf8mb4")
+    conn.close()
+
+    # Все функции API берут соединения из API.db_pool — подменяем его на тестовую базу
+    pool_size = max(args.threads + [API.DB_POOL_CONFIG['max_size']])
+    API.db_pool = ConnectionPool({**API.DB_CONFIG, 'database': args.database},
+                                 **{**API.DB_POOL_CONFIG, 'max_size': pool_size})
+    API.init_database()
+
+    if args.hash_method:
+        API.password_hasher.method = args.hash_method
+
+    print(f"📊 Регистрация {args.count} пользователей в {args.database}.users")
+    for threads in args.threads:
+        baseline = run("старый create_user", legacy_create_user, args.count, threads)
+        elapsed = run("create_user", API.create_user, args.count, threads)
+        print(f"   {'':22} ускорение x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Бенчмарк записи товаров в БД: построчный INSERT (старый save_to_database)
+против пачечного save_to_database.
+
+Пишет в отдельную базу (по умолчанию marketplace_bench), боевые данные не трогает.
+
+Пример:
+    python benchmarks/bench_save_products.py -n 5000 --chunk-sizes 100 500 1000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql  # noqa: E402
+
+import API  # noqa: E402
+from db_pool import ConnectionPool  # noqa: E402
+
+
+def make_products(count):
+    """Синтетические товары в формате парсера Ozon"""
+    products = []
+    for i in range(count):
+        products.append({
+            "ID": str(100000 + i),
+            "NAME": f"Тестовый товар {i} " + "x" * random.randint(10, 80),
+            "BRAND": random.choice(["Dareu", "Logitech", "Razer", "A4Tech"]),
+            "PRICE": f"{random.randint(100, 99999)} ₽",
+            "SUBCATEGORY": random.choice(["Мыши", "Клавиатуры", "Наушники"]),
+            "URL": f"https://www.ozon.ru/product/test-{100000 + i}/",
+            "RATING": f"{random.uniform(3, 5):.1f}",
+        })
+    return products
+
+
+def legacy_save(products, seller_id, platform):
+    """Старая реализация: один INSERT и одна очистка регулярками на товар"""
+    saved = 0
+    with API.get_db() as conn, conn.cursor() as cursor:
+        for product in products:
+            price = None
+            price_str = product.get('PRICE') or product.get('price') or ''
+            price_clean = re.sub(r'[^\d.]', '', str(price_str))
+            if price_clean:
+                price = float(price_clean)
+            rating = product.get('rating') or product.get('RATING')
+            rating = float(rating) if rating else None
+            cursor.execute("""
+                INSERT INTO products (seller_id, title, brand, category, price, platform, rating, image_url, product_url)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                seller_id,
+                (product.get('NAME') or '')[:500],
+                (product.get('BRAND') or '')[:255],
+                (product.get('SUBCATEGORY') or '')[:255],
+                price,
+                platform,
+                rating,
+                '',
+                (product.get('URL') or '')[:500]
+            ))
+            saved += 1
+        conn.commit()
+    return saved
+
+
+def clear_products():
+    with API.get_db() as conn, conn.cursor() as cursor:
+        cursor.execute("TRUNCATE TABLE products")
+        conn.commit()
+
+
+def run(label, func):
+    clear_products()
+    started = time.perf_counter()
+    saved = func()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:28} {saved:7} строк за {elapsed:7.3f} сек  →  {saved / elapsed:10.0f} строк/сек")
+    return elapsed
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк save_to_database")
+    cli.add_argument("-n", "--count", type=int, default=5000, help="Количество товаров")
+    cli.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 500, 1000])
+    cli.add_argument("--database", default="marketplace_bench", help="Имя тестовой базы")
+    args = cli.parse_args()
+
+    server_config = {k: v for k, v in API.DB_CONFIG.items() if k != 'database'}
+    conn = pymysql.connect(**server_config)
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` CHARACTER SET utf8mb4")
+    conn.close()
+
+    # Все функции API берут соединения из API.db_pool — подменяем его на тестовую базу
+    API.db_pool = ConnectionPool({**API.DB_CONFIG, 'database': args.database}, **API.DB_POOL_CONFIG)
+    API.init_database()
+
+    products = make_products(args.count)
+    print(f"📊 Запись {args.count} товаров в {args.database}.products")
+
+    baseline = run("построчно (старый цикл)", lambda: legacy_save(products, "bench_seller", "ozon"))
+    for mode in ('insert', 'upsert'):
+        for chunk_size in args.chunk_sizes:
+            elapsed = run(f"{mode} пачками по {chunk_size}",
+                          lambda: API.save_to_database(products, "bench_seller", "ozon",
+                                                       chunk_size=chunk_size, mode=mode)['saved'])
+            print(f"   {'':28} ускорение x{baseline / elapsed:.1f}")
+
+    clear_products()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк получения товаров WB через JSON-каталог (wb_api.WildberriesApiClient).
+
+Запускает локальный стаб каталога WB, который отдает ответы в формате
+catalog.wb.ru (или записанные JSON-фикстуры из --fixtures-dir: page-1.json,
+page-2.json, ...), и замеряет время на товар при разной параллельности.
+В сеть не ходит.
+
+Пример:
+    python benchmarks/bench_wb_api.py -n 1000 --workers 1 4 8 --latency-ms 80
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wb_api import WildberriesApiClient  # noqa: E402
+
+
+def make_catalog_item(nm_id):
+    """Товар в формате catalog.wb.ru/sellers/v2/catalog"""
+    price = random.randint(100, 99999) * 100
+    return {
+        "id": nm_id,
+        "name": f"Тестовый товар {nm_id}",
+        "brand": random.choice(["Dareu", "Logitech", "Razer", "A4Tech"]),
+        "entity": random.choice(["мыши", "клавиатуры", "наушники"]),
+        "subjectId": random.choice([1, 2, 3]),
+        "reviewRating": round(random.uniform(3, 5), 1),
+        "sizes": [{"price": {"basic": price * 2, "product": price}}],
+    }
+
+
+def make_handler(total, latency, fixtures_dir):
+    page_size = WildberriesApiClient.PAGE_SIZE
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query.get('page', ['1'])[0])
+
+            if latency:
+                time.sleep(latency)
+
+            if fixtures_dir:
+                path = os.path.join(fixtures_dir, f"page-{page}.json")
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                else:
+                    body = json.dumps({"data": {"products": []}}).encode()
+            else:
+                start = (page - 1) * page_size
+                ids = range(200000000 + start, 200000000 + min(start + page_size, total))
+                body = json.dumps({
+                    "data": {"products": [make_catalog_item(i) for i in ids], "total": total}
+                }, ensure_ascii=False).encode()
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('-n', '--products', type=int, default=1000, help="товаров у продавца")
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help="страниц одновременно")
+    arg_parser.add_argument('--latency-ms', type=float, default=80, help="задержка ответа стаба")
+    arg_parser.add_argument('--fixtures-dir', help="каталог с записанными ответами page-N.json")
+    args = arg_parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                 make_handler(args.products, args.latency_ms / 1000, args.fixtures_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    entity_info = {'type': 'seller', 'id': '42582', 'name': 'Продавец 42582'}
+    print(f"Стаб каталога: {base}, товаров: {args.products}, задержка: {args.latency_ms} мс\n")
+
+    for workers in args.workers:
+        client = WildberriesApiClient(endpoints={'seller_catalog': f"{base}/sellers/v2/catalog"},
+                                      max_workers=workers)
+        started = time.perf_counter()
+        products = client.fetch_entity_products(entity_info, max_products=args.products)
+        elapsed = time.perf_counter() - started
+        client.close()
+
+        per_product_ms = elapsed / len(products) * 1000 if products else 0
+        print(f"workers={workers:<3} товаров: {len(products):<6} время: {elapsed:7.3f} с  "
+              f"на товар: {per_product_ms:7.3f} мс  ({client.stats()['pages']} страниц)")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Микро-бенчмарк разбора карточек сетки WB: цепочки card.select_one (старый
+_parse_product_card) против CardExtractor (один обход карточки).
+
+Берет сохраненные страницы витрины продавца WB (HTML, например driver.page_source)
+или генерирует синтетическую сетку. Для каждого парсера (html.parser, lxml,
+selectolax — какие установлены) печатает карточек в секунду и проверяет,
+что оба способа дают одинаковые поля.
+
+Пример:
+    python benchmarks/bench_wb_cards.py saved/seller_42582.html saved/seller_1.html
+    python benchmarks/bench_wb_cards.py --synthetic 500 --repeats 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from API import WildberriesSellerParser  # noqa: E402
+from card_selectors import nodes_for  # noqa: E402
+
+CARD_SELECTOR = 'article.product-card, div.product-card, [data-nm-id]'
+
+
+def synthetic_page(count):
+    """Сетка, похожая на разметку WB: вложенные обертки, лишние узлы, картинки"""
+    cards = []
+    for i in range(count):
+        nm_id = 100000 + i
+        cards.append(f"""
+        <article class="product-card j-card-item" data-nm-id="{nm_id}">
+          <div class="product-card__wrapper">
+            <a class="product-card__link j-card-link" href="/catalog/{nm_id}/detail.aspx?subject={i % 40}"></a>
+            <div class="product-card__top-wrap">
+              <div class="product-card__img-wrap img-plug">
+                <img class="j-thumbnail" src="//basket-01.wbbasket.ru/vol{i}/images/c246x328/1.webp" alt="">
+              </div>
+              <div class="product-card__tip-wrap">{'<span class="badge">хит</span>' * random.randint(0, 3)}</div>
+            </div>
+            <div class="product-card__middle-wrap">
+              <p class="price">
+                <span class="price__wrap">
+                  <ins class="price__lower-price">{random.randint(100, 99999):,} ₽</ins>
+                  <del>{random.randint(100, 99999):,} ₽</del>
+                </span>
+              </p>
+              <h2 class="product-card__brand-wrap">
+                <span class="product-card__brand">Бренд {i % 50}</span>
+                <span class="product-card__name">/ Товар номер {i} с длинным названием</span>
+              </h2>
+              <p class="product-card__rating-wrap">
+                <span class="address-rate-mini">{random.uniform(3, 5):.1f}</span>
+                <span class="product-card__count">{random.randint(0, 5000)} оценок</span>
+              </p>
+            </div>
+          </div>
+        </article>""")
+    return f"<html><body><div class='product-card-list'>{''.join(cards)}</div></body></html>"
+
+
+def legacy_fields(card):
+    """Старый способ: select_one по селекторам цепочки, пока не найдется узел"""
+    fields = {}
+    for field, chain in WildberriesSellerParser._CARD_EXTRACTOR.fields.items():
+        fields[field] = None
+        for selector in chain:
+            fields[field] = card.select_one(selector.text)
+            if fields[field] is not None:
+                break
+    fields['links'] = card.select('a[href]')
+    return fields
+
+
+def extractor_fields(card):
+    found, collected = WildberriesSellerParser._CARD_EXTRACTOR.extract(card)
+    fields = {field: next((node for node in chain if node is not None), None) for field, chain in found.items()}
+    return {**fields, **collected}
+
+
+def summary(fields, card):
+    """Сравнимое представление найденных узлов (тег + текст)"""
+    nodes = nodes_for(card)
+
+    def describe(node):
+        return (nodes.tag(node), nodes.text(node)) if node is not None else None
+
+    return {field: [describe(node) for node in found] if isinstance(found, list) else describe(found)
+            for field, found in fields.items()}
+
+
+def parsers():
+    yield 'html.parser', lambda html: BeautifulSoup(html, 'html.parser').select(CARD_SELECTOR)
+    try:
+        import lxml  # noqa: F401
+        yield 'lxml', lambda html: BeautifulSoup(html, 'lxml').select(CARD_SELECTOR)
+    except ImportError:
+        print("   (lxml не установлен — пропускаю)")
+    try:
+        from selectolax.parser import HTMLParser
+        yield 'selectolax', lambda html: HTMLParser(html).css(CARD_SELECTOR)
+    except ImportError:
+        print("   (selectolax не установлен — пропускаю)")
+
+
+def measure(func, cards, repeats):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for card in cards:
+            func(card)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(cards) / best
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк разбора карточек WB")
+    cli.add_argument("files", nargs="*", help="Сохраненные HTML страницы витрины WB")
+    cli.add_argument("--synthetic", type=int, default=300, help="Карточек в синтетической сетке (без files)")
+    cli.add_argument("--repeats", type=int, default=3, help="Повторов, берется лучший")
+    args = cli.parse_args()
+
+    if args.files:
+        pages = [open(path, encoding='utf-8').read() for path in args.files]
+    else:
+        pages = [synthetic_page(args.synthetic)]
+
+    for name, select_cards in parsers():
+        cards = [card for html in pages for card in select_cards(html)]
+        if not cards:
+            print(f"   {name:12} карточки не найдены")
+            continue
+
+        line = f"   {name:12} {len(cards):5} карточек:"
+        if name != 'selectolax':  # у selectolax нет select_one с теми же селекторами
+            mismatches = sum(summary(legacy_fields(card), card) != summary(extractor_fields(card), card)
+                             for card in cards)
+            legacy_rate = measure(legacy_fields, cards, args.repeats)
+            line += f" select_one {legacy_rate:9.0f} карт/с,"
+            if mismatches:
+                line += f" ⚠ расхождений {mismatches},"
+        rate = measure(extractor_fields, cards, args.repeats)
+        line += f" CardExtractor {rate:9.0f} карт/с"
+        if name != 'selectolax':
+            line += f"  (x{rate / legacy_rate:.1f})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
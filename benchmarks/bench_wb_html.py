@@ -0,0 +1,176 @@
+"""
+Бенчмарк разбора HTML страниц WB разными бэкендами (html_backends.HtmlBackend):
+html.parser (как раньше), lxml, selectolax — какие установлены.
+
+Два сценария:
+  категория — _extract_category_from_html на страницах товаров: вся страница
+              против ранней остановки на области хлебных крошек;
+  сетка     — разбор витрины продавца и выбор карточек (_parse_products_page_html).
+
+Корпус — сохраненные страницы (--products / --listings), страницы товаров из
+дискового кэша PageCache (--page-cache) или синтетические страницы в несколько
+мегабайт. Каждый вариант меряется в отдельном процессе: время (лучший из
+--repeats), пик памяти Python-объектов (tracemalloc) и прирост пикового RSS —
+его нужно смотреть для lxml и selectolax, их деревья живут вне кучи Python.
+Категории всех вариантов сверяются с html.parser по всей странице.
+
+Пример:
+    python benchmarks/bench_wb_html.py --page-cache --limit 200
+    python benchmarks/bench_wb_html.py --products saved/item_*.html --listings saved/seller_*.html
+    python benchmarks/bench_wb_html.py --synthetic-mb 3
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import API  # noqa: E402
+from API import WildberriesSellerParser  # noqa: E402
+from bench_wb_cards import CARD_SELECTOR, synthetic_page  # noqa: E402
+from html_backends import HtmlBackend  # noqa: E402
+
+
+def synthetic_product_page(size_mb, index):
+    """Страница товара: тяжелые скрипты и разметка вокруг хлебных крошек, как у WB"""
+    filler = ''.join(f'<div class="j-filler item-{i}"><span>Блок {i}</span><img src="/i/{i}.webp"></div>'
+                     for i in range(2000))
+    state = 'x' * 200_000
+    head = (f'<html><head><script>window.__INITIAL_STATE__ = "{state}";</script>'
+            f'<style>.breadcrumbs {{ display: flex }}</style></head><body>{filler}')
+    breadcrumbs = (f'<div class="breadcrumbs"><ul class="breadcrumbs__list">'
+                   f'<li><a href="/">Главная</a></li>'
+                   f'<li><a href="/catalog/zhenshchinam">Женщинам</a></li>'
+                   f'<li><a href="/catalog/platya">Платья {index % 7}</a></li>'
+                   f'<li><span>Товар {index}</span></li></ul></div>')
+    tail = []
+    size = len(head) + len(breadcrumbs)
+    while size < size_mb * 1024 * 1024:
+        block = (f'<section class="product-page__details"><p>{"Описание товара. " * 40}</p>'
+                 f'<table>{"<tr><td>Свойство</td><td>Значение</td></tr>" * 30}</table></section>')
+        tail.append(block)
+        size += len(block)
+    return head + breadcrumbs + ''.join(tail) + '</body></html>'
+
+
+def load_corpus(args):
+    products, listings = [], []
+    for path in args.products or []:
+        products.append(open(path, encoding='utf-8').read())
+    for path in args.listings or []:
+        listings.append(open(path, encoding='utf-8').read())
+    if args.page_cache:
+        if API.page_cache is None:
+            print("   (дисковый кэш страниц выключен в PAGE_CACHE_CONFIG)")
+        else:
+            for url in API.page_cache.urls()[:args.limit]:
+                content = API.page_cache.get(url, ignore_ttl=True)
+                if content:
+                    products.append(content)
+    if not products and not listings:
+        random.seed(1)
+        products = [synthetic_product_page(args.synthetic_mb, i) for i in range(args.synthetic_pages)]
+        listings = [synthetic_page(args.synthetic_cards)]
+    return products, listings
+
+
+def category_parser(backend, early_stop):
+    # Для разбора готового HTML браузер не нужен — парсер без __init__
+    parser = WildberriesSellerParser.__new__(WildberriesSellerParser)
+    parser.html_backend = backend
+    parser.breadcrumb_early_stop = early_stop
+    return parser
+
+
+def measure(task, pages, repeats, result):
+    """Выполняется в отдельном процессе: время, tracemalloc и прирост пикового RSS"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    outputs = [task(page) for page in pages]  # прогрев и результаты для сверки
+
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for page in pages:
+            task(page)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = 0
+    for page in pages:
+        tracemalloc.start()
+        task(page)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    result.put((best, peak, rss_growth * 1024, outputs))
+
+
+def run(task, pages, repeats):
+    context = multiprocessing.get_context('fork')
+    result = context.Queue()
+    process = context.Process(target=measure, args=(task, pages, repeats, result))
+    process.start()
+    outcome = result.get()
+    process.join()
+    return outcome
+
+
+def report(label, outcome, pages, baseline=None):
+    elapsed, peak, rss_growth, _ = outcome
+    line = (f"   {label:30} {elapsed / len(pages) * 1000:8.2f} мс/стр, "
+            f"tracemalloc {peak / 1024 / 1024:7.1f} МБ, RSS +{rss_growth / 1024 / 1024:6.1f} МБ")
+    if baseline:
+        line += f"  (x{baseline[0] / elapsed:.1f})"
+    print(line)
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк бэкендов разбора HTML WB")
+    cli.add_argument("--products", nargs="*", help="Сохраненные страницы товаров WB")
+    cli.add_argument("--listings", nargs="*", help="Сохраненные страницы витрины продавца WB")
+    cli.add_argument("--page-cache", action="store_true", help="Страницы товаров из дискового кэша API")
+    cli.add_argument("--limit", type=int, default=100, help="Страниц из кэша")
+    cli.add_argument("--synthetic-mb", type=float, default=2, help="Размер синтетической страницы товара")
+    cli.add_argument("--synthetic-pages", type=int, default=5, help="Синтетических страниц товаров")
+    cli.add_argument("--synthetic-cards", type=int, default=300, help="Карточек в синтетической сетке")
+    cli.add_argument("--repeats", type=int, default=3, help="Повторов, берется лучший")
+    args = cli.parse_args()
+
+    products, listings = load_corpus(args)
+    backends = [HtmlBackend(name) for name in reversed(HtmlBackend.PREFERENCE) if HtmlBackend.available(name)]
+
+    if products:
+        size = sum(len(page) for page in products) / len(products) / 1024 / 1024
+        print(f"📊 Категория со страницы товара: {len(products)} стр., в среднем {size:.1f} МБ")
+        baseline = None
+        for backend in backends:
+            for early_stop in (False, True):
+                parser = category_parser(backend, early_stop)
+                outcome = run(parser._extract_category_from_html, products, args.repeats)
+                label = f"{backend.name} {'крошки' if early_stop else 'вся страница'}"
+                report(label, outcome, products, baseline)
+                baseline = baseline or outcome
+                mismatches = sum(a != b for a, b in zip(outcome[3], baseline[3]))
+                if mismatches:
+                    print(f"   ⚠ категории расходятся с html.parser на {mismatches} страницах")
+
+    if listings:
+        print(f"\n📊 Сетка витрины продавца: {len(listings)} стр.")
+        baseline = None
+        for backend in backends:
+            def select_cards(html, backend=backend):
+                return len(backend.select(backend.parse(html), CARD_SELECTOR))
+
+            outcome = run(select_cards, listings, args.repeats)
+            report(f"{backend.name} ({sum(outcome[3])} карточек)", outcome, listings, baseline)
+            baseline = baseline or outcome
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Бенчмарк подгрузки сетки продавца WB: время до N карточек.
+
+Старый _wait_and_load_products (паузы по 2-3 сек после появления карточек
+и каждой прокрутки, подсчет семью CSS-селекторами, включая div[class*='card'])
+против нынешнего, который ждет события страницы (MutationObserver и
+незавершенные fetch/XHR) и считает карточки одной «живой» коллекцией.
+
+По умолчанию браузер открывает локальную страницу с бесконечной прокруткой:
+карточки приходят порциями по --batch через fetch с задержкой --latency, как
+на витрине WB. --url — замер на настоящей витрине (учитывайте вежливость).
+Печатает версию браузера, время до max_products карточек (медиана и лучший
+из --repeats) и сколько карточек реально на странице (широкие селекторы старого
+варианта считают и обертки карточек). --chrome и --chromedriver — пути, если
+браузер стоит не в стандартном месте (Chrome for Testing, headless-shell).
+
+Пример:
+    python benchmarks/bench_wb_scroll.py --cards 50 100 200 --latency 0.4
+    python benchmarks/bench_wb_scroll.py --chrome /opt/chrome/chrome --chromedriver /opt/chrome/chromedriver
+    python benchmarks/bench_wb_scroll.py --url https://www.wildberries.ru/seller/42582 --cards 100
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from API import WildberriesSellerParser, WB_LISTING_CONFIG  # noqa: E402
+
+LEGACY_SELECTOR = ("article.product-card, div.product-card, [data-nm-id], .card, .product-card, "
+                   "article[class*='card'], div[class*='card']")
+
+PAGE = """<html><head><meta charset="utf-8"></head><body>
+<div class="catalog-page"><div class="product-card-list" id="grid"></div></div>
+<div id="sentinel" style="height: 10px"></div>
+<script>
+var total = %(total)d, loaded = 0, loading = false;
+function card(i) {
+    var id = 100000 + i;
+    return '<article class="product-card j-card-item" data-nm-id="' + id + '">' +
+        '<div class="product-card__wrapper"><a class="product-card__link" href="/catalog/' + id + '/detail.aspx"></a>' +
+        '<div class="product-card__img-wrap" style="height: 320px"></div>' +
+        '<span class="product-card__name">Товар ' + i + '</span></div></article>';
+}
+function more() {
+    if (loading || loaded >= total) { return; }
+    loading = true;
+    fetch('/batch?from=' + loaded).then(function (r) { return r.json(); }).then(function (ids) {
+        document.getElementById('grid').insertAdjacentHTML('beforeend', ids.map(card).join(''));
+        loaded += ids.length;
+        loading = false;
+    });
+}
+new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) { more(); }
+}).observe(document.getElementById('sentinel'));
+</script></body></html>"""
+
+
+def start_server(port, total, batch, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/batch':
+                time.sleep(latency)
+                start = int(parse_qs(url.query).get('from', ['0'])[0])
+                body = json.dumps(list(range(start, min(start + batch, total)))).encode()
+                content_type = 'application/json'
+            else:
+                body = (PAGE % {'total': total}).encode()
+                content_type = 'text/html; charset=utf-8'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_wait_and_load(parser, max_products):
+    """Прежний _wait_and_load_products: паузы и подсчет широкими селекторами"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    try:
+        parser.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, LEGACY_SELECTOR)))
+    except Exception:
+        pass
+    time.sleep(random.uniform(2, 3))
+
+    last_count = len(parser.driver.find_elements(By.CSS_SELECTOR, LEGACY_SELECTOR))
+    same_count = 0
+    for _ in range(10):
+        if last_count >= max_products:
+            break
+        parser.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(random.uniform(2, 3))
+        current_count = len(parser.driver.find_elements(By.CSS_SELECTOR, LEGACY_SELECTOR))
+        if current_count == last_count:
+            same_count += 1
+            if same_count >= 2:
+                break
+        else:
+            same_count = 0
+            last_count = current_count
+    return min(last_count, max_products)
+
+
+def start_browser(args):
+    """Браузер по явным путям; None — пусть парсер запускает свой, как в API"""
+    if not (args.chrome or args.chromedriver):
+        return None
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    options = Options()
+    if not args.visible:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    if args.chrome:
+        options.binary_location = args.chrome
+    service = Service(args.chromedriver) if args.chromedriver else None
+    return webdriver.Chrome(service=service, options=options)
+
+
+def measure(parser, url, load, max_products):
+    parser.driver.get(url)
+    started = time.perf_counter()
+    reported = load(parser, max_products)
+    elapsed = time.perf_counter() - started
+    actual = parser.driver.execute_script("return document.querySelectorAll('[data-nm-id]').length;")
+    return elapsed, reported, actual
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Бенчмарк подгрузки сетки WB: время до N карточек")
+    cli.add_argument("--cards", type=int, nargs="+", default=[50, 100, 200], help="max_products")
+    cli.add_argument("--url", help="Настоящая витрина вместо локальной страницы")
+    cli.add_argument("--total", type=int, default=500, help="Карточек на локальной странице")
+    cli.add_argument("--batch", type=int, default=20, help="Карточек в порции")
+    cli.add_argument("--latency", type=float, default=0.4, help="Сек ответа на порцию")
+    cli.add_argument("--port", type=int, default=5056)
+    cli.add_argument("--repeats", type=int, default=3, help="Замеров на каждый вариант")
+    cli.add_argument("--chrome", help="Путь к браузеру Chrome/Chromium")
+    cli.add_argument("--chromedriver", help="Путь к chromedriver")
+    cli.add_argument("--visible", action="store_true", help="Не скрывать окно браузера")
+    args = cli.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = start_server(args.port, args.total, args.batch, args.latency)
+        url = f"http://127.0.0.1:{args.port}/"
+
+    try:
+        driver = start_browser(args)
+    except Exception as e:
+        print(f"❌ Браузер не запустился: {e}")
+        return
+    parser = WildberriesSellerParser(headless=not args.visible, driver=driver, **WB_LISTING_CONFIG)
+    if not parser.driver:
+        print("❌ Браузер не запустился")
+        return
+
+    print(f"📊 Время до N карточек: {url}")
+    print(f"   браузер {parser.driver.capabilities.get('browserName')} "
+          f"{parser.driver.capabilities.get('browserVersion')}, замеров {args.repeats}")
+    try:
+        for max_products in args.cards:
+            print(f"\n   max_products={max_products}")
+            for label, load in (("паузы + 7 селекторов", legacy_wait_and_load),
+                                ("события страницы", WildberriesSellerParser._wait_and_load_products)):
+                runs = [measure(parser, url, load, max_products) for _ in range(args.repeats)]
+                times = [elapsed for elapsed, _, _ in runs]
+                _, reported, actual = runs[-1]
+                print(f"   {label:22} медиана {statistics.median(times):6.1f} сек, лучший {min(times):6.1f} сек, "
+                      f"насчитано {reported:4}, карточек на странице {actual:4}")
+    finally:
+        parser.close()
+        if driver:
+            driver.quit()
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
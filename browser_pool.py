@@ -0,0 +1,223 @@
+import threading
+import time
+
+
+class BrowserPoolTimeoutError(Exception):
+    """Все браузеры заняты дольше отведенного времени"""
+
+
+class PooledBrowser:
+    """Экземпляр браузера в пуле и его счетчики"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0    # сколько раз выдавался
+        self.pages = 0   # сколько страниц загружено за все время
+
+
+class BrowserPool:
+    """
+    Пул заранее запущенных браузеров (Selenium WebDriver).
+
+    Браузер создается фабрикой driver_factory(), выдается одному потребителю
+    за раз, при выдаче проверяется на живость, а после max_pages_per_driver
+    загруженных страниц или падения закрывается и заменяется новым.
+    """
+
+    def __init__(self, driver_factory, size=2, max_pages_per_driver=200, checkout_timeout=120):
+        if size < 1:
+            raise ValueError("Размер пула браузеров должен быть >= 1")
+
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.checkout_timeout = checkout_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._all = set()
+        self._creating = 0
+        self._closed = False
+
+        self._metrics = {
+            'checkouts': 0,
+            'reuses': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'crashed': 0,
+        }
+
+    # ============================================
+    # ВНУТРЕННИЕ МЕТОДЫ
+    # ============================================
+
+    def _create(self):
+        browser = PooledBrowser(self.driver_factory())
+        with self._cond:
+            self._all.add(browser)
+            self._metrics['created'] += 1
+        return browser
+
+    def _quit(self, browser):
+        with self._cond:
+            self._all.discard(browser)
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+    def _is_alive(self, browser):
+        try:
+            browser.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, browser):
+        """Закрывает лишние вкладки и уводит браузер на пустую страницу"""
+        driver = browser.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+
+    # ============================================
+    # ПУБЛИЧНЫЙ API
+    # ============================================
+
+    def acquire(self):
+        """Выдает браузер, при необходимости ожидая освобождения"""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+        browser = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Пул браузеров закрыт")
+                if self._idle:
+                    browser = self._idle.pop()
+                    break
+                if len(self._all) + self._creating < self.size:
+                    self._creating += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise BrowserPoolTimeoutError(
+                        f"Все браузеры заняты ({self.size}) дольше {self.checkout_timeout} сек"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        if browser is not None and not self._is_alive(browser):
+            # Браузер упал, пока лежал в пуле — заменяем новым
+            with self._cond:
+                self._metrics['crashed'] += 1
+                self._creating += 1
+            self._quit(browser)
+            browser = None
+
+        if browser is None:
+            try:
+                browser = self._create()
+            finally:
+                with self._cond:
+                    self._creating -= 1
+                    self._cond.notify()
+
+        wait_time = time.monotonic() - started
+        with self._cond:
+            if browser.uses:
+                self._metrics['reuses'] += 1
+            browser.uses += 1
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_time_total'] += wait_time
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+            if waited:
+                self._metrics['waits'] += 1
+
+        return browser
+
+    def release(self, browser, pages=0, broken=False):
+        """Возвращает браузер в пул; изношенные и сломанные браузеры закрываются"""
+        browser.pages += pages
+
+        recycle = broken or self._closed
+        if not recycle and self.max_pages_per_driver and browser.pages >= self.max_pages_per_driver:
+            recycle = True
+            with self._cond:
+                self._metrics['recycled'] += 1
+
+        if not recycle:
+            try:
+                self._reset(browser)
+            except Exception:
+                recycle = True
+                with self._cond:
+                    self._metrics['crashed'] += 1
+
+        if recycle:
+            self._quit(browser)
+            with self._cond:
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append(browser)
+            self._cond.notify()
+
+    def warm_up(self):
+        """Заранее запускает браузеры до размера пула"""
+        browsers = []
+        try:
+            while True:
+                with self._cond:
+                    if len(self._all) + self._creating >= self.size:
+                        break
+                browsers.append(self.acquire())
+        finally:
+            for browser in browsers:
+                self.release(browser)
+        return len(browsers)
+
+    def close_all(self):
+        """Закрывает все свободные браузеры; занятые закроются при возврате"""
+        with self._cond:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._cond.notify_all()
+        for browser in idle:
+            self._quit(browser)
+
+    def stats(self):
+        """Метрики пула: ожидание, переиспользование, пересоздания"""
+        now = time.monotonic()
+        with self._cond:
+            metrics = dict(self._metrics)
+            checkouts = metrics['checkouts']
+            metrics.update({
+                'size': self.size,
+                'alive': len(self._all),
+                'idle': len(self._idle),
+                'in_use': len(self._all) - len(self._idle),
+                'wait_time_avg_ms': round(metrics['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(metrics['wait_time_max'] * 1000, 3),
+                'browsers': [
+                    {'uses': b.uses, 'pages': b.pages, 'age_sec': round(now - b.created_at)}
+                    for b in self._all
+                ],
+            })
+            del metrics['wait_time_total']
+            del metrics['wait_time_max']
+        return metrics
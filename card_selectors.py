@@ -0,0 +1,231 @@
+import re
+
+
+# ============================================
+# ДОСТУП К УЗЛАМ РАЗНЫХ ПАРСЕРОВ
+# ============================================
+
+class Bs4Nodes:
+    """Узлы BeautifulSoup (любой builder: html.parser, lxml)"""
+
+    @staticmethod
+    def descendants(node):
+        for child in node.descendants:
+            if child.name is not None:
+                yield child
+
+    @staticmethod
+    def tag(node):
+        return node.name
+
+    @staticmethod
+    def attrs(node):
+        return node.attrs
+
+    @staticmethod
+    def classes(node):
+        value = node.attrs.get('class')
+        if not value:
+            return ()
+        return value if isinstance(value, list) else value.split()
+
+    @staticmethod
+    def attr(node, name):
+        value = node.attrs.get(name)
+        if isinstance(value, list):
+            return ' '.join(value)
+        return value
+
+    @staticmethod
+    def parent(node):
+        return node.parent
+
+    @staticmethod
+    def text(node):
+        return node.get_text(strip=True)
+
+
+class SelectolaxNodes:
+    """Узлы selectolax (HTMLParser / LexborHTMLParser)"""
+
+    @staticmethod
+    def descendants(node):
+        nodes = node.traverse(include_text=False)
+        next(nodes, None)  # сам узел, select_one его тоже не рассматривает
+        return nodes
+
+    @staticmethod
+    def tag(node):
+        return node.tag
+
+    @staticmethod
+    def attrs(node):
+        return node.attributes
+
+    @staticmethod
+    def classes(node):
+        value = node.attributes.get('class')
+        return value.split() if value else ()
+
+    @staticmethod
+    def attr(node, name):
+        return node.attributes.get(name)
+
+    @staticmethod
+    def parent(node):
+        return node.parent
+
+    @staticmethod
+    def text(node):
+        return node.text(deep=True, separator='', strip=True)
+
+
+def nodes_for(node):
+    """Доступ к узлам по типу узла"""
+    if type(node).__module__.startswith('selectolax'):
+        return SelectolaxNodes
+    return Bs4Nodes
+
+
+# ============================================
+# СЕЛЕКТОРЫ
+# ============================================
+
+_COMPOUND_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9-]*)?((?:\.[\w-]+|\[[^\]]+\])*)$')
+_PART_RE = re.compile(r'\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$~|]?=)\s*"([^"]*)"\s*)?\]')
+
+_ATTR_OPS = {
+    None: lambda value, expected: True,
+    '=': lambda value, expected: value == expected,
+    '*=': lambda value, expected: expected in value,
+    '^=': lambda value, expected: value.startswith(expected),
+    '$=': lambda value, expected: value.endswith(expected),
+    '~=': lambda value, expected: expected in value.split(),
+}
+
+
+class CompoundSelector:
+    """Простой селектор без комбинаторов: tag.class[attr*="value"]"""
+
+    __slots__ = ('tag', 'classes', 'attrs')
+
+    def __init__(self, text):
+        match = _COMPOUND_RE.match(text)
+        if not match:
+            raise ValueError(f"Неподдерживаемый селектор: {text}")
+        self.tag = match.group(1).lower() if match.group(1) else None
+        self.classes = []
+        self.attrs = []
+        for cls, name, op, value in _PART_RE.findall(match.group(2)):
+            if cls:
+                self.classes.append(cls)
+            else:
+                if op and op not in _ATTR_OPS:
+                    raise ValueError(f"Неподдерживаемый оператор {op} в селекторе: {text}")
+                self.attrs.append((name, _ATTR_OPS[op or None], value))
+
+    def matches(self, nodes, node, tag, classes):
+        if self.tag and self.tag != tag:
+            return False
+        for cls in self.classes:
+            if cls not in classes:
+                return False
+        for name, test, expected in self.attrs:
+            value = nodes.attr(node, name)
+            if value is None or not test(value, expected):
+                return False
+        return True
+
+
+class Selector:
+    """
+    Скомпилированный CSS-селектор из простых селекторов через пробел
+    (комбинатор потомка): '.card__img img', 'a[href*="/catalog/"]'
+    """
+
+    __slots__ = ('text', 'target', 'ancestors')
+
+    def __init__(self, text):
+        self.text = text
+        parts = [CompoundSelector(part) for part in text.split()]
+        self.target = parts[-1]
+        self.ancestors = parts[:-1]
+
+    def matches(self, nodes, node, tag, classes, scope):
+        if not self.target.matches(nodes, node, tag, classes):
+            return False
+        # Предков проверяем только у подходящих узлов, снизу вверх до карточки
+        pending = len(self.ancestors) - 1
+        current = node
+        while pending >= 0 and current is not scope:
+            current = nodes.parent(current)
+            if current is None:
+                return False
+            if self.ancestors[pending].matches(nodes, current, nodes.tag(current), nodes.classes(current)):
+                pending -= 1
+        return pending < 0
+
+
+class CardExtractor:
+    """
+    Извлечение полей карточки за один обход ее поддерева.
+
+    fields — {поле: [селекторы по приоритету]}: для каждого селектора
+    запоминается первый подходящий узел в порядке документа, как у
+    select_one, так что цепочки запасных селекторов проверяются без
+    повторных обходов. collect — {поле: селектор}: все подходящие узлы.
+    Селекторы компилируются один раз и раскладываются по тегу и классу,
+    поэтому каждый узел проверяется только против возможных кандидатов.
+    Поддерево карточки обходится целиком: какой узел цепочки подойдет,
+    решает вызывающий код по тексту узлов, поэтому нужны все.
+    """
+
+    def __init__(self, fields, collect=None):
+        self.fields = {field: [Selector(text) for text in chain] for field, chain in fields.items()}
+        self.collect = {field: Selector(text) for field, text in (collect or {}).items()}
+
+        # (поле, позиция в цепочке или None для collect, селектор)
+        self._by_class = {}
+        self._by_tag = {}
+        self._generic = []
+        entries = [(field, position, selector)
+                   for field, chain in self.fields.items() for position, selector in enumerate(chain)]
+        entries += [(field, None, selector) for field, selector in self.collect.items()]
+        for entry in entries:
+            target = entry[2].target
+            if target.classes:
+                self._by_class.setdefault(target.classes[0], []).append(entry)
+            elif target.tag:
+                self._by_tag.setdefault(target.tag, []).append(entry)
+            else:
+                self._generic.append(entry)
+
+    def extract(self, card, nodes=None):
+        """
+        {поле: [первый узел по каждому селектору цепочки или None]}
+        и {поле из collect: [все узлы]}
+        """
+        nodes = nodes or nodes_for(card)
+        first = {field: [None] * len(chain) for field, chain in self.fields.items()}
+        collected = {field: [] for field in self.collect}
+        by_class, by_tag, generic = self._by_class, self._by_tag, self._generic
+
+        for node in nodes.descendants(card):
+            tag = nodes.tag(node)
+            classes = nodes.classes(node)
+
+            candidates = by_tag.get(tag, ())
+            for cls in classes:
+                if cls in by_class:
+                    candidates = [*candidates, *by_class[cls]]
+            if generic:
+                candidates = [*candidates, *generic]
+
+            for field, position, selector in candidates:
+                if position is None:
+                    if selector.matches(nodes, node, tag, classes, card):
+                        collected[field].append(node)
+                elif first[field][position] is None and selector.matches(nodes, node, tag, classes, card):
+                    first[field][position] = node
+
+        return first, collected
@@ -0,0 +1,133 @@
+import threading
+
+
+class CategoryMemo:
+    """
+    Запомненные категории товаров: по ID товара и по предмету (subject) WB.
+
+    Категорию WB приходится читать из хлебных крошек на странице товара,
+    хотя у товаров одного предмета она одна и та же. Результаты хранятся
+    в таблице category_memo и переживают перезапуск: повторно страница
+    открывается только для товаров и предметов, которых еще не видели,
+    или для записей старше max_age_days.
+    """
+
+    KIND_PRODUCT = 'product'
+    KIND_SUBJECT = 'subject'
+
+    def __init__(self, get_db, platform='wildberries', max_age_days=30):
+        self.get_db = get_db
+        self.platform = platform
+        self.max_age_days = max_age_days
+
+        self._lock = threading.Lock()
+        self._metrics = {
+            'lookups': 0,
+            'product_hits': 0,
+            'subject_hits': 0,
+            'visits': 0,
+            'visits_avoided': 0,
+            'stored': 0,
+            'errors': 0,
+        }
+
+    def ensure_table(self):
+        """Создает таблицу category_memo"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS category_memo (
+                    platform VARCHAR(20) NOT NULL,
+                    kind VARCHAR(16) NOT NULL,
+                    memo_key VARCHAR(191) NOT NULL,
+                    category VARCHAR(255) NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    PRIMARY KEY (platform, kind, memo_key)
+                )
+            """)
+            conn.commit()
+
+    def _load(self, kind, keys):
+        if not keys:
+            return {}
+        placeholders = ', '.join(['%s'] * len(keys))
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT memo_key, category FROM category_memo
+                WHERE platform = %s AND kind = %s AND memo_key IN ({placeholders})
+                  AND updated_at >= NOW() - INTERVAL %s DAY
+            """, [self.platform, kind, *keys, self.max_age_days])
+            return {row['memo_key']: row['category'] for row in cursor.fetchall()}
+
+    def lookup(self, products):
+        """
+        Категории для товаров [{'id', 'subject_key'}, ...] из памяти.
+        Возвращает {id товара: категория} только для найденных.
+        """
+        product_ids = sorted({str(p['id']) for p in products})
+        subject_keys = sorted({p['subject_key'] for p in products if p.get('subject_key')})
+
+        try:
+            by_product = self._load(self.KIND_PRODUCT, product_ids)
+            by_subject = self._load(self.KIND_SUBJECT, subject_keys)
+        except Exception as e:
+            # Без памяти категорий парсинг продолжается как раньше, через страницы товаров
+            print(f"⚠️  Память категорий недоступна: {e}")
+            with self._lock:
+                self._metrics['errors'] += 1
+            return {}
+
+        found = {}
+        product_hits = subject_hits = 0
+        for product in products:
+            product_id = str(product['id'])
+            if product_id in by_product:
+                found[product_id] = by_product[product_id]
+                product_hits += 1
+            elif product.get('subject_key') in by_subject:
+                found[product_id] = by_subject[product['subject_key']]
+                subject_hits += 1
+
+        with self._lock:
+            self._metrics['lookups'] += len(products)
+            self._metrics['product_hits'] += product_hits
+            self._metrics['subject_hits'] += subject_hits
+        return found
+
+    def remember(self, product_categories, subject_categories=None):
+        """Запоминает {id товара: категория} и {предмет: категория}"""
+        rows = [(self.platform, self.KIND_PRODUCT, str(key)[:191], category[:255])
+                for key, category in product_categories.items()]
+        rows += [(self.platform, self.KIND_SUBJECT, str(key)[:191], category[:255])
+                 for key, category in (subject_categories or {}).items()]
+        if not rows:
+            return
+
+        try:
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.executemany("""
+                    INSERT INTO category_memo (platform, kind, memo_key, category)
+                    VALUES (%s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE category = VALUES(category), updated_at = CURRENT_TIMESTAMP
+                """, rows)
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️  Не удалось сохранить категории: {e}")
+            with self._lock:
+                self._metrics['errors'] += 1
+            return
+
+        with self._lock:
+            self._metrics['stored'] += len(rows)
+
+    def record_visits(self, visits, avoided):
+        """Учет страниц товаров: открытых и тех, что удалось не открывать"""
+        with self._lock:
+            self._metrics['visits'] += visits
+            self._metrics['visits_avoided'] += avoided
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            total = metrics['visits'] + metrics['visits_avoided']
+            metrics['avoided_rate'] = round(metrics['visits_avoided'] / total, 3) if total else 0.0
+        return metrics
@@ -0,0 +1,237 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведенное время"""
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений с MySQL.
+
+    Соединения создаются лениво (не больше max_size), проверяются ping'ом
+    при выдаче, если простаивали дольше health_check_interval, и закрываются,
+    если простаивают дольше max_idle_time (пул не сжимается ниже min_size).
+    """
+
+    def __init__(self, db_config, min_size=1, max_size=10, max_idle_time=300,
+                 checkout_timeout=10, health_check_interval=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула: нужно 0 <= min_size <= max_size, max_size >= 1")
+
+        self.db_config = dict(db_config)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._idle = []  # стек (соединение, время возврата), свежие в конце
+        self._size = 0   # сколько соединений открыто (свободных + выданных)
+        self._in_use = 0
+
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'closed': 0,
+            'health_check_failures': 0,
+            'idle_evictions': 0,
+        }
+
+    # ============================================
+    # ВНУТРЕННИЕ МЕТОДЫ
+    # ============================================
+
+    def _create(self):
+        conn = pymysql.connect(**self.db_config)
+        with self._cond:
+            self._metrics['created'] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._metrics['closed'] += 1
+
+    def _is_alive(self, conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _collect_expired_locked(self):
+        """Забирает из пула соединения, простаивающие дольше max_idle_time (под блокировкой)"""
+        if not self.max_idle_time:
+            return []
+
+        now = time.monotonic()
+        expired = []
+        # Самые старые соединения лежат в начале стека
+        while self._idle and self._size > self.min_size:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.max_idle_time:
+                break
+            self._idle.pop(0)
+            self._size -= 1
+            self._metrics['idle_evictions'] += 1
+            expired.append(conn)
+        return expired
+
+    # ============================================
+    # ПУБЛИЧНЫЙ API
+    # ============================================
+
+    def acquire(self):
+        """Выдает соединение из пула, при необходимости ожидая освобождения"""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+        conn = None
+        returned_at = None
+
+        while True:
+            with self._cond:
+                while True:
+                    expired = self._collect_expired_locked()
+                    if expired:
+                        break
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений с БД за {self.checkout_timeout} сек "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if not expired:
+                break
+            # Просроченные соединения закрываем вне блокировки и пробуем снова — с тем же сроком ожидания
+            for old_conn in expired:
+                self._close(old_conn)
+
+        try:
+            if conn is None:
+                conn = self._create()
+            elif time.monotonic() - returned_at >= self.health_check_interval and not self._is_alive(conn):
+                with self._cond:
+                    self._metrics['health_check_failures'] += 1
+                self._close(conn)
+                conn = self._create()
+        except Exception:
+            # Слот освобождается, чтобы ожидающие потоки могли создать соединение
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        wait_time = time.monotonic() - started
+        with self._cond:
+            self._in_use += 1
+            self._metrics['checkouts'] += 1
+            self._metrics['wait_time_total'] += wait_time
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+            if waited:
+                self._metrics['waits'] += 1
+
+        return conn
+
+    def release(self, conn, broken=False):
+        """Возвращает соединение в пул (или закрывает, если оно сломано)"""
+        if not broken:
+            try:
+                # Сбрасываем незавершенную транзакцию, чтобы следующий
+                # пользователь не получил чужие изменения или старый снимок данных
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if broken:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Контекстный менеджер для работы с соединением:
+
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    ...
+                conn.commit()
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def warm_up(self):
+        """Заранее открывает min_size соединений"""
+        conns = []
+        try:
+            for _ in range(self.min_size):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                self.release(conn)
+        return len(conns)
+
+    def close_all(self):
+        """Закрывает все свободные соединения"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Метрики пула: размер, выдачи, ожидания"""
+        with self._cond:
+            metrics = dict(self._metrics)
+            checkouts = metrics['checkouts']
+            metrics.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'wait_time_avg_ms': round(metrics['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(metrics['wait_time_max'] * 1000, 3),
+            })
+            del metrics['wait_time_total']
+            del metrics['wait_time_max']
+        return metrics
@@ -0,0 +1,157 @@
+import re
+
+
+# ============================================
+# БЭКЕНДЫ РАЗБОРА HTML
+# ============================================
+
+class HtmlBackend:
+    """
+    Разбор HTML страниц WB одним из парсеров: 'html.parser' (BeautifulSoup,
+    как раньше), 'lxml' (BeautifulSoup с builder lxml — тот же API, дерево
+    строится на C) или 'selectolax' (Modest/Lexbor, в разы быстрее и
+    экономнее по памяти). 'auto' — самый быстрый из установленных.
+
+    Узлы обоих семейств понимает card_selectors.nodes_for, поэтому разбор
+    карточек от выбора бэкенда не зависит.
+    """
+
+    PREFERENCE = ('selectolax', 'lxml', 'html.parser')
+
+    def __init__(self, name='auto'):
+        self.requested = name
+        self.name = self._resolve(name)
+
+        if self.name == 'selectolax':
+            from selectolax.parser import HTMLParser
+            self._parse = HTMLParser
+        else:
+            from bs4 import BeautifulSoup
+            self._parse = lambda html: BeautifulSoup(html, self.name)
+
+    @classmethod
+    def available(cls, name):
+        try:
+            if name == 'selectolax':
+                import selectolax.parser  # noqa: F401
+            elif name == 'lxml':
+                import lxml  # noqa: F401
+                import bs4  # noqa: F401
+            elif name == 'html.parser':
+                import bs4  # noqa: F401
+            else:
+                return False
+        except ImportError:
+            return False
+        return True
+
+    @classmethod
+    def _resolve(cls, name):
+        if name != 'auto' and name not in cls.PREFERENCE:
+            raise ValueError(f"Неизвестный парсер HTML: {name}")
+        if name != 'auto' and cls.available(name):
+            return name
+        for candidate in cls.PREFERENCE:
+            if cls.available(candidate):
+                if name != 'auto':
+                    print(f"⚠ Парсер HTML {name} не установлен, использую {candidate}")
+                return candidate
+        raise ImportError("Не установлен ни один парсер HTML: pip install beautifulsoup4")
+
+    @property
+    def is_selectolax(self):
+        return self.name == 'selectolax'
+
+    def parse(self, html):
+        return self._parse(html)
+
+    def select(self, root, selector):
+        if self.is_selectolax:
+            return root.css(selector)
+        return root.select(selector)
+
+    def select_one(self, root, selector):
+        if self.is_selectolax:
+            return root.css_first(selector)
+        return root.select_one(selector)
+
+    def text(self, node, separator=''):
+        """Текст узла без пробелов по краям кусков, как get_text(strip=True, separator=...)"""
+        if self.is_selectolax:
+            parts = (part.strip() for part in node.text(deep=True, separator='\0', strip=False).split('\0'))
+            return separator.join(part for part in parts if part)
+        return node.get_text(strip=True, separator=separator)
+
+
+# ============================================
+# РАННЯЯ ОСТАНОВКА: ТОЛЬКО ХЛЕБНЫЕ КРОШКИ
+# ============================================
+
+_ATTRS = r'(?:"[^"]*"|\'[^\']*\'|[^\'">])*'
+
+_BREADCRUMB_WORD_RE = re.compile(r'bread-?crumb', re.IGNORECASE)
+_START_TAG_RE = re.compile(r'<[a-zA-Z][a-zA-Z0-9-]*(' + _ATTRS + r')>')
+_CLASS_ATTR_RE = re.compile(r'\sclass\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE)
+_TAG_RE = re.compile(r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)(' + _ATTRS + r')>', re.DOTALL)
+_RAW_TEXT_END = {name: re.compile(rf'</{name}\s*>', re.IGNORECASE) for name in ('script', 'style', 'textarea')}
+
+_VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr',
+})
+
+
+def _breadcrumb_start(html):
+    """Позиция открывающего тега первого элемента с breadcrumb в классе"""
+    for word in _BREADCRUMB_WORD_RE.finditer(html):
+        tag_start = html.rfind('<', 0, word.start())
+        if tag_start < 0:
+            continue
+        tag = _START_TAG_RE.match(html, tag_start)
+        if not tag or tag.end() <= word.start():
+            continue  # слово в тексте или в скрипте, а не в атрибутах тега
+        value = _CLASS_ATTR_RE.search(tag.group(1))
+        if value and _BREADCRUMB_WORD_RE.search(value.group(1)):
+            return tag_start
+    return None
+
+
+def breadcrumb_fragment(html):
+    """
+    Поддерево первого элемента с breadcrumb в классе — или None, если такого нет.
+
+    Все селекторы хлебных крошек требуют такой класс у самого элемента или
+    у предка, поэтому строить дерево всей многомегабайтной страницы не нужно:
+    регулярное выражение находит начало области, потоковый разбор тегов
+    считает вложенность и останавливается на закрывающем теге. Дальше
+    парсится только этот кусок.
+    """
+    start = _breadcrumb_start(html)
+    if start is None:
+        return None
+
+    depth = 0
+    position = start
+    while True:
+        match = _TAG_RE.search(html, position)
+        if not match:
+            return html[start:]  # область не закрыта — берем остаток страницы
+        position = match.end()
+        name = match.group(2)
+        if name is None:
+            continue  # комментарий
+        name = name.lower()
+
+        if match.group(1):
+            depth -= 1
+        elif name not in _VOID_TAGS and not match.group(3).rstrip().endswith('/'):
+            depth += 1
+            if name in _RAW_TEXT_END:
+                end = _RAW_TEXT_END[name].search(html, position)
+                if not end:
+                    return html[start:]
+                position = end.end()
+                depth -= 1
+
+        if depth <= 0:
+            return html[start:position]
@@ -0,0 +1,251 @@
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Очередь задач переполнена"""
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач парсинга.
+
+    Задачи выполняются ограниченным пулом потоков, состояние (статус,
+    прогресс, результат) хранится в таблице parse_jobs, поэтому после
+    перезапуска незавершенные задачи можно поднять через recover().
+
+    Обработчик задачи — функция handler(params, progress), где
+    progress(done, total) сообщает о ходе работы. Обработчик возвращает
+    словарь-результат; если в нем success=False, задача считается упавшей.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, get_db, max_workers=2, max_pending=50, progress_interval=1.0):
+        self.get_db = get_db
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.progress_interval = progress_interval
+
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='parse-job')
+        self._lock = threading.Lock()
+        self._pending = 0   # поставлено в пул и еще не завершено
+        self._running = 0
+
+    def register(self, kind, handler):
+        """Регистрирует обработчик для типа задачи"""
+        self._handlers[kind] = handler
+
+    def ensure_table(self):
+        """Создает таблицу parse_jobs"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS parse_jobs (
+                    id CHAR(32) PRIMARY KEY,
+                    kind VARCHAR(32) NOT NULL,
+                    params TEXT,
+                    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                    progress_done INT NOT NULL DEFAULT 0,
+                    progress_total INT NULL,
+                    result MEDIUMTEXT,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP NULL,
+                    finished_at TIMESTAMP NULL,
+                    INDEX idx_status_created (status, created_at)
+                )
+            """)
+            conn.commit()
+
+    # ============================================
+    # ПОСТАНОВКА И ВЫПОЛНЕНИЕ
+    # ============================================
+
+    def submit(self, kind, params):
+        """Ставит задачу в очередь и сразу возвращает ее ID"""
+        if kind not in self._handlers:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Очередь задач заполнена ({self.max_pending}), попробуйте позже")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        try:
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO parse_jobs (id, kind, params, status)
+                    VALUES (%s, %s, %s, %s)
+                """, (job_id, kind, json.dumps(params, ensure_ascii=False), self.STATUS_QUEUED))
+                conn.commit()
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        self._executor.submit(self._run, job_id, kind, params)
+        return job_id
+
+    def recover(self):
+        """Возвращает в очередь задачи, не завершенные до перезапуска"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, kind, params
+                FROM parse_jobs
+                WHERE status IN (%s, %s)
+                ORDER BY created_at
+            """, (self.STATUS_QUEUED, self.STATUS_RUNNING))
+            jobs = cursor.fetchall()
+
+            cursor.execute("""
+                UPDATE parse_jobs
+                SET status = %s, progress_done = 0, started_at = NULL
+                WHERE status = %s
+            """, (self.STATUS_QUEUED, self.STATUS_RUNNING))
+            conn.commit()
+
+        recovered = 0
+        for job in jobs:
+            if job['kind'] not in self._handlers:
+                self._finish(job['id'], self.STATUS_FAILED, error=f"Неизвестный тип задачи: {job['kind']}")
+                continue
+            with self._lock:
+                self._pending += 1
+            params = json.loads(job['params']) if job['params'] else {}
+            self._executor.submit(self._run, job['id'], job['kind'], params)
+            recovered += 1
+
+        return recovered
+
+    def _run(self, job_id, kind, params):
+        with self._lock:
+            self._running += 1
+
+        try:
+            # Забираем задачу атомарно: ее мог уже взять другой процесс API
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE parse_jobs
+                    SET status = %s, started_at = CURRENT_TIMESTAMP
+                    WHERE id = %s AND status = %s
+                """, (self.STATUS_RUNNING, job_id, self.STATUS_QUEUED))
+                claimed = cursor.rowcount
+                conn.commit()
+            if not claimed:
+                print(f"⏭ Задача {job_id} ({kind}) уже выполняется или завершена, пропускаю")
+                return
+
+            result = self._handlers[kind](params, self._make_progress(job_id))
+
+            if isinstance(result, dict) and result.get('success') is False:
+                self._finish(job_id, self.STATUS_FAILED, result=result, error=result.get('error'))
+            else:
+                self._finish(job_id, self.STATUS_DONE, result=result)
+
+        except Exception as e:
+            print(f"❌ Задача {job_id} ({kind}) упала: {traceback.format_exc()}")
+            try:
+                self._finish(job_id, self.STATUS_FAILED, error=str(e))
+            except Exception as db_error:
+                print(f"❌ Не удалось сохранить статус задачи {job_id}: {db_error}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+
+    def _make_progress(self, job_id):
+        """Колбэк прогресса; в БД пишет не чаще раза в progress_interval секунд"""
+        last_write = [0.0]
+
+        def progress(done, total=None):
+            now = time.monotonic()
+            is_last = total is not None and done >= total
+            if not is_last and now - last_write[0] < self.progress_interval:
+                return
+            last_write[0] = now
+            try:
+                with self.get_db() as conn, conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE parse_jobs
+                        SET progress_done = %s, progress_total = COALESCE(%s, progress_total)
+                        WHERE id = %s
+                    """, (done, total, job_id))
+                    conn.commit()
+            except Exception as e:
+                # Прогресс — вспомогательная информация, парсинг из-за него не роняем
+                print(f"⚠️ Не удалось обновить прогресс задачи {job_id}: {e}")
+
+        return progress
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE parse_jobs
+                SET status = %s,
+                    result = %s,
+                    error = %s,
+                    progress_done = IF(%s = 'done', COALESCE(progress_total, progress_done), progress_done),
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (
+                status,
+                json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                error,
+                status,
+                job_id
+            ))
+            conn.commit()
+
+    # ============================================
+    # ЧТЕНИЕ СОСТОЯНИЯ
+    # ============================================
+
+    def get(self, job_id):
+        """Состояние задачи или None, если такой нет"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, kind, params, status, progress_done, progress_total, result, error,
+                       created_at, started_at, finished_at
+                FROM parse_jobs
+                WHERE id = %s
+            """, (job_id,))
+            job = cursor.fetchone()
+
+        if not job:
+            return None
+
+        return {
+            'job_id': job['id'],
+            'kind': job['kind'],
+            'params': json.loads(job['params']) if job['params'] else {},
+            'status': job['status'],
+            'progress': {
+                'done': job['progress_done'],
+                'total': job['progress_total'],
+            },
+            'result': json.loads(job['result']) if job['result'] else None,
+            'error': job['error'],
+            'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+            'started_at': job['started_at'].isoformat() if job['started_at'] else None,
+            'finished_at': job['finished_at'].isoformat() if job['finished_at'] else None,
+        }
+
+    def stats(self):
+        """Загрузка пула задач"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'running': self._running,
+                'queued': self._pending - self._running,
+            }
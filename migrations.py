@@ -0,0 +1,193 @@
+USERS_TABLE_SQL = """
+    CREATE TABLE {name} (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        password_changed_at DATETIME NULL
+    )
+"""
+
+# Индексы products под выборки /products: сортировка (created_at, id) и фильтры
+PRODUCT_INDEXES = {
+    'idx_created': "INDEX idx_created (created_at, id)",
+    'idx_seller_platform_created': "INDEX idx_seller_platform_created (seller_id, platform, created_at, id)",
+    'idx_platform_created': "INDEX idx_platform_created (platform, created_at, id)",
+    'idx_category_created': "INDEX idx_category_created (category, created_at, id)",
+    'idx_brand_created': "INDEX idx_brand_created (brand, created_at, id)",
+    'idx_platform_price': "INDEX idx_platform_price (platform, price)",
+    'ft_title': "FULLTEXT INDEX ft_title (title)",
+}
+
+
+# ============================================
+# МИГРАЦИИ
+# ============================================
+# Каждая миграция идемпотентна: базы, созданные до появления schema_migrations,
+# могут уже иметь часть изменений, и миграции должны на них проходить без ошибок.
+
+def fix_users_table(cursor):
+    """Создает таблицу users или пересоздает ее, если в ней нет обязательных колонок"""
+    cursor.execute("SHOW TABLES LIKE 'users'")
+    if not cursor.fetchone():
+        print("❌ Таблица 'users' не существует, создаю...")
+        cursor.execute(USERS_TABLE_SQL.format(name='users'))
+        print("✅ Таблица 'users' создана")
+        return
+
+    cursor.execute("DESCRIBE users")
+    column_names = [col['Field'] for col in cursor.fetchall()]
+    print(f"📊 Структура таблицы users: {column_names}")
+
+    missing_columns = [column for column in ('username', 'email', 'password_hash') if column not in column_names]
+    if not missing_columns:
+        return
+
+    print(f"⚠️ В таблице users отсутствуют колонки: {missing_columns}")
+    print("🔄 Пробую пересоздать таблицу...")
+
+    cursor.execute("SELECT COUNT(*) as count FROM users")
+    count_result = cursor.fetchone()
+    if count_result and count_result['count'] > 0:
+        # Данные не удаляем: старая таблица остается как users_old
+        print("⚠️ В таблице есть данные! Создаю новую таблицу users_new")
+        cursor.execute(USERS_TABLE_SQL.format(name='users_new'))
+        cursor.execute("DROP TABLE IF EXISTS users_old")
+        cursor.execute("RENAME TABLE users TO users_old, users_new TO users")
+        print("✅ Таблица пересоздана, старые данные в users_old")
+    else:
+        cursor.execute("DROP TABLE users")
+        cursor.execute(USERS_TABLE_SQL.format(name='users'))
+        print("✅ Таблица пересоздана")
+
+
+def create_products_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            seller_id VARCHAR(255),
+            external_id VARCHAR(64) NULL,
+            title TEXT,
+            brand VARCHAR(255),
+            category VARCHAR(255),
+            price DECIMAL(12, 2),
+            platform VARCHAR(20) DEFAULT 'ozon',
+            rating DECIMAL(3, 2),
+            image_url TEXT,
+            product_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scraped_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_seller_platform (seller_id, platform),
+            INDEX idx_platform (platform),
+            UNIQUE KEY uq_platform_seller_product (platform, seller_id, external_id)
+        )
+    """)
+
+
+def add_products_external_id(cursor):
+    # У старых строк external_id = NULL, поэтому уникальный ключ на них не конфликтует
+    cursor.execute("SHOW COLUMNS FROM products LIKE 'external_id'")
+    if not cursor.fetchone():
+        print("🔄 Добавляю колонку external_id и уникальный ключ в products...")
+        cursor.execute("""
+            ALTER TABLE products
+                ADD COLUMN external_id VARCHAR(64) NULL AFTER seller_id,
+                ADD UNIQUE KEY uq_platform_seller_product (platform, seller_id, external_id)
+        """)
+
+
+def add_products_scraped_at(cursor):
+    # scraped_at — когда карточку товара открывали последний раз (для инкрементального режима)
+    cursor.execute("SHOW COLUMNS FROM products LIKE 'scraped_at'")
+    if not cursor.fetchone():
+        print("🔄 Добавляю колонку scraped_at в products...")
+        cursor.execute("""
+            ALTER TABLE products
+                ADD COLUMN scraped_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP AFTER created_at
+        """)
+        cursor.execute("UPDATE products SET scraped_at = created_at")
+
+
+def add_products_indexes(cursor):
+    cursor.execute("SHOW INDEX FROM products")
+    existing_indexes = {row['Key_name'] for row in cursor.fetchall()}
+    missing = [definition for name, definition in PRODUCT_INDEXES.items() if name not in existing_indexes]
+    if missing:
+        print(f"🔄 Добавляю индексы в products: {len(missing)}...")
+        # FULLTEXT в InnoDB добавляется отдельным ALTER
+        for definition in missing:
+            cursor.execute(f"ALTER TABLE products ADD {definition}")
+
+
+def add_users_password_changed_at(cursor):
+    # Момент смены пароля (UTC): токены, выданные раньше, отзываются
+    cursor.execute("SHOW COLUMNS FROM users LIKE 'password_changed_at'")
+    if not cursor.fetchone():
+        print("🔄 Добавляю колонку password_changed_at в users...")
+        cursor.execute("ALTER TABLE users ADD COLUMN password_changed_at DATETIME NULL")
+
+
+# (версия, название, функция). Новые миграции — только в конец списка со следующей версией
+MIGRATIONS = [
+    (1, 'users_table', fix_users_table),
+    (2, 'products_table', create_products_table),
+    (3, 'products_external_id', add_products_external_id),
+    (4, 'products_scraped_at', add_products_scraped_at),
+    (5, 'products_indexes', add_products_indexes),
+    (6, 'users_password_changed_at', add_users_password_changed_at),
+]
+
+
+class MigrationRunner:
+    """
+    Версионные миграции схемы БД, выполняются один раз при старте (init_database).
+
+    Примененные версии хранятся в таблице schema_migrations, поэтому обычный
+    старт — это один SELECT. Несколько процессов API (например, reloader
+    в debug-режиме) не применяют миграции одновременно: на время прогона
+    берется именованная блокировка MySQL (GET_LOCK).
+    """
+
+    LOCK_NAME = 'schema_migrations'
+
+    def __init__(self, get_db, migrations=MIGRATIONS, lock_timeout=60):
+        self.get_db = get_db
+        self.migrations = sorted(migrations, key=lambda migration: migration[0])
+        self.lock_timeout = lock_timeout
+
+    def run(self):
+        """Применяет недостающие миграции по порядку. Возвращает номера примененных версий"""
+        applied_now = []
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (self.LOCK_NAME, self.lock_timeout))
+            if not cursor.fetchone()['locked']:
+                raise RuntimeError("Не удалось получить блокировку миграций: их выполняет другой процесс")
+
+            try:
+                cursor.execute("SELECT version FROM schema_migrations")
+                applied = {row['version'] for row in cursor.fetchall()}
+
+                for version, name, migrate in self.migrations:
+                    if version in applied:
+                        continue
+                    print(f"🔄 Миграция {version}: {name}...")
+                    # DDL в MySQL фиксируется сразу, поэтому версия записывается после каждой миграции
+                    migrate(cursor)
+                    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    conn.commit()
+                    applied_now.append(version)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+                cursor.fetchall()
+        return applied_now
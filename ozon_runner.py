@@ -0,0 +1,245 @@
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+import traceback
+
+PARSER_OZON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parser_ozon')
+
+
+class OzonRunner:
+    """
+    Парсинг Ozon внутри процесса API.
+
+    Держит в отдельном потоке долгоживущий event loop и один браузер
+    Playwright. Каждый парсинг получает в этом браузере свой контекст,
+    поэтому несколько задач могут идти одновременно. Браузер
+    перезапускается, если он упал, и после restart_after парсингов.
+    page_cache (page_cache.PageCache) передается всем парсерам.
+    pacer (rate_limit.AdaptivePacer) — общие паузы между запросами к Ozon
+    вместо фиксированных: parse_seller'ы одновременно делят один бюджет.
+    """
+
+    def __init__(self, run_timeout=300, restart_after=50, page_cache=None, pacer=None):
+        self.run_timeout = run_timeout
+        self.restart_after = restart_after
+        self.page_cache = page_cache
+        self.pacer = pacer
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._module = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None  # asyncio.Lock, создается в потоке loop'а
+        self._browser_runs = 0
+        self._browser_active = 0   # парсингов, работающих в текущем браузере
+        # Колбэки прогресса и пачек товаров пишут в БД — не в потоке loop'а, а по очереди в своем потоке
+        self._callback_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                        thread_name_prefix='ozon-callbacks')
+
+        self._metrics = {
+            'runs': 0,
+            'failures': 0,
+            'in_flight': 0,
+            'browser_launches': 0,
+            'products': 0,
+            'run_time_total': 0.0,
+        }
+
+    # ============================================
+    # EVENT LOOP И БРАУЗЕР
+    # ============================================
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name='ozon-loop', daemon=True)
+            self._thread.start()
+            self._loop = loop
+            return loop
+
+    def _parser_module(self):
+        """ozon_csv_parser импортируется лениво: Playwright нужен только для парсинга Ozon"""
+        if self._module is None:
+            if PARSER_OZON_DIR not in sys.path:
+                sys.path.insert(0, PARSER_OZON_DIR)
+            import ozon_csv_parser
+            self._module = ozon_csv_parser
+        return self._module
+
+    async def _get_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+
+        async with self._browser_lock:
+            # Изношенный браузер перезапускаем, только когда в нем никто не работает
+            stale = self._browser is not None and (
+                not self._browser.is_connected()
+                or (self.restart_after and self._browser_runs >= self.restart_after
+                    and self._browser_active == 0)
+            )
+            if stale:
+                await self._close_browser()
+
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+
+                module = self._parser_module()
+                self._playwright = await async_playwright().start()
+                self._browser = await module.OzonParser.launch_browser(self._playwright)
+                self._browser_runs = 0
+                with self._lock:
+                    self._metrics['browser_launches'] += 1
+
+            self._browser_runs += 1
+            self._browser_active += 1
+            return self._browser
+
+    async def _close_browser(self):
+        # Контексты незавершенных парсингов закроются вместе с браузером
+        browser, playwright = self._browser, self._playwright
+        self._browser, self._playwright = None, None
+        self._browser_active = 0
+        try:
+            if browser:
+                await browser.close()
+        finally:
+            if playwright:
+                await playwright.stop()
+
+    # ============================================
+    # ПАРСИНГ
+    # ============================================
+
+    async def _parse_seller(self, seller_url, pages, max_products, workers, min_interval,
+                            profile, block_resources, progress, needs_refresh, pacing, on_product):
+        module = self._parser_module()
+        parser = module.OzonParser(profile=profile, block_resources=block_resources, page_cache=self.page_cache,
+                                   pacer=self.pacer, pacing=pacing)
+        browser = await self._get_browser()
+        try:
+            await parser.setup_browser(browser=browser)
+            return await module.collect_seller_products(
+                parser, seller_url, pages=pages, max_products=max_products,
+                workers=workers, min_interval=min_interval, progress=progress,
+                needs_refresh=needs_refresh, on_product=on_product,
+            )
+        finally:
+            if browser is self._browser:
+                self._browser_active -= 1
+            try:
+                await parser.close_browser()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _call(callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            print(f"⚠️ Ошибка в колбэке парсинга Ozon: {traceback.format_exc()}")
+
+    def parse_seller(self, seller_url, pages=1, max_products=100, workers=1, min_interval=1.0,
+                     profile='full', block_resources=False, progress=None, needs_refresh=None, pacing=None,
+                     on_batch=None, batch_size=10):
+        """
+        Парсит продавца и возвращает список Product (блокирует вызывающий поток).
+        progress(done, total) вызывается в отдельном потоке колбэков (по порядку,
+        может ходить в БД); needs_refresh(item) — в потоке event loop'а, поэтому
+        должен быть быстрым и без I/O, см. ozon_csv_parser.collect_seller_products.
+        pacing (rate_limit.PacingRun) — куда копить паузы и время загрузки страниц.
+        min_interval действует, только если у раннера нет pacer.
+
+        on_batch(products) получает готовые карточки пачками по batch_size в том
+        же потоке колбэков, пока парсинг идет, — например, чтобы писать их в БД.
+        Остаток отдается после успешного парсинга; если парсинг упал, уже
+        отданные пачки остаются за вызывающим кодом.
+        """
+        loop = self._ensure_loop()
+        started = time.monotonic()
+
+        # Колбэки вызываются в потоке loop'а: только ставим в очередь, работа — в потоке колбэков
+        last_queued = [None]
+
+        def enqueue(callback, *args):
+            last_queued[0] = self._callback_executor.submit(self._call, callback, *args)
+
+        queued_progress = None
+        if progress is not None:
+            def queued_progress(done, total=None):
+                enqueue(progress, done, total)
+
+        batch = []
+        queued_product = None
+        if on_batch is not None:
+            def queued_product(product):
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    enqueue(on_batch, batch[:])
+                    batch.clear()
+
+        with self._lock:
+            self._metrics['in_flight'] += 1
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._parse_seller(seller_url, pages, max_products, workers, min_interval,
+                               profile, block_resources, queued_progress, needs_refresh, pacing,
+                               queued_product),
+            loop
+        )
+        try:
+            products = future.result(timeout=self.run_timeout)
+            if batch:
+                enqueue(on_batch, batch[:])
+        except BaseException:
+            future.cancel()
+            with self._lock:
+                self._metrics['failures'] += 1
+            raise
+        finally:
+            # Колбэки идут по очереди в одном потоке: последний поставленный завершается последним.
+            # Дожидаемся его, чтобы прогресс и пачки не легли после итога задачи
+            if last_queued[0] is not None:
+                try:
+                    last_queued[0].result(timeout=30)
+                except Exception:
+                    pass
+            with self._lock:
+                self._metrics['in_flight'] -= 1
+                self._metrics['runs'] += 1
+                self._metrics['run_time_total'] += time.monotonic() - started
+
+        with self._lock:
+            self._metrics['products'] += len(products)
+        return products
+
+    def close(self):
+        """Закрывает браузер и останавливает event loop"""
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_browser(), loop).result(timeout=30)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._callback_executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            runs = metrics['runs']
+            metrics['run_time_avg_sec'] = round(metrics['run_time_total'] / runs, 3) if runs else 0.0
+            metrics['browser_running'] = self._browser is not None
+            del metrics['run_time_total']
+        return metrics
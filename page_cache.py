@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class PageCache:
+    """
+    Дисковый кэш загруженных страниц товаров (HTML), общий для парсеров WB и Ozon.
+
+    Содержимое хранится по sha256 (content-addressed): одинаковые страницы
+    под разными URL лежат на диске один раз, сжатыми zlib. Индекс URL -> хэш
+    со временем загрузки и последнего обращения — в SQLite рядом с файлами.
+    Записи старше ttl секунд считаются устаревшими, при превышении max_bytes
+    вытесняются давно не использованные (LRU).
+    """
+
+    def __init__(self, directory, ttl=6 * 3600, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at);
+            CREATE INDEX IF NOT EXISTS idx_pages_digest ON pages (digest);
+        """)
+
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stores': 0,
+            'deduplicated': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+        # Занятое место храним счетчиком: пересчет по индексу — только при открытии
+        self._bytes = self._total_bytes()
+
+    # ============================================
+    # ВНУТРЕННИЕ МЕТОДЫ
+    # ============================================
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest[2:])
+
+    def _total_bytes(self):
+        # Размер считаем по уникальным объектам: общий файл занимает место один раз
+        row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM pages)").fetchone()
+        return row[0]
+
+    def _referenced(self, digest):
+        return self._db.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def _release_object(self, digest, size):
+        """Удаляет файл, если на него больше не ссылается ни один URL. Возвращает освобожденные байты"""
+        if self._referenced(digest):
+            return 0
+        # Объект выпадает из учета, даже если файла уже нет на диске
+        self._bytes -= size
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
+        return size
+
+    def _drop(self, url, digest, size):
+        """Удаляет запись индекса и ставший ненужным файл"""
+        self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+        return self._release_object(digest, size)
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for url, digest, size in self._db.execute("SELECT url, digest, size FROM pages ORDER BY accessed_at").fetchall():
+            self._drop(url, digest, size)
+            self._metrics['evictions'] += 1
+            if self._bytes <= self.max_bytes:
+                break
+
+    # ============================================
+    # ПУБЛИЧНЫЕ МЕТОДЫ
+    # ============================================
+
+    def get(self, url, ignore_ttl=False):
+        """
+        HTML страницы из кэша или None. ignore_ttl=True отдает и устаревшие
+        записи — например, чтобы заново прогнать извлечение данных без парсинга.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT digest, size, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self._metrics['misses'] += 1
+                return None
+
+            digest, size, fetched_at = row
+            if not ignore_ttl and self.ttl and now - fetched_at > self.ttl:
+                self._drop(url, digest, size)
+                self._db.commit()
+                self._metrics['expired'] += 1
+                self._metrics['misses'] += 1
+                return None
+
+            try:
+                with open(self._object_path(digest), 'rb') as f:
+                    content = zlib.decompress(f.read()).decode('utf-8')
+            except (OSError, zlib.error):
+                # Файл пропал или поврежден — запись бесполезна
+                self._drop(url, digest, size)
+                self._db.commit()
+                self._metrics['misses'] += 1
+                return None
+
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+            self._metrics['hits'] += 1
+        return content
+
+    def put(self, url, content):
+        """Сохраняет HTML страницы под url"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+
+        with self._lock:
+            if os.path.exists(path):
+                self._metrics['deduplicated'] += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(zlib.compress(content, 6))
+                os.replace(tmp_path, path)
+
+            size = os.path.getsize(path)
+            old = self._db.execute("SELECT digest, size FROM pages WHERE url = ?", (url,)).fetchone()
+            if not self._referenced(digest):
+                self._bytes += size
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, digest, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, size, now, now)
+            )
+            if old and old[0] != digest:
+                self._release_object(old[0], old[1])
+
+            self._metrics['stores'] += 1
+            self._evict()
+            self._db.commit()
+
+    def invalidate(self, url):
+        """Удаляет страницу из кэша (например, если данные на ней устарели раньше ttl)"""
+        with self._lock:
+            row = self._db.execute("SELECT digest, size FROM pages WHERE url = ?", (url,)).fetchone()
+            if row:
+                self._drop(url, row[0], row[1])
+                self._db.commit()
+                self._metrics['invalidations'] += 1
+
+    def urls(self):
+        """URL всех закэшированных страниц"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT url FROM pages ORDER BY fetched_at")]
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            lookups = metrics['hits'] + metrics['misses']
+            metrics.update({
+                'hit_rate': round(metrics['hits'] / lookups, 3) if lookups else 0.0,
+                'entries': self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            })
+        return metrics
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -5,11 +5,12 @@ import os
 import re
 import csv
 import json
+import time
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional
 
 from urllib.parse import quote, urlparse, parse_qsl, urlencode, urlunparse
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Page, async_playwright, TimeoutError as PlaywrightTimeoutError
 
 
 logging.basicConfig(
@@ -42,19 +43,184 @@ class Product:
     seller_orders: Optional[str] = None
 
 
+@dataclass
+class ListingItem:
+    # товар из сетки продавца: то, что видно без захода на карточку
+    id: Optional[str]
+    url: str
+    price: Optional[str]
+
+
+PRODUCT_ID_RE = re.compile(r"/product/[^/]*?(\d+)(?:/|\?|$)")
+
+# Цена из плитки товара в сетке: ближайшая к ссылке плитка, первый элемент, весь текст
+# которого — сумма с ₽. Соседние числа плитки (отзывы, скидка, «осталось N шт») к цене
+# не приклеиваются: запасной поиск по тексту плитки не переходит через перевод строки
+GRID_PRICE_JS = """
+el => {
+    const tile = el.closest('.tile-root, [data-index]') || el.parentElement;
+    if (!tile) { return null; }
+    // Первый элемент с текстом «1 290 ₽» — текущая цена, зачеркнутая идет после
+    for (const node of tile.querySelectorAll('span, div, ins, b')) {
+        if (node.children.length === 0) {
+            const own = node.textContent.match(/^[\\s\\u2009\\u00a0]*(\\d[\\d \\u2009\\u00a0]*?)[ \\u2009\\u00a0]*₽\\s*$/);
+            if (own) { return own[1]; }
+        }
+    }
+    const m = tile.innerText.match(/(\\d[\\d \\u2009\\u00a0]*?)[ \\u2009\\u00a0]*₽/);
+    return m ? m[1] : null;
+}
+"""
+
+
+def product_id_from_url(url: str) -> Optional[str]:
+    m = PRODUCT_ID_RE.search(url)
+    return m.group(1) if m else None
+
+
+# Типы ресурсов, которые не нужны для извлечения данных
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Аналитика и реклама: запросы к этим хостам обрываются
+BLOCKED_URL_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "mc.yandex.ru",
+    "an.yandex.ru",
+    "top-fwz1.mail.ru",
+    "vk.com/rtrg",
+    "criteo",
+    "adfox",
+    "/analytics/",
+    "/tracker/",
+]
+
+# Поля, при наличии которых в JSON-LD быстрый профиль не ждет дозагрузки страницы
+FAST_PROFILE_REQUIRED_FIELDS = ("name", "price")
+
+# Ответы и заглушки антибота: по ним адаптивный пейсер притормаживает запросы к Ozon
+BLOCKED_STATUSES = (403, 429)
+BLOCKED_PAGE_RE = re.compile(r"captcha|доступ ограничен|access denied|antibot", re.IGNORECASE)
+
+
+class DomainRateLimiter:
+    """Разводит запросы к одному домену минимум на min_interval (+ jitter) секунд."""
+
+    def __init__(self, min_interval: float = 1.0, jitter: float = 1.0) -> None:
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot: dict = {}
+
+    async def wait(self, url: str) -> float:
+        # Все воркеры живут в одном event loop, поэтому блокировка не нужна:
+        # слот бронируется синхронно до первого await
+        domain = urlparse(url).netloc
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(domain, now))
+        self._next_slot[domain] = slot + self.min_interval + random.uniform(0, self.jitter)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return slot - now
+
+
+class PacedRateLimiter:
+    """
+    Разводит запросы внешним пейсером с методами reserve(host) / success(host) /
+    failure(host, reason) — например, rate_limit.AdaptivePacer из API, общим
+    для всех парсингов: reserve только бронирует слот, ждем здесь.
+    """
+
+    def __init__(self, pacer) -> None:
+        self.pacer = pacer
+
+    async def wait(self, url: str) -> float:
+        delay = self.pacer.reserve(urlparse(url).netloc)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
 class OzonParser:
-    def __init__(self) -> None:
+    def __init__(self, profile: str = "full", block_resources: bool = False, page_cache=None,
+                 pacer=None, pacing=None) -> None:
+        """
+        profile — "full" (ждем networkidle, скроллим) или "fast" (если JSON-LD
+        уже дал название и цену, страницу не дожидаемся).
+        block_resources — обрывать загрузку картинок, шрифтов, медиа и аналитики.
+        page_cache — кэш HTML карточек с методами get(url) / put(url, html) /
+        invalidate(url) (page_cache.PageCache из API): закэшированная карточка
+        отдается браузеру без запроса к Ozon.
+        pacer — адаптивные паузы между запросами (см. PacedRateLimiter) вместо
+        случайных human_delay; каждая загрузка сообщает ему, нормальная ли
+        пришла страница, капча или пустая.
+        pacing — куда копить паузы и время загрузки страниц (slept(сек) /
+        fetched(сек), rate_limit.PacingRun из API).
+        """
+        if profile not in ("full", "fast"):
+            raise ValueError(f"Неизвестный профиль парсинга: {profile}")
+
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
-
-    async def human_delay(self, min_sec: float = 1.0, max_sec: float = 3.0) -> None:
-        await asyncio.sleep(random.uniform(min_sec, max_sec))
-
-    async def setup_browser(self) -> None:
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
+        self._owns_browser = True
+        self.profile = profile
+        self.block_resources = block_resources
+        self.page_cache = page_cache
+        self.pacer = pacer
+        self.pacing = pacing
+        self._cached_urls: set = set()  # карточки, отданные браузеру из кэша
+        self.stats = {
+            "requests_allowed": 0,
+            "requests_blocked": 0,
+            "fast_path": 0,
+            "full_path": 0,
+            "skipped_unchanged": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
+
+    async def human_delay(self, min_sec: float = 1.0, max_sec: float = 3.0, url: Optional[str] = None) -> None:
+        # С пейсером пауза — до слота домена url, а не случайная
+        if self.pacer is not None and url:
+            delay = self.pacer.reserve(urlparse(url).netloc)
+        else:
+            delay = random.uniform(min_sec, max_sec)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._slept(delay)
+
+    def _slept(self, seconds: float) -> None:
+        if self.pacing is not None and seconds > 0:
+            self.pacing.slept(seconds)
+
+    def _fetched(self, started: float) -> None:
+        if self.pacing is not None:
+            self.pacing.fetched(time.monotonic() - started)
+
+    async def _report(self, url: str, page: Page, response=None, empty: bool = False) -> None:
+        """Сообщает пейсеру исход загрузки: нормальная страница, блокировка, капча или пустая"""
+        if self.pacer is None:
+            return
+        host = urlparse(url).netloc
+        if response is not None and response.status in BLOCKED_STATUSES:
+            self.pacer.failure(host, "blocked")
+            return
+        try:
+            title = await page.title()
+        except Exception:
+            title = ""
+        if BLOCKED_PAGE_RE.search(page.url) or BLOCKED_PAGE_RE.search(title):
+            self.pacer.failure(host, "captcha")
+        elif empty:
+            self.pacer.failure(host, "empty")
+        else:
+            self.pacer.success(host)
+
+    @staticmethod
+    async def launch_browser(playwright):
+        return await playwright.chromium.launch(
             headless=True,
             args=[
                 "--disable-blink-features=AutomationControlled",
@@ -63,6 +229,20 @@ class OzonParser:
                 "--proxy-server=direct://",   # <-- ДОБАВЬ ЭТО
             ],
         )
+
+    async def setup_browser(self, browser=None) -> None:
+        """
+        browser — уже запущенный общий браузер (например, долгоживущий браузер API).
+        Тогда парсер создает в нем только свой контекст и при закрытии закрывает только его.
+        """
+        if browser is None:
+            self.playwright = await async_playwright().start()
+            self.browser = await self.launch_browser(self.playwright)
+            self._owns_browser = True
+        else:
+            self.browser = browser
+            self._owns_browser = False
+
         self.context = await self.browser.new_context(
             viewport={"width": 1920, "height": 1080},
             user_agent=(
@@ -85,11 +265,53 @@ class OzonParser:
             """
         )
 
+        if self.block_resources or self.page_cache is not None:
+            await self.context.route("**/*", self._route_request)
+
         self.page = await self.context.new_page()
         self.page.set_default_timeout(20000)
         self.page.set_default_navigation_timeout(25000)
 
+    async def _route_request(self, route) -> None:
+        request = route.request
+        url = request.url
+        if self.page_cache is not None and request.resource_type == "document" and PRODUCT_ID_RE.search(url):
+            await self._route_product_page(route)
+        elif self.block_resources and (
+            request.resource_type in BLOCKED_RESOURCE_TYPES or any(p in url for p in BLOCKED_URL_PATTERNS)
+        ):
+            self.stats["requests_blocked"] += 1
+            await route.abort()
+        else:
+            self.stats["requests_allowed"] += 1
+            await route.continue_()
+
+    async def _route_product_page(self, route) -> None:
+        """HTML карточки из кэша или из сети с сохранением в кэш"""
+        loop = asyncio.get_running_loop()
+        url = route.request.url
+
+        cached = await loop.run_in_executor(None, self.page_cache.get, url)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            self._cached_urls.add(url)
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=cached)
+            return
+
+        self.stats["cache_misses"] += 1
+        self.stats["requests_allowed"] += 1
+        response = await route.fetch()
+        body = await response.body()
+        # Капча и заглушки JSON-LD товара не содержат — их не кэшируем
+        if response.status == 200 and b"application/ld+json" in body:
+            await loop.run_in_executor(None, self.page_cache.put, url, body)
+        await route.fulfill(response=response, body=body)
+
     async def close_browser(self) -> None:
+        if not self._owns_browser:
+            if self.context:
+                await self.context.close()
+            return
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -167,12 +389,19 @@ class OzonParser:
     #   РЕЖИМ SELLER: сбор ссылок со страницы продавца
     # ============================================================
     async def fetch_product_links_from_seller(self, seller_url: str, pages: int = 1) -> List[str]:
+        return [item.url for item in await self.fetch_seller_listing(seller_url, pages)]
+
+    async def fetch_seller_listing(self, seller_url: str, pages: int = 1) -> List[ListingItem]:
+        """
+        Ссылки на товары продавца вместе с ID и ценой из плиток сетки.
+        Этого хватает, чтобы решить, нужно ли заходить на карточку товара.
+        """
         logger.info(f"Парсим страницу продавца: {seller_url}")
 
         parsed = urlparse(seller_url)
         base_query = dict(parse_qsl(parsed.query))
 
-        all_links: List[str] = []
+        all_links: List[ListingItem] = []
         seen: set = set()
 
         for page_num in range(1, max(1, pages) + 1):
@@ -181,14 +410,14 @@ class OzonParser:
             url_with_page = urlunparse(parsed._replace(query=urlencode(q, doseq=True)))
 
             logger.info(f"Открываем страницу продавца: {url_with_page}")
-            await self.page.goto(url_with_page, wait_until="domcontentloaded", timeout=25000)
+            await self.human_delay(1, 2, url=url_with_page)
+            started = time.monotonic()
+            response = await self.page.goto(url_with_page, wait_until="domcontentloaded", timeout=25000)
             try:
                 await self.page.wait_for_load_state("networkidle", timeout=8000)
             except PlaywrightTimeoutError:
                 pass
 
-            await self.human_delay(1, 2)
-
             selectors_to_wait = [
                 "[data-widget='searchResults']",
                 ".widget-search-result-container",
@@ -229,14 +458,23 @@ class OzonParser:
                 if href in seen:
                     continue
                 seen.add(href)
-                if href.startswith("http"):
-                    all_links.append(href)
-                else:
-                    all_links.append("https://www.ozon.ru" + href)
+                url = href if href.startswith("http") else "https://www.ozon.ru" + href
+
+                price: Optional[str] = None
+                try:
+                    raw_price = await el.evaluate(GRID_PRICE_JS)
+                    price = "".join(ch for ch in raw_price or "" if ch.isdigit()) or None
+                except Exception:
+                    pass
+
+                all_links.append(ListingItem(id=product_id_from_url(url), url=url, price=price))
 
             page_links_count_after = len(all_links)
             added = page_links_count_after - page_links_count_before
             logger.info(f"Страница {page_num}: добавлено {added} ссылок")
+            self._fetched(started)
+            # Пустая первая страница — скорее заглушка, чем продавец без товаров
+            await self._report(url_with_page, self.page, response, empty=not page_elements and page_num == 1)
 
             if added == 0:
                 logger.info("Похоже, товаров больше нет, останавливаемся.")
@@ -257,14 +495,17 @@ class OzonParser:
         """
         logger.info(f"Читаем шапку продавца: {seller_url}")
         try:
-            await self.page.goto(seller_url, wait_until="domcontentloaded", timeout=25000)
+            await self.human_delay(1, 2, url=seller_url)
+            started = time.monotonic()
+            response = await self.page.goto(seller_url, wait_until="domcontentloaded", timeout=25000)
             try:
                 await self.page.wait_for_load_state("networkidle", timeout=8000)
             except PlaywrightTimeoutError:
                 pass
-            await self.human_delay(1, 2)
+            self._fetched(started)
 
             body = await self.page.inner_text("body")
+            await self._report(seller_url, self.page, response, empty=not body.strip())
         except Exception as e:
             logger.warning(f"Не удалось прочитать шапку продавца: {e}")
             return None, None, None
@@ -315,55 +556,31 @@ class OzonParser:
     # ============================================================
     #   ВСПОМОГАТЕЛЬНЫЙ СКРОЛЛ
     # ============================================================
-    async def _scroll_page(self) -> None:
+    async def _scroll_page(self, page: Optional[Page] = None) -> None:
+        page = page or self.page
         try:
             for _ in range(6):
-                await self.page.mouse.wheel(0, 800)
-                await self.page.wait_for_timeout(500)
+                await page.mouse.wheel(0, 800)
+                await page.wait_for_timeout(500)
         except Exception:
             pass
 
     # ============================================================
-    #   ПАРСИНГ ОДНОЙ КАРТОЧКИ ТОВАРА
+    #   JSON-LD
     # ============================================================
-    async def parse_product(
-        self,
-        url: str,
-        seller_rating: Optional[str] = None,
-        seller_feedback: Optional[str] = None,
-        seller_orders: Optional[str] = None,
-    ) -> Product:
-        logger.info(f"Парсим товар: {url}")
-        await self.page.goto(url, wait_until="domcontentloaded", timeout=25000)
-        try:
-            await self.page.wait_for_load_state("networkidle", timeout=8000)
-        except PlaywrightTimeoutError:
-            pass
-
-        await self._scroll_page()
-        await self.page.wait_for_timeout(1000)
-
-        # ---------- Название ----------
-        name = ""
-        try:
-            el = await self.page.query_selector("h1")
-            if el:
-                name = (await el.text_content() or "").strip()
-        except Exception:
-            pass
-
+    async def _extract_json_ld(self, page: Page) -> dict:
+        """Поля товара из JSON-LD разметки (schema.org Product)."""
+        name: Optional[str] = None
+        price: Optional[str] = None
         brand: Optional[str] = None
         rating: Optional[str] = None
         feedbacks: Optional[str] = None
         images: List[str] = []
         description: Optional[str] = None
         seller: Optional[str] = None
-        category: Optional[str] = None
-        subcategory: Optional[str] = None
 
-        # ---------- JSON-LD ----------
         try:
-            scripts = await self.page.query_selector_all("script[type='application/ld+json']")
+            scripts = await page.query_selector_all("script[type='application/ld+json']")
             for s in scripts:
                 raw = await s.text_content()
                 if not raw:
@@ -384,6 +601,21 @@ class OzonParser:
                         continue
 
                     if obj.get("@type") == "Product" or "offers" in obj:
+                        # название
+                        if name is None and isinstance(obj.get("name"), str) and obj["name"].strip():
+                            name = obj["name"].strip()
+
+                        # цена
+                        if price is None:
+                            offers = obj.get("offers")
+                            if isinstance(offers, list) and offers:
+                                offers = offers[0]
+                            if isinstance(offers, dict):
+                                pv = offers.get("price") or offers.get("lowPrice")
+                                digits = re.findall(r"\d+", str(pv).split(".")[0]) if pv is not None else []
+                                if digits:
+                                    price = "".join(digits)
+
                         # бренд
                         if brand is None and "brand" in obj:
                             b = obj["brand"]
@@ -438,6 +670,77 @@ class OzonParser:
         except Exception as e:
             logger.debug(f"Ошибка JSON-LD: {e}")
 
+        return {
+            "name": name,
+            "price": price,
+            "brand": brand,
+            "rating": rating,
+            "feedbacks": feedbacks,
+            "images": images,
+            "description": description,
+            "seller": seller,
+        }
+
+    # ============================================================
+    #   ПАРСИНГ ОДНОЙ КАРТОЧКИ ТОВАРА
+    # ============================================================
+    async def parse_product(
+        self,
+        url: str,
+        seller_rating: Optional[str] = None,
+        seller_feedback: Optional[str] = None,
+        seller_orders: Optional[str] = None,
+        page: Optional[Page] = None,
+        expected_price: Optional[str] = None,
+    ) -> Product:
+        # page — своя вкладка воркера при параллельном парсинге, по умолчанию self.page;
+        # expected_price — цена из сетки продавца: если карточка из кэша показывает
+        # другую, кэш устарел и карточка загружается заново
+        page = page or self.page
+        logger.info(f"Парсим товар: {url}")
+        started = time.monotonic()
+        response = await page.goto(url, wait_until="domcontentloaded", timeout=25000)
+
+        # JSON-LD приходит в исходном HTML, ожидание сети для него не нужно
+        ld = await self._extract_json_ld(page)
+
+        # Быстрый профиль: если JSON-LD уже дал обязательные поля,
+        # не ждем networkidle, не скроллим и не ждем галерею
+        fast = self.profile == "fast" and all(ld.get(f) for f in FAST_PROFILE_REQUIRED_FIELDS)
+        if fast:
+            self.stats["fast_path"] += 1
+        else:
+            self.stats["full_path"] += 1
+            try:
+                await page.wait_for_load_state("networkidle", timeout=8000)
+            except PlaywrightTimeoutError:
+                pass
+
+            await self._scroll_page(page)
+            await page.wait_for_timeout(1000)
+
+        # ---------- Название ----------
+        name = ""
+        try:
+            el = await page.query_selector("h1")
+            if el:
+                name = (await el.text_content() or "").strip()
+        except Exception:
+            pass
+        if not name:
+            name = ld.get("name") or ""
+
+        category: Optional[str] = None
+        subcategory: Optional[str] = None
+
+        # ---------- JSON-LD ----------
+        brand = ld.get("brand")
+        rating = ld.get("rating")
+        feedbacks = ld.get("feedbacks")
+        images = list(ld.get("images") or [])
+        description = ld.get("description")
+        seller = ld.get("seller")
+
         # ---------- бренд: fallback ----------
         if brand is None:
             sels = [
@@ -450,7 +753,7 @@ class OzonParser:
             ]
             for sel in sels:
                 try:
-                    el = await self.page.query_selector(sel)
+                    el = await page.query_selector(sel)
                     if not el:
                         continue
                     txt = (await el.text_content() or "").strip()
@@ -471,7 +774,7 @@ class OzonParser:
         ]
         for sel in price_selectors:
             try:
-                el = await self.page.query_selector(sel)
+                el = await page.query_selector(sel)
                 if el:
                     text = (await el.text_content() or "").strip()
                     text = text.replace("\u00a0", " ")
@@ -481,11 +784,13 @@ class OzonParser:
                         break
             except Exception:
                 continue
+        if price is None:
+            price = ld.get("price")
 
         # ---------- рейтинг / отзывы: fallback ----------
         if rating is None or feedbacks is None:
             try:
-                link = await self.page.query_selector("a[href*='#section-reviews']")
+                link = await page.query_selector("a[href*='#section-reviews']")
                 if link:
                     txt = (await link.text_content() or "").strip()
                     txt = txt.replace("\u00a0", " ")
@@ -502,7 +807,7 @@ class OzonParser:
 
         if rating is None:
             try:
-                el = await self.page.query_selector("[itemprop='ratingValue']")
+                el = await page.query_selector("[itemprop='ratingValue']")
                 if el:
                     t = (await el.text_content() or "") or (await el.get_attribute("content") or "")
                     t = t.strip()
@@ -513,7 +818,7 @@ class OzonParser:
 
         if feedbacks is None:
             try:
-                el = await self.page.query_selector("[itemprop='reviewCount']")
+                el = await page.query_selector("[itemprop='reviewCount']")
                 if el:
                     t = (await el.text_content() or "") or (await el.get_attribute("content") or "")
                     t = t.strip()
@@ -527,7 +832,7 @@ class OzonParser:
         # ---------- описание: fallback ----------
         if description is None:
             try:
-                el = await self.page.query_selector("[itemprop='description']")
+                el = await page.query_selector("[itemprop='description']")
                 if el:
                     txt = (await el.text_content() or "").strip()
                     if txt:
@@ -537,7 +842,7 @@ class OzonParser:
 
         if description is None:
             try:
-                el = await self.page.query_selector("div[data-widget='webDescription']")
+                el = await page.query_selector("div[data-widget='webDescription']")
                 if el:
                     txt = (await el.text_content() or "").strip()
                     if txt:
@@ -549,12 +854,13 @@ class OzonParser:
         try:
             seen = dict.fromkeys(images or [])
 
-            try:
-                await self.page.wait_for_selector("[data-widget='webGallery']", timeout=8000)
-            except PlaywrightTimeoutError:
-                pass
+            if not fast:
+                try:
+                    await page.wait_for_selector("[data-widget='webGallery']", timeout=8000)
+                except PlaywrightTimeoutError:
+                    pass
 
-            gallery = await self.page.query_selector("[data-widget='webGallery']")
+            gallery = await page.query_selector("[data-widget='webGallery']")
             if gallery:
                 els = await gallery.query_selector_all("img")
                 for el in els:
@@ -586,7 +892,7 @@ class OzonParser:
 
         # ---------- seller / category / subcategory из текста ----------
         try:
-            body_text = await self.page.inner_text("body")
+            body_text = await page.inner_text("body")
         except Exception:
             body_text = ""
 
@@ -622,7 +928,7 @@ class OzonParser:
             ]
 
             for sel in crumb_selectors:
-                els = await self.page.query_selector_all(sel)
+                els = await page.query_selector_all(sel)
                 if not els:
                     continue
 
@@ -646,14 +952,24 @@ class OzonParser:
         except Exception:
             pass
 
-        # ---------- ID товара ----------
-        product_id: Optional[str] = None
-        m = re.search(r"/product/[^/]*?(\d+)(?:/|\?|$)", url)
-        if m:
-            product_id = m.group(1)
+        from_cache = page.url in self._cached_urls
+        self._cached_urls.discard(page.url)
+        self._fetched(started)
+        if not from_cache:
+            await self._report(url, page, response, empty=not name and not price)
+        if from_cache and expected_price and price != expected_price:
+            logger.info(f"Цена в кэше устарела ({price} != {expected_price}), загружаем заново: {url}")
+            await asyncio.get_running_loop().run_in_executor(None, self.page_cache.invalidate, page.url)
+            return await self.parse_product(
+                url,
+                seller_rating=seller_rating,
+                seller_feedback=seller_feedback,
+                seller_orders=seller_orders,
+                page=page,
+            )
 
         return Product(
-            id=product_id,
+            id=product_id_from_url(url),
             name=name or "Без названия",
             brand=brand,
             price=price,
@@ -670,6 +986,77 @@ class OzonParser:
             seller_orders=seller_orders,
         )
 
+    # ============================================================
+    #   ПАРАЛЛЕЛЬНЫЙ ПАРСИНГ КАРТОЧЕК
+    # ============================================================
+    async def _new_worker_page(self) -> Page:
+        page = await self.context.new_page()
+        page.set_default_timeout(20000)
+        page.set_default_navigation_timeout(25000)
+        return page
+
+    async def parse_products_concurrently(
+        self,
+        urls: List[str],
+        workers: int = 4,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+        seller_rating: Optional[str] = None,
+        seller_feedback: Optional[str] = None,
+        seller_orders: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        expected_prices: Optional[List[Optional[str]]] = None,
+        on_product: Optional[Callable[[Product], None]] = None,
+    ) -> List[Optional[Product]]:
+        """
+        Парсит карточки в workers вкладках одного браузера.
+        Результаты возвращаются в порядке urls; на месте упавших карточек — None.
+        progress(done, total) вызывается после каждой карточки.
+        expected_prices — цены из сетки продавца в порядке urls (см. parse_product).
+        on_product(product) получает каждую карточку сразу после разбора, в порядке готовности.
+        """
+        rate_limiter = rate_limiter or DomainRateLimiter()
+        results: List[Optional[Product]] = [None] * len(urls)
+        semaphore = asyncio.Semaphore(max(1, workers))
+        pages: List[Page] = []
+        done = 0
+
+        async def parse_one(index: int, url: str) -> None:
+            nonlocal done
+            async with semaphore:
+                # Вкладка берется из свободных или открывается новая (не больше workers)
+                page = pages.pop() if pages else await self._new_worker_page()
+                try:
+                    self._slept(await rate_limiter.wait(url))
+                    results[index] = await self.parse_product(
+                        url,
+                        seller_rating=seller_rating,
+                        seller_feedback=seller_feedback,
+                        seller_orders=seller_orders,
+                        page=page,
+                        expected_price=expected_prices[index] if expected_prices else None,
+                    )
+                    if on_product and results[index] is not None:
+                        on_product(results[index])
+                except Exception as e:
+                    logger.warning(f"Не удалось спарсить товар {url}: {e}")
+                finally:
+                    pages.append(page)
+                    done += 1
+                    logger.info(f"[{done}/{len(urls)}] Товар обработан")
+                    if progress:
+                        progress(done, len(urls))
+
+        try:
+            await asyncio.gather(*(parse_one(i, url) for i, url in enumerate(urls)))
+        finally:
+            for page in pages:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+        return results
+
     # ============================================================
     #   РЕЖИМ: ПОИСКОВЫЙ
     # ============================================================
@@ -720,8 +1107,15 @@ class OzonParser:
 # ================================================================
 #   ОБЁРТКИ ДЛЯ ЗАПУСКА
 # ================================================================
-async def run_parser_query(query: str, output: str, pages: int = 1, max_products: int = 15) -> None:
-    parser = OzonParser()
+async def run_parser_query(
+    query: str,
+    output: str,
+    pages: int = 1,
+    max_products: int = 15,
+    profile: str = "full",
+    block_resources: bool = False,
+) -> None:
+    parser = OzonParser(profile=profile, block_resources=block_resources)
     products, stats = await parser.search_products(query, pages=pages, max_products=max_products)
 
     if not products:
@@ -767,9 +1161,9 @@ async def run_parser_query(query: str, output: str, pages: int = 1, max_products
     print(f"\nФайл сохранён: {output}")
 
 
-async def run_parser_url(url: str, output: str) -> None:
+async def run_parser_url(url: str, output: str, profile: str = "full", block_resources: bool = False) -> None:
     """Режим: один товар по URL."""
-    parser = OzonParser()
+    parser = OzonParser(profile=profile, block_resources=block_resources)
     products: List[Product] = []
     stats: str
 
@@ -831,42 +1225,96 @@ async def run_parser_url(url: str, output: str) -> None:
     print(f"\nФайл сохранён: {output}")
 
 
-async def run_parser_seller(seller_url: str, output: str, pages: int = 1, max_products: int = 100) -> None:
-    """Режим: все товары продавца по URL seller."""
-    parser = OzonParser()
+async def collect_seller_products(
+    parser: OzonParser,
+    seller_url: str,
+    pages: int = 1,
+    max_products: int = 100,
+    workers: int = 1,
+    min_interval: float = 1.0,
+    progress: Optional[Callable[[int, int], None]] = None,
+    needs_refresh: Optional[Callable[[ListingItem], bool]] = None,
+    on_product: Optional[Callable[[Product], None]] = None,
+) -> List[Product]:
+    """
+    Собирает товары продавца парсером с уже поднятым браузером (setup_browser).
+    Используется и CLI (run_parser_seller), и API напрямую, без CSV.
+    Карточки разводятся parser.pacer, если он есть, иначе — min_interval.
+    on_product(product) — каждая готовая карточка, не дожидаясь остальных.
+
+    needs_refresh(item) — инкрементальный режим: получает товар из сетки
+    (ID, URL, цена) и решает, открывать ли его карточку. Пропущенные товары
+    в результат не попадают, их число — в parser.stats["skipped_unchanged"].
+    """
+    # сперва вытащим данные продавца из шапки
+    seller_rating, seller_feedback, seller_orders = await parser.parse_seller_header(seller_url)
+
+    # затем соберём ссылки на товары вместе с ценами из сетки
+    listing = await parser.fetch_seller_listing(seller_url, pages=pages)
+    if not listing:
+        return []
+
+    if max_products:
+        listing = listing[:max_products]
+
+    if needs_refresh:
+        fresh = [item for item in listing if needs_refresh(item)]
+        parser.stats["skipped_unchanged"] += len(listing) - len(fresh)
+        logger.info(f"Без изменений с прошлого парсинга: {len(listing) - len(fresh)} товаров")
+        listing = fresh
+
+    links = [item.url for item in listing]
+    if not links:
+        return []
+
+    logger.info(f"Будет обработано товаров: {len(links)}")
+
+    results = await parser.parse_products_concurrently(
+        links,
+        workers=workers,
+        rate_limiter=(PacedRateLimiter(parser.pacer) if parser.pacer is not None
+                      else DomainRateLimiter(min_interval=min_interval, jitter=min_interval)),
+        seller_rating=seller_rating,
+        seller_feedback=seller_feedback,
+        seller_orders=seller_orders,
+        progress=progress,
+        expected_prices=[item.price for item in listing],
+        on_product=on_product,
+    )
+    return [p for p in results if p is not None]
+
+
+async def run_parser_seller(
+    seller_url: str,
+    output: str,
+    pages: int = 1,
+    max_products: int = 100,
+    workers: int = 1,
+    min_interval: float = 1.0,
+    profile: str = "full",
+    block_resources: bool = False,
+) -> None:
+    """
+    Режим: все товары продавца по URL seller.
+
+    workers — сколько карточек парсить одновременно (вкладки одного браузера),
+    min_interval — минимальный интервал между запросами к домену Ozon,
+    profile / block_resources — см. OzonParser.
+    """
+    parser = OzonParser(profile=profile, block_resources=block_resources)
     products: List[Product] = []
+    started = time.monotonic()
 
     try:
         await parser.setup_browser()
-
-        # сперва вытащим данные продавца из шапки
-        seller_rating, seller_feedback, seller_orders = await parser.parse_seller_header(seller_url)
-
-        # затем соберём ссылки на товары
-        links = await parser.fetch_product_links_from_seller(seller_url, pages=pages)
-
-        if not links:
+        products = await collect_seller_products(
+            parser, seller_url, pages=pages, max_products=max_products,
+            workers=workers, min_interval=min_interval,
+        )
+        if not products:
             print("Не удалось найти товары на странице продавца.")
             return
 
-        if max_products:
-            links = links[:max_products]
-
-        total_links = len(links)
-        logger.info(f"Будет обработано товаров: {total_links}")
-
-        for i, url in enumerate(links, 1):
-            logger.info(f"[{i}/{total_links}] Парсим товар продавца")
-            product = await parser.parse_product(
-                url,
-                seller_rating=seller_rating,
-                seller_feedback=seller_feedback,
-                seller_orders=seller_orders,
-            )
-            products.append(product)
-            if i < total_links:
-                await parser.human_delay(1, 2)
-
     except Exception as e:
         logger.error(f"Ошибка при парсинге продавца: {e}")
         print(f"Ошибка при парсинге продавца: {e}")
@@ -915,10 +1363,15 @@ async def run_parser_seller(seller_url: str, output: str, pages: int = 1, max_pr
     with_prices = sum(1 for p in products if p.price)
     with_ratings = sum(1 for p in products if p.rating)
     with_fb = sum(1 for p in products if p.feedbacks)
+    elapsed = time.monotonic() - started
+    per_minute = total / elapsed * 60 if elapsed > 0 else 0.0
 
     stats = (
         "Статистика парсинга (режим SELLER):\n"
         f"• Всего товаров: {total}\n"
+        f"• Время: {elapsed:.1f} сек, {per_minute:.1f} товаров/мин (воркеров: {workers})\n"
+        f"• Профиль: {profile}, быстрых карточек: {parser.stats['fast_path']}, "
+        f"заблокировано запросов: {parser.stats['requests_blocked']}\n"
         f"• С ценами: {with_prices}\n"
         f"• С рейтингами: {with_ratings}\n"
         f"• С отзывами: {with_fb}\n"
@@ -981,6 +1434,31 @@ if __name__ == "__main__":
         help="Максимальное число товаров (для --query и --seller-url)",
     )
 
+    cli_parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Сколько карточек парсить параллельно (для --seller-url)",
+    )
+    cli_parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=1.0,
+        help="Минимальный интервал между запросами к Ozon, сек (для --seller-url)",
+    )
+
+    cli_parser.add_argument(
+        "--profile",
+        choices=["full", "fast"],
+        default="full",
+        help="full — ждать полной загрузки карточки; fast — хватает JSON-LD, если в нем есть название и цена",
+    )
+    cli_parser.add_argument(
+        "--block-resources",
+        action="store_true",
+        help="Не загружать картинки, шрифты, медиа и аналитику",
+    )
+
     args = cli_parser.parse_args()
 
     if args.url:
@@ -988,6 +1466,8 @@ if __name__ == "__main__":
             run_parser_url(
                 url=args.url,
                 output=args.output,
+                profile=args.profile,
+                block_resources=args.block_resources,
             )
         )
     elif args.seller_url:
@@ -997,6 +1477,10 @@ if __name__ == "__main__":
                 output=args.output,
                 pages=args.pages,
                 max_products=args.max_products,
+                workers=args.workers,
+                min_interval=args.min_interval,
+                profile=args.profile,
+                block_resources=args.block_resources,
             )
         )
     else:
@@ -1006,5 +1490,7 @@ if __name__ == "__main__":
                 output=args.output,
                 pages=args.pages,
                 max_products=args.max_products,
+                profile=args.profile,
+                block_resources=args.block_resources,
             )
         )
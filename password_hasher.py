@@ -0,0 +1,148 @@
+import concurrent.futures
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusyError(Exception):
+    """Очередь хеширования паролей переполнена"""
+
+
+def _noop():
+    return None
+
+
+class PasswordHasher:
+    """
+    Хеширование и проверка паролей в отдельных процессах.
+
+    PBKDF2/scrypt намеренно медленные и держат GIL: поток запроса, который
+    считает хеш, тормозит все остальные эндпоинты процесса. Здесь хеши
+    считаются в пуле из workers процессов, а в ожидании может быть не больше
+    max_pending операций — остальные сразу получают HasherBusyError (503),
+    а не копятся в очереди. workers=0 — считать в потоке запроса, как раньше.
+
+    method — метод generate_password_hash для новых хешей. Хеш, посчитанный
+    другим методом или с другой стоимостью, needs_rehash помечает устаревшим,
+    и при следующем успешном входе пароль перехешируется.
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=64,
+                 queue_timeout=1.0, timeout=30):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hashes': 0,
+            'verifies': 0,
+            'rejected': 0,
+            'pending': 0,
+            'busy_time': 0.0,
+            'pool_restarts': 0,
+        }
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # fork не импортирует API заново в каждом процессе (spawn выполнил бы весь модуль)
+                context = (multiprocessing.get_context('fork')
+                           if 'fork' in multiprocessing.get_all_start_methods() else None)
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                                        mp_context=context)
+            return self._executor
+
+    def _reset_executor(self, broken):
+        """Выбрасывает пул, в котором умер процесс (OOM, kill): такой пул падает на каждой задаче"""
+        with self._executor_lock:
+            # Другой поток мог уже пересоздать пул
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                with self._lock:
+                    self._metrics['pool_restarts'] += 1
+
+    def _submit(self, func, *args):
+        executor = self._get_executor()
+        try:
+            return executor.submit(func, *args).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            print("⚠️ Процесс хеширования паролей умер, перезапускаю пул")
+            self._reset_executor(executor)
+            return self._get_executor().submit(func, *args).result(timeout=self.timeout)
+
+    def warm_up(self):
+        """Запускает процессы пула заранее — до того, как в API появятся фоновые потоки"""
+        if not self.workers:
+            return 0
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+        return self.workers
+
+    def _run(self, kind, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._metrics['rejected'] += 1
+            raise HasherBusyError("Сервер перегружен проверкой паролей, повторите попытку позже")
+
+        started = time.perf_counter()
+        with self._lock:
+            self._metrics['pending'] += 1
+        try:
+            if not self.workers:
+                return func(*args)
+            try:
+                return self._submit(func, *args)
+            except concurrent.futures.TimeoutError:
+                raise HasherBusyError("Проверка пароля не уложилась во время, повторите попытку позже")
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._metrics['pending'] -= 1
+                self._metrics[kind] += 1
+                self._metrics['busy_time'] += time.perf_counter() - started
+
+    def hash(self, password):
+        """Хеш пароля текущим методом"""
+        if self.method:
+            return self._run('hashes', generate_password_hash, password, self.method)
+        return self._run('hashes', generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        """Совпадает ли пароль с хешем"""
+        return self._run('verifies', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Посчитан ли хеш не текущим методом (другой алгоритм или стоимость)"""
+        if not self.method or not password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != self.method
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            operations = metrics['hashes'] + metrics['verifies']
+            metrics.update({
+                'avg_time_ms': round(metrics.pop('busy_time') / operations * 1000, 1) if operations else 0.0,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'method': self.method,
+            })
+        return metrics
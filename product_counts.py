@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProductCounts:
+    """
+    Число товаров для /products без COUNT(*) на каждый запрос.
+
+    Число товаров по (seller_id, platform) берется из сводной таблицы
+    seller_stats (product_stats.ProductStats), которая обновляется в той же
+    транзакции, что и запись товаров, поэтому итог для фильтров
+    по продавцу/платформе — это сумма нескольких строк.
+    Для остальных фильтров есть оценка по плану запроса (EXPLAIN) и точный
+    COUNT(*) по запросу клиента. Все итоги кэшируются до следующей записи
+    товаров (invalidate) или на cache_ttl секунд.
+    """
+
+    def __init__(self, get_db, cache_ttl=300, cache_size=1024):
+        self.get_db = get_db
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # ключ -> (итог, время вычисления)
+        self._generation = 0         # растет при каждой записи товаров
+        self._metrics = {
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'counter_queries': 0,
+            'estimate_queries': 0,
+            'exact_queries': 0,
+            'invalidations': 0,
+        }
+
+    def invalidate(self):
+        """Сбрасывает кэш итогов — вызывается после записи товаров"""
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+            self._metrics['invalidations'] += 1
+
+    # ============================================
+    # ИТОГИ
+    # ============================================
+
+    def _cached(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and now - entry[1] < self.cache_ttl:
+                self._cache.move_to_end(key)
+                self._metrics['cache_hits'] += 1
+                return entry[0]
+            self._metrics['cache_misses'] += 1
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            # Пока считали, товары могли записать — такой итог не кэшируем
+            if generation != self._generation:
+                return value
+            self._cache[key] = (value, now)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def from_counters(self, seller_id=None, platform=None):
+        """Точное число товаров продавца и/или платформы из сводки seller_stats"""
+        def compute():
+            query = "SELECT COALESCE(SUM(products), 0) AS total FROM seller_stats WHERE 1=1"
+            params = []
+            if seller_id:
+                query += " AND seller_id = %s"
+                params.append(seller_id)
+            if platform:
+                query += " AND platform = %s"
+                params.append(platform)
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.execute(query, params)
+                with self._lock:
+                    self._metrics['counter_queries'] += 1
+                return int(cursor.fetchone()['total'])
+
+        return self._cached(('counters', seller_id, platform), compute)
+
+    def estimate(self, where, params):
+        """Оценка числа строк по плану запроса (EXPLAIN), без чтения самих строк"""
+        def compute():
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.execute(f"EXPLAIN SELECT id FROM products{where}", params)
+                plan = cursor.fetchall()
+                with self._lock:
+                    self._metrics['estimate_queries'] += 1
+            if not plan or plan[0].get('rows') is None:
+                return None
+            filtered = plan[0].get('filtered') or 100
+            return int(plan[0]['rows'] * float(filtered) / 100)
+
+        return self._cached(('estimate', where, tuple(params)), compute)
+
+    def exact(self, where, params):
+        """Точный COUNT(*) по фильтрам"""
+        def compute():
+            with self.get_db() as conn, conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) AS total FROM products{where}", params)
+                with self._lock:
+                    self._metrics['exact_queries'] += 1
+                return cursor.fetchone()['total']
+
+        return self._cached(('exact', where, tuple(params)), compute)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['cached_totals'] = len(self._cache)
+        return metrics
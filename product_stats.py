@@ -0,0 +1,212 @@
+import threading
+
+
+class StatsDelta:
+    """Изменение сводки по одному продавцу: сколько товаров и на сколько сдвинулись суммы"""
+
+    __slots__ = ('products', 'price_sum', 'price_count', 'rating_sum', 'rating_count')
+
+    def __init__(self):
+        self.products = 0
+        self.price_sum = 0.0
+        self.price_count = 0
+        self.rating_sum = 0.0
+        self.rating_count = 0
+
+    def add(self, price, rating, sign=1, count_product=True):
+        """Учитывает товар (sign=1) или убирает его старые значения (sign=-1)"""
+        if count_product:
+            self.products += sign
+        if price is not None:
+            self.price_sum += sign * float(price)
+            self.price_count += sign
+        if rating is not None:
+            self.rating_sum += sign * float(rating)
+            self.rating_count += sign
+
+    def merge(self, other):
+        for field in self.__slots__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def __bool__(self):
+        return any(getattr(self, field) for field in self.__slots__)
+
+
+class ProductStats:
+    """
+    Сводные таблицы для /stats вместо агрегатов по всей products.
+
+    seller_stats — число товаров и суммы цен/рейтингов по (seller_id, platform),
+    platform_stats — то же по платформе плюс число продавцов. Обе таблицы
+    обновляются в транзакции записи товаров (apply), поэтому /stats читает
+    O(платформ + top-N) строк. rebuild() пересчитывает их по products целиком —
+    для первого запуска и после ручных правок данных.
+    """
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+        self._lock = threading.Lock()
+        self._metrics = {
+            'applied': 0,
+            'rebuilds': 0,
+        }
+
+    def ensure_tables(self):
+        """Создает сводные таблицы и заполняет их, если они пустые"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS seller_stats (
+                    seller_id VARCHAR(255) NOT NULL,
+                    platform VARCHAR(20) NOT NULL,
+                    products INT NOT NULL DEFAULT 0,
+                    price_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+                    price_count INT NOT NULL DEFAULT 0,
+                    rating_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    rating_count INT NOT NULL DEFAULT 0,
+                    first_parse TIMESTAMP NULL,
+                    last_parse TIMESTAMP NULL,
+                    PRIMARY KEY (seller_id, platform),
+                    INDEX idx_products (products),
+                    INDEX idx_platform (platform)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS platform_stats (
+                    platform VARCHAR(20) NOT NULL PRIMARY KEY,
+                    products INT NOT NULL DEFAULT 0,
+                    sellers INT NOT NULL DEFAULT 0,
+                    price_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+                    price_count INT NOT NULL DEFAULT 0,
+                    rating_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+                    rating_count INT NOT NULL DEFAULT 0,
+                    first_parse TIMESTAMP NULL,
+                    last_parse TIMESTAMP NULL
+                )
+            """)
+            cursor.execute("SELECT 1 FROM platform_stats LIMIT 1")
+            empty = cursor.fetchone() is None
+            conn.commit()
+
+        if empty:
+            self.rebuild()
+
+    def rebuild(self):
+        """Пересчитывает сводные таблицы по products (полный проход). Возвращает число продавцов"""
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM seller_stats")
+            cursor.execute("DELETE FROM platform_stats")
+            cursor.execute("""
+                INSERT INTO seller_stats (seller_id, platform, products, price_sum, price_count,
+                                          rating_sum, rating_count, first_parse, last_parse)
+                SELECT COALESCE(seller_id, ''), COALESCE(platform, ''), COUNT(*),
+                       COALESCE(SUM(price), 0), COUNT(price), COALESCE(SUM(rating), 0), COUNT(rating),
+                       MIN(created_at), MAX(created_at)
+                FROM products
+                GROUP BY COALESCE(seller_id, ''), COALESCE(platform, '')
+            """)
+            sellers = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO platform_stats (platform, products, sellers, price_sum, price_count,
+                                            rating_sum, rating_count, first_parse, last_parse)
+                SELECT platform, SUM(products), COUNT(*), SUM(price_sum), SUM(price_count),
+                       SUM(rating_sum), SUM(rating_count), MIN(first_parse), MAX(last_parse)
+                FROM seller_stats
+                GROUP BY platform
+            """)
+            conn.commit()
+
+        with self._lock:
+            self._metrics['rebuilds'] += 1
+        return sellers
+
+    def apply(self, cursor, seller_id, platform, delta):
+        """Применяет изменение по продавцу к сводкам (в транзакции записи товаров)"""
+        if not delta:
+            return
+        seller_id, platform = seller_id or '', platform or ''
+
+        cursor.execute("SELECT 1 FROM seller_stats WHERE seller_id = %s AND platform = %s FOR UPDATE",
+                       (seller_id, platform))
+        new_seller = cursor.fetchone() is None
+
+        values = (delta.products, delta.price_sum, delta.price_count, delta.rating_sum, delta.rating_count)
+        touched = delta.products > 0
+        cursor.execute(f"""
+            INSERT INTO seller_stats (seller_id, platform, products, price_sum, price_count,
+                                      rating_sum, rating_count, first_parse, last_parse)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON DUPLICATE KEY UPDATE
+                products = products + VALUES(products),
+                price_sum = price_sum + VALUES(price_sum),
+                price_count = price_count + VALUES(price_count),
+                rating_sum = rating_sum + VALUES(rating_sum),
+                rating_count = rating_count + VALUES(rating_count)
+                {', last_parse = CURRENT_TIMESTAMP' if touched else ''}
+        """, (seller_id, platform, *values))
+        cursor.execute(f"""
+            INSERT INTO platform_stats (platform, products, sellers, price_sum, price_count,
+                                        rating_sum, rating_count, first_parse, last_parse)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON DUPLICATE KEY UPDATE
+                products = products + VALUES(products),
+                sellers = sellers + VALUES(sellers),
+                price_sum = price_sum + VALUES(price_sum),
+                price_count = price_count + VALUES(price_count),
+                rating_sum = rating_sum + VALUES(rating_sum),
+                rating_count = rating_count + VALUES(rating_count)
+                {', last_parse = CURRENT_TIMESTAMP' if touched else ''}
+        """, (platform, delta.products, int(new_seller), *values[1:]))
+
+        with self._lock:
+            self._metrics['applied'] += 1
+
+    # ============================================
+    # ЧТЕНИЕ
+    # ============================================
+
+    def summary(self, top_n=20):
+        """
+        Данные /stats: общая сводка, сводка по платформам и top_n продавцов.
+        Продавцы считаются по платформам: ID продавцов WB и Ozon не пересекаются.
+        """
+        with self.get_db() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    CAST(COALESCE(SUM(products), 0) AS SIGNED) AS total_products,
+                    CAST(COALESCE(SUM(sellers), 0) AS SIGNED) AS total_sellers,
+                    COUNT(*) AS total_platforms,
+                    SUM(price_sum) / NULLIF(SUM(price_count), 0) AS avg_price,
+                    MIN(first_parse) AS first_parse,
+                    MAX(last_parse) AS last_parse
+                FROM platform_stats
+                WHERE products > 0
+            """)
+            totals = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT
+                    platform,
+                    products AS product_count,
+                    sellers AS seller_count,
+                    price_sum / NULLIF(price_count, 0) AS avg_price,
+                    rating_sum / NULLIF(rating_count, 0) AS avg_rating
+                FROM platform_stats
+                WHERE products > 0
+                ORDER BY product_count DESC
+            """)
+            platforms = cursor.fetchall()
+
+            # Индекс idx_products: читаются только top_n строк
+            cursor.execute("""
+                SELECT seller_id, platform, products AS product_count
+                FROM seller_stats
+                ORDER BY products DESC
+                LIMIT %s
+            """, (top_n,))
+            sellers = cursor.fetchall()
+
+        return totals, platforms, sellers
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics)
@@ -0,0 +1,264 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+class HostRateLimiter:
+    """
+    Ограничитель частоты запросов к одному хосту.
+
+    Запросы к каждому хосту разводятся не чаще чем раз в min_interval секунд
+    (плюс случайная добавка до jitter секунд). Ограничитель потокобезопасен
+    и может быть общим для нескольких парсеров, тогда бюджет вежливости
+    соблюдается суммарно.
+    """
+
+    def __init__(self, min_interval=0.5, jitter=0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+
+        self._lock = threading.Lock()
+        self._next_slot = {}  # хост -> ближайшее время, когда можно слать запрос
+
+        self._metrics = {
+            'requests': 0,
+            'delayed': 0,
+            'delay_total': 0.0,
+        }
+
+    def reserve(self, host):
+        """
+        Бронирует слот для запроса к хосту и возвращает, сколько секунд
+        нужно подождать до него (не ждет сам — подходит и для asyncio).
+        """
+        now = time.monotonic()
+        with self._lock:
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval(host)
+
+            delay = slot - now
+            self._metrics['requests'] += 1
+            if delay > 0:
+                self._metrics['delayed'] += 1
+                self._metrics['delay_total'] += delay
+        return delay
+
+    def _interval(self, host):
+        """Интервал до следующего слота хоста (вызывается под self._lock)"""
+        return self.min_interval + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def wait(self, host):
+        """Блокирует поток до разрешенного момента запроса к хосту"""
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def success(self, host):
+        """Ответ хоста в порядке — фиксированный интервал обратную связь не учитывает"""
+
+    def failure(self, host, reason='error'):
+        """Капча, блокировка или пустая страница — см. AdaptivePacer"""
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics.update({
+                'hosts': len(self._next_slot),
+                'min_interval': self.min_interval,
+                'delay_total_sec': round(metrics.pop('delay_total'), 3),
+            })
+        return metrics
+
+
+class AdaptivePacer(HostRateLimiter):
+    """
+    Паузы между запросами к хосту, подстраивающиеся под его ответы (AIMD).
+
+    У каждого хоста свой интервал: начинается с initial_interval, после
+    каждого нормального ответа (success) уменьшается на step, но не ниже
+    min_interval; после капчи, блокировки (429/403) или пустой страницы
+    (failure) умножается на backoff, но не выше max_interval, и ближайший
+    слот хоста сдвигается на новый интервал — притормаживают все потоки
+    и парсеры, которые делят этот пейсер. jitter — случайная добавка
+    в долях интервала.
+    """
+
+    FAILURE_REASONS = ('captcha', 'blocked', 'empty', 'error')
+
+    def __init__(self, initial_interval=2.0, min_interval=0.5, max_interval=30.0,
+                 step=0.25, backoff=2.0, jitter=0.25):
+        super().__init__(min_interval=min_interval, jitter=jitter)
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.step = step
+        self.backoff = backoff
+
+        self._intervals = {}  # хост -> текущий интервал
+        self._metrics.update({
+            'successes': 0,
+            'failures': {reason: 0 for reason in self.FAILURE_REASONS},
+        })
+
+    def _interval(self, host):
+        interval = self._intervals.get(host, self.initial_interval)
+        return interval * (1 + random.uniform(0, self.jitter)) if self.jitter else interval
+
+    def interval(self, host):
+        """Текущий интервал хоста без случайной добавки"""
+        with self._lock:
+            return self._intervals.get(host, self.initial_interval)
+
+    def success(self, host):
+        with self._lock:
+            interval = self._intervals.get(host, self.initial_interval)
+            self._intervals[host] = max(self.min_interval, interval - self.step)
+            self._metrics['successes'] += 1
+
+    def failure(self, host, reason='error'):
+        if reason not in self.FAILURE_REASONS:
+            reason = 'error'
+        now = time.monotonic()
+        with self._lock:
+            interval = max(self.min_interval, self._intervals.get(host, self.initial_interval))
+            interval = min(self.max_interval, interval * self.backoff)
+            self._intervals[host] = interval
+            self._next_slot[host] = max(self._next_slot.get(host, now), now + interval)
+            self._metrics['failures'][reason] += 1
+
+    def stats(self):
+        metrics = super().stats()
+        with self._lock:
+            metrics['failures'] = dict(self._metrics['failures'])
+            metrics['intervals'] = {host: round(interval, 2) for host, interval in self._intervals.items()}
+        return metrics
+
+
+class PacingRun:
+    """
+    Время одного парсинга: сколько ушло на паузы вежливости и сколько на
+    загрузку страниц. Загрузки в параллельных вкладках суммируются, поэтому
+    fetch_sec может быть больше wall_sec.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.sleep_time = 0.0
+        self.fetch_time = 0.0
+        self.pages = 0
+
+    def slept(self, seconds):
+        if seconds and seconds > 0:
+            with self._lock:
+                self.sleep_time += seconds
+        return seconds
+
+    def fetched(self, seconds):
+        with self._lock:
+            self.fetch_time += seconds
+            self.pages += 1
+
+    @contextmanager
+    def fetching(self):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.fetched(time.monotonic() - started)
+
+    def summary(self):
+        with self._lock:
+            wall = time.monotonic() - self.started
+            return {
+                'wall_sec': round(wall, 2),
+                'sleep_sec': round(self.sleep_time, 2),
+                'fetch_sec': round(self.fetch_time, 2),
+                'pages': self.pages,
+                'sleep_share': round(self.sleep_time / wall, 3) if wall > 0 else 0.0,
+            }
+
+
+class AttemptLimiter:
+    """
+    Ограничитель попыток по ключам (например, входов по IP и по логину).
+
+    Для каждого вида ключа задается limits[вид] = (попыток, окно в секундах):
+    в скользящем окне допускается не больше указанного числа попыток.
+    retry_after сообщает, сколько ждать до следующей разрешенной попытки.
+
+    Ключи каждого вида лежат в OrderedDict по времени последней попытки:
+    ключи, чье окно уже прошло, снимаются с начала при каждой попытке
+    (амортизированно O(1)), а сверх max_keys ключей одного вида вытесняются
+    самые давние — память ограничена и при переборе IP или логинов.
+    """
+
+    def __init__(self, limits, max_keys=100000):
+        self.limits = limits
+        self.max_keys = max_keys
+
+        self._lock = threading.Lock()
+        self._attempts = {kind: OrderedDict() for kind in limits}  # вид -> ключ -> времена попыток в окне
+
+        self._metrics = {
+            'attempts': 0,
+            'limited': 0,
+            'evicted': 0,
+        }
+
+    def _window(self, kind, key, now):
+        max_attempts, window = self.limits[kind]
+        keys = self._attempts[kind]
+        attempts = keys.get(key)
+        if attempts:
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if not attempts:
+                del keys[key]
+        return attempts or deque(), max_attempts, window
+
+    def retry_after(self, kind, key):
+        """Секунды до разрешенной попытки (0 — можно сейчас)"""
+        now = time.monotonic()
+        with self._lock:
+            attempts, max_attempts, window = self._window(kind, key, now)
+            if len(attempts) < max_attempts:
+                return 0
+            self._metrics['limited'] += 1
+            return attempts[len(attempts) - max_attempts] + window - now
+
+    def hit(self, kind, key):
+        """Учитывает попытку"""
+        now = time.monotonic()
+        with self._lock:
+            attempts, max_attempts, window = self._window(kind, key, now)
+            attempts.append(now)
+            while len(attempts) > max_attempts:
+                attempts.popleft()  # для retry_after хватает последних max_attempts попыток
+            keys = self._attempts[kind]
+            keys[key] = attempts
+            keys.move_to_end(key)
+            self._metrics['attempts'] += 1
+
+            # В начале — ключи с самой давней последней попыткой: снимаем, пока их окно прошло
+            while keys:
+                oldest = next(iter(keys.values()))
+                if oldest[-1] > now - window:
+                    break
+                keys.popitem(last=False)
+            while len(keys) > self.max_keys:
+                keys.popitem(last=False)
+                self._metrics['evicted'] += 1
+
+    def reset(self, kind, key):
+        """Забывает попытки по ключу (например, после успешного входа)"""
+        with self._lock:
+            self._attempts[kind].pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['tracked_keys'] = sum(len(keys) for keys in self._attempts.values())
+        return metrics
@@ -0,0 +1,225 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class ResponseCache:
+    """
+    Кэш готовых JSON-ответов читающих эндпоинтов (/products, /stats).
+
+    Ключ — эндпоинт и нормализованные параметры запроса. У каждой записи есть
+    область (seller_id, platform) — по каким фильтрам она построена; запись
+    товаров продавца сбрасывает только ответы, которые могли от нее измениться:
+    с тем же продавцом/платформой или без фильтра по ним.
+
+    По умолчанию кэш хранится в процессе (TTL + LRU по max_entries). С redis_url
+    ответы лежат в Redis и общие для всех процессов API; вытеснение там — по
+    политике maxmemory самого Redis, TTL задается на каждый ключ.
+    """
+
+    ANY = '*'
+
+    def __init__(self, ttl=60, max_entries=512, redis_url=None, prefix='solutionfactory:responses:'):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # ключ -> (тело, etag, время записи, область)
+        self._scopes = {}              # область -> ключи
+        self._generation = 0           # растет при каждом сбросе
+
+        self._redis = None
+        if redis_url:
+            if redis is None:
+                print("⚠️  Пакет redis не установлен, кэш ответов хранится в процессе (pip install redis)")
+            else:
+                self._redis = redis.Redis.from_url(redis_url)
+
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'not_modified': 0,
+            'invalidations': 0,
+            'invalidated_entries': 0,
+            'evictions': 0,
+            'errors': 0,
+        }
+
+    @classmethod
+    def scope(cls, seller_id=None, platform=None):
+        return f"{seller_id or cls.ANY}|{platform or cls.ANY}"
+
+    @staticmethod
+    def make_key(endpoint, args):
+        """
+        Ключ ответа: эндпоинт и отсортированные непустые параметры. Значения
+        экранируются, иначе ?platform=ozon%26seller_id%3Dx совпал бы по ключу
+        с ?platform=ozon&seller_id=x и подменил бы его ответ.
+        """
+        items = sorted((name, value) for name, value in args.items(multi=True) if value != '')
+        return endpoint + '?' + urlencode(items)
+
+    def _redis_key(self, key):
+        return self.prefix + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _error(self, e):
+        print(f"⚠️  Кэш ответов (Redis) недоступен: {e}")
+        with self._lock:
+            self._metrics['errors'] += 1
+
+    # ============================================
+    # ЧТЕНИЕ И ЗАПИСЬ
+    # ============================================
+
+    def generation(self):
+        """Номер сброса: ответ, посчитанный до сброса, в кэш не кладется"""
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """(тело, etag) из кэша или None"""
+        entry = None
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(self._redis_key(key))
+            except Exception as e:
+                self._error(e)
+                raw = None
+            if raw is not None:
+                etag, _, body = raw.partition(b'\n')
+                entry = (body, etag.decode('ascii'))
+        else:
+            now = time.monotonic()
+            with self._lock:
+                stored = self._entries.get(key)
+                if stored is not None and now - stored[2] < self.ttl:
+                    self._entries.move_to_end(key)
+                    entry = stored[:2]
+                elif stored is not None:
+                    self._remove(key)
+
+        with self._lock:
+            self._metrics['hits' if entry else 'misses'] += 1
+        return entry
+
+    def put(self, key, scope, body, etag, generation):
+        """Сохраняет ответ, если с начала его вычисления кэш не сбрасывали"""
+        with self._lock:
+            if generation != self._generation:
+                return False
+
+        if self._redis is not None:
+            try:
+                redis_key = self._redis_key(key)
+                pipe = self._redis.pipeline()
+                pipe.set(redis_key, etag.encode('ascii') + b'\n' + body, ex=self.ttl)
+                pipe.sadd(self.prefix + 'scope:' + scope, redis_key)
+                pipe.expire(self.prefix + 'scope:' + scope, self.ttl)
+                pipe.execute()
+            except Exception as e:
+                self._error(e)
+                return False
+        else:
+            with self._lock:
+                if generation != self._generation:
+                    return False
+                self._remove(key)
+                self._entries[key] = (body, etag, time.monotonic(), scope)
+                self._scopes.setdefault(scope, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+                    self._metrics['evictions'] += 1
+
+        with self._lock:
+            self._metrics['stores'] += 1
+        return True
+
+    def _remove(self, key):
+        stored = self._entries.pop(key, None)
+        if stored is None:
+            return False
+        keys = self._scopes.get(stored[3])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[stored[3]]
+        return True
+
+    def record_not_modified(self):
+        with self._lock:
+            self._metrics['not_modified'] += 1
+
+    # ============================================
+    # СБРОС
+    # ============================================
+
+    def invalidate(self, seller_id=None, platform=None):
+        """
+        Сбрасывает ответы, на которые влияет запись товаров продавца seller_id
+        на платформе platform: с этими фильтрами и без фильтра по ним
+        """
+        scopes = {self.scope(s, p) for s in (seller_id, None) for p in (platform, None)}
+        removed = 0
+
+        with self._lock:
+            self._generation += 1
+            self._metrics['invalidations'] += 1
+            if self._redis is None:
+                for scope in scopes:
+                    for key in list(self._scopes.get(scope, ())):
+                        removed += self._remove(key)
+
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                for scope in scopes:
+                    keys = self._redis.smembers(self.prefix + 'scope:' + scope)
+                    if keys:
+                        pipe.delete(*keys)
+                        removed += len(keys)
+                    pipe.delete(self.prefix + 'scope:' + scope)
+                pipe.execute()
+            except Exception as e:
+                self._error(e)
+
+        with self._lock:
+            self._metrics['invalidated_entries'] += removed
+        return removed
+
+    def clear(self):
+        """Сбрасывает все ответы (например, после пересчета сводок)"""
+        with self._lock:
+            self._generation += 1
+            self._metrics['invalidations'] += 1
+            self._entries.clear()
+            self._scopes.clear()
+
+        if self._redis is not None:
+            try:
+                keys = list(self._redis.scan_iter(match=self.prefix + '*'))
+                if keys:
+                    self._redis.delete(*keys)
+            except Exception as e:
+                self._error(e)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            lookups = metrics['hits'] + metrics['misses']
+            metrics.update({
+                'hit_rate': round(metrics['hits'] / lookups, 3) if lookups else 0.0,
+                'backend': 'redis' if self._redis is not None else 'memory',
+                'entries': len(self._entries) if self._redis is None else None,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            })
+        return metrics
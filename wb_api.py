@@ -0,0 +1,238 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class WildberriesBlockedError(Exception):
+    """WB ответил блокировкой (403/429/498) или отдал не JSON (капча)"""
+
+
+# Публичные JSON-эндпоинты витрины WB. Переопределяются в конфиге,
+# например, чтобы направить клиента на локальный стаб с записанными ответами.
+WB_API_ENDPOINTS = {
+    'seller_catalog': 'https://catalog.wb.ru/sellers/v2/catalog',
+    'brand_catalog': 'https://catalog.wb.ru/brands/v2/catalog',
+    'brand_info': 'https://static-basket-01.wbbasket.ru/vol0/data/brands/{slug}.json',
+}
+
+# Шардирование картинок по серверам basket-XX: верхняя граница vol для каждого сервера.
+# WB добавляет новые серверы по мере роста каталога — все, что выше, уходит на последний.
+_BASKET_VOL_LIMITS = (143, 287, 431, 719, 1007, 1061, 1115, 1169, 1313, 1601, 1655, 1919, 2045,
+                      2189, 2405, 2621, 2837, 3053, 3269, 3485, 3701, 3917, 4133, 4349, 4565)
+
+
+def wb_image_url(nm_id):
+    """URL первой картинки товара по его артикулу (nm_id)"""
+    nm_id = int(nm_id)
+    vol = nm_id // 100000
+    part = nm_id // 1000
+    basket = next((i for i, limit in enumerate(_BASKET_VOL_LIMITS, 1) if vol <= limit),
+                  len(_BASKET_VOL_LIMITS) + 1)
+    return f"https://basket-{basket:02d}.wbbasket.ru/vol{vol}/part{part}/{nm_id}/images/big/1.webp"
+
+
+class WildberriesApiClient:
+    """
+    Получение товаров продавца/бренда WB через JSON-каталог, без браузера.
+
+    Использует одну requests.Session с пулом соединений; первая страница
+    каталога дает общее число товаров, остальные страницы запрашиваются
+    параллельно (не больше max_workers). При блокировке бросает
+    WildberriesBlockedError — вызывающий код переключается на Selenium.
+    """
+
+    BLOCK_STATUSES = (403, 429, 498)
+    PAGE_SIZE = 100  # товаров на странице каталога WB
+
+    def __init__(self, endpoints=None, timeout=10, max_workers=4, dest=-1257786,
+                 rate_limiter=None, user_agent=None):
+        self.endpoints = dict(WB_API_ENDPOINTS, **(endpoints or {}))
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.dest = dest
+        self.rate_limiter = rate_limiter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'ru-RU,ru;q=0.9',
+        })
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wb-api')
+        self._lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'pages': 0,
+            'products': 0,
+            'blocked': 0,
+            'errors': 0,
+            'request_time_total': 0.0,
+        }
+
+    # ============================================
+    # HTTP
+    # ============================================
+
+    def _get_json(self, url, params=None):
+        host = urlparse(url).netloc
+        if self.rate_limiter:
+            self.rate_limiter.wait(host)
+
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                self._metrics['errors'] += 1
+            if self.rate_limiter:
+                self.rate_limiter.failure(host, 'error')
+            raise
+        finally:
+            with self._lock:
+                self._metrics['requests'] += 1
+                self._metrics['request_time_total'] += time.monotonic() - started
+
+        if response.status_code in self.BLOCK_STATUSES:
+            with self._lock:
+                self._metrics['blocked'] += 1
+            if self.rate_limiter:
+                self.rate_limiter.failure(host, 'blocked')
+            raise WildberriesBlockedError(f"WB вернул {response.status_code} для {url}")
+        response.raise_for_status()
+
+        try:
+            data = response.json()
+        except ValueError:
+            with self._lock:
+                self._metrics['blocked'] += 1
+            if self.rate_limiter:
+                self.rate_limiter.failure(host, 'captcha')
+            raise WildberriesBlockedError(f"WB вернул не JSON для {url} (капча?)")
+
+        if self.rate_limiter:
+            self.rate_limiter.success(host)
+        return data
+
+    def resolve_brand_id(self, brand):
+        """Числовой ID бренда по его slug из URL (/brands/<slug>)"""
+        if str(brand).isdigit():
+            return int(brand)
+        data = self._get_json(self.endpoints['brand_info'].format(slug=brand))
+        return int(data['id'])
+
+    def _catalog_query(self, entity_info):
+        params = {
+            'appType': 1,
+            'curr': 'rub',
+            'dest': self.dest,
+            'sort': 'popular',
+            'spp': 30,
+        }
+        if entity_info['type'] == 'seller':
+            params['supplier'] = entity_info['id']
+            return self.endpoints['seller_catalog'], params
+
+        params['brand'] = self.resolve_brand_id(entity_info['id'])
+        return self.endpoints['brand_catalog'], params
+
+    def _fetch_page(self, url, params, page):
+        data = self._get_json(url, dict(params, page=page))
+        payload = data.get('data') or {}
+        products = payload.get('products') or []
+        with self._lock:
+            self._metrics['pages'] += 1
+        return products, payload.get('total')
+
+    # ============================================
+    # ТОВАРЫ
+    # ============================================
+
+    def fetch_entity_products(self, entity_info, max_products=50, progress=None):
+        """
+        Товары продавца/бренда (entity_info из extract_wb_entity_info)
+        в формате WildberriesSellerParser._parse_product_card.
+        """
+        url, params = self._catalog_query(entity_info)
+
+        items, total = self._fetch_page(url, params, 1)
+        if not items:
+            return []
+
+        wanted = min(total, max_products) if total else max_products
+        pages = math.ceil(wanted / self.PAGE_SIZE)
+
+        if pages > 1:
+            if total:
+                futures = [self._executor.submit(self._fetch_page, url, params, page)
+                           for page in range(2, pages + 1)]
+                for future in futures:
+                    page_items, _ = future.result()
+                    items.extend(page_items)
+            else:
+                # Общее число товаров неизвестно — идем по страницам, пока не кончатся
+                for page in range(2, pages + 1):
+                    page_items, _ = self._fetch_page(url, params, page)
+                    if not page_items:
+                        break
+                    items.extend(page_items)
+
+        products = [self._product_from_json(item, entity_info) for item in items[:max_products]]
+        with self._lock:
+            self._metrics['products'] += len(products)
+
+        if progress:
+            progress(len(products), len(products))
+        return products
+
+    @staticmethod
+    def _extract_price(item):
+        """Цена в рублях: v2 отдает цены по размерам в копейках, старый формат — salePriceU"""
+        for size in item.get('sizes') or []:
+            price = (size.get('price') or {}).get('product')
+            if price:
+                return int(price) // 100
+        if item.get('salePriceU'):
+            return int(item['salePriceU']) // 100
+        return 0
+
+    def _product_from_json(self, item, entity_info):
+        nm_id = item.get('id')
+        entity = item.get('entity') or ''
+        return {
+            'id': str(nm_id),
+            'url': f"https://www.wildberries.ru/catalog/{nm_id}/detail.aspx",
+            'name': item.get('name', ''),
+            'brand': item.get('brand', ''),
+            'price': self._extract_price(item),
+            'rating': float(item.get('reviewRating') or item.get('rating') or 0.0),
+            'image': wb_image_url(nm_id) if nm_id else '',
+            'category': entity[:1].upper() + entity[1:] if entity else 'Не определена',
+            'subject_id': item.get('subjectId'),
+            'entity_id': entity_info.get('id', ''),
+            'entity_type': entity_info.get('type', ''),
+            'entity_name': entity_info.get('name', '')
+        }
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            requests_count = metrics['requests']
+            metrics['request_time_avg_ms'] = (
+                round(metrics['request_time_total'] / requests_count * 1000, 3) if requests_count else 0.0
+            )
+            del metrics['request_time_total']
+        return metrics
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,80 @@
+# ============================================
+# ПОДГРУЗКА СЕТКИ ТОВАРОВ WB В БРАУЗЕРЕ
+# ============================================
+
+# Наблюдатель за сеткой в браузере (ставится один раз на документ): MutationObserver
+# отмечает добавление узлов, обертки fetch/XHR считают незавершенные запросы страницы.
+# Карточки считаются по «живой» коллекции getElementsByClassName — без обхода DOM.
+# Ждет, пока карточек станет target, или пока после новых узлов страница не затихнет
+# на quiet мс (нет мутаций и запросов), но не дольше timeout мс
+CARD_WATCH_JS = """
+    var done = arguments[arguments.length - 1];
+    var previous = arguments[0], target = arguments[1], quietMs = arguments[2], timeoutMs = arguments[3];
+    var w = window.__wbCardWatch;
+    if (!w) {
+        w = window.__wbCardWatch = {inflight: 0, lastChange: Date.now(), listeners: []};
+        var cards = document.getElementsByClassName('product-card');
+        w.count = function () {
+            return cards.length || document.querySelectorAll('[data-nm-id]').length;
+        };
+        var notify = function () {
+            w.lastChange = Date.now();
+            w.listeners.slice().forEach(function (listener) { listener(); });
+        };
+        new MutationObserver(function (records) {
+            for (var i = 0; i < records.length; i++) {
+                if (records[i].addedNodes.length) { notify(); return; }
+            }
+        }).observe(document.documentElement, {childList: true, subtree: true});
+        if (window.fetch) {
+            var originalFetch = window.fetch;
+            window.fetch = function () {
+                w.inflight++;
+                return originalFetch.apply(this, arguments).finally(function () { w.inflight--; notify(); });
+            };
+        }
+        var originalSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            w.inflight++;
+            this.addEventListener('loadend', function () { w.inflight--; notify(); });
+            return originalSend.apply(this, arguments);
+        };
+    }
+
+    var started = Date.now(), timer = null, finished = false;
+    function finish(reason) {
+        if (finished) { return; }
+        finished = true;
+        clearTimeout(timer);
+        w.listeners.splice(w.listeners.indexOf(check), 1);
+        done({count: w.count(), reason: reason});
+    }
+    function check() {
+        var count = w.count(), now = Date.now();
+        if (count >= target) { return finish('target'); }
+        if (now - started >= timeoutMs) { return finish('timeout'); }
+        var quietFor = now - Math.max(w.lastChange, started);
+        if (count > 0 && w.inflight === 0 && quietFor >= quietMs) {
+            return finish(count > previous ? 'loaded' : 'idle');
+        }
+        clearTimeout(timer);
+        timer = setTimeout(check, Math.max(Math.min(quietMs - quietFor, timeoutMs - (now - started)), 20));
+    }
+    w.listeners.push(check);
+    check();
+"""
+
+
+def wait_for_cards(driver, previous, target, quiet_time, timeout):
+    """
+    Ждет в браузере появления карточек сверх previous (до target).
+    Возвращает (карточек на странице, причина: target / loaded / idle / timeout / error).
+    """
+    driver.set_script_timeout(timeout + 5)
+    try:
+        result = driver.execute_async_script(CARD_WATCH_JS, previous, target,
+                                             int(quiet_time * 1000), int(timeout * 1000))
+    except Exception as e:
+        print(f"   ⚠ Ошибка ожидания карточек: {e}")
+        return previous, 'error'
+    return result['count'], result['reason']